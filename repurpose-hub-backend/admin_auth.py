@@ -15,14 +15,17 @@ from models import User
 
 from config import SECRET_KEY, ALGORITHM
 from helpers import to_model
+from services.user_cache import load_user
 
 security = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-) -> User:
-    """Get current authenticated user"""
+async def authenticate_token(token: str) -> dict:
+    """Decode a bearer token and return its user document.
+
+    Shared by every auth dependency. The user lookup goes through the
+    short-TTL user cache, so repeat requests skip the database.
+    """
     credentials_exception = HTTPException(
         status_code=http_status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -30,9 +33,7 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(
-            credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM]
-        )
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("sub")
         if user_id is None:
             raise credentials_exception
@@ -42,11 +43,20 @@ async def get_current_user(
     # Import database connection from db.py
     from db import user_collection
 
-    user_data = await user_collection.find_one({"_id": ObjectId(user_id)})
+    user_data = await load_user(str(user_id), user_collection)
 
     if user_data is None:
         raise credentials_exception
 
+    return user_data
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> User:
+    """Get current authenticated user"""
+    user_data = await authenticate_token(credentials.credentials)
+
     # Convert MongoDB document to User model using helper
     return to_model(user_data, User)
 
@@ -1,14 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi import status as http_status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from bson import ObjectId
 
 from models import User, AdminStats, ActivityLog, SystemMetrics
 from admin_auth import get_current_admin_user, create_access_token
 from admin_activity import log_activity, AdminActions, ResourceTypes
 from db import db
+from db_indexes import index_usage
 from helpers import to_model
+from services.invoice import export_invoices_zip, get_invoice_renderer
+from services.user_cache import get_user_cache
+from services.passwords import get_password_hasher
+from services.payment import get_payment_gateway
+from services.outbox import outbox_backlog
+from services.latency import get_step_latencies
+from services.catalog_cache import get_catalog_cache
+from services.inventory import get_stock_view, stock_on_hand
+from services.admin_stats import compute_dashboard_stats, get_dashboard_stats_cache
+from services.daily_stats import query_series, series_range
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -78,58 +90,44 @@ async def admin_login(email: str, password: str, request: Request):
 
 
 @router.get("/stats", response_model=AdminStats)
-async def get_admin_stats(current_user: User = Depends(get_current_admin_user)):
-    """Get dashboard statistics"""
+async def get_admin_stats(
+    estimated: bool = False,
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Get dashboard statistics (cached briefly; ``estimated`` uses metadata totals)"""
     try:
-        # Get counts from all collections
-        total_users = await db.users.count_documents({})
-        total_products = await db.products.count_documents({})
-        total_orders = await db.checkout.count_documents({})
-        total_donations = await db.donations.count_documents({})
-
-        # Get pending orders and processing donations
-        pending_orders = await db.checkout.count_documents({"status": "pending"})
-        processing_donations = await db.donations.count_documents(
-            {"status": "Processing"}
+        return await get_dashboard_stats_cache().get(
+            ("dashboard", estimated),
+            lambda: compute_dashboard_stats(
+                db.users, db.products, db.checkout, db.donations, estimated=estimated
+            ),
         )
 
-        # Get today's new users
-        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        new_users_today = await db.users.count_documents(
-            {"created_at": {"$gte": today}}
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get stats: {str(e)}",
         )
 
-        # Calculate total revenue from completed orders
-        completed_orders_cursor = db.checkout.find({"status": "completed"})
-        completed_orders = []
-        async for order in completed_orders_cursor:
-            completed_orders.append(order)
 
-        total_revenue = sum(order.get("total_price", 0) for order in completed_orders)
-
-        # Get today's revenue
-        revenue_today = sum(
-            order.get("total_price", 0)
-            for order in completed_orders
-            if order.get("created_at", datetime.min) >= today
-        )
-
-        return AdminStats(
-            total_users=total_users,
-            total_products=total_products,
-            total_orders=total_orders,
-            total_donations=total_donations,
-            total_revenue=total_revenue,
-            pending_orders=pending_orders,
-            processing_donations=processing_donations,
-            new_users_today=new_users_today,
-            revenue_today=revenue_today,
-        )
+@router.get("/stats/series")
+async def get_stats_series(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    interval: str = "day",
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Revenue, orders, new users and donations per day, week or month, from the daily rollups"""
+    start, end = series_range(start, end, interval)
+    try:
+        return await query_series(db.daily_stats, start, end, interval)
 
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to get stats: {str(e)}",
+            detail=f"Failed to get stats series: {str(e)}",
         )
 
 
@@ -224,6 +222,9 @@ async def update_user(
                 status_code=http_status.HTTP_404_NOT_FOUND, detail="User not found"
             )
 
+        # Role or profile changes must not be served from the auth cache
+        get_user_cache().invalidate(user_id)
+
         # Log activity
         await log_activity(
             db,
@@ -257,6 +258,8 @@ async def delete_user(
                 status_code=http_status.HTTP_404_NOT_FOUND, detail="User not found"
             )
 
+        get_user_cache().invalidate(user_id)
+
         # Log activity
         await log_activity(
             db,
@@ -301,6 +304,8 @@ async def get_products(
 
         async for product_data in cursor:
             product_data["id"] = str(product_data.pop("_id"))
+            # What to send back as `stock` when editing the product
+            product_data["on_hand"] = stock_on_hand(product_data)
             products.append(product_data)
 
         # Get total count
@@ -326,6 +331,7 @@ async def get_orders(
     page: int = 1,
     limit: int = 20,
     status: Optional[str] = None,
+    refund_due: Optional[bool] = None,
     current_user: User = Depends(get_current_admin_user),
 ):
     """Get all orders with pagination and filtering"""
@@ -336,6 +342,9 @@ async def get_orders(
         filter_dict = {}
         if status:
             filter_dict["status"] = status
+        if refund_due is not None:
+            # Expired checkouts whose payment arrived after the stock was released
+            filter_dict["refund_due"] = True if refund_due else {"$ne": True}
 
         # Get orders
         cursor = (
@@ -365,6 +374,54 @@ async def get_orders(
         )
 
 
+@router.get("/invoices/export")
+async def export_invoices(
+    start: date,
+    end: date,
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Stream the invoices of completed orders created between start and end (inclusive) as a ZIP"""
+    if end < start:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail="end must not be before start",
+        )
+
+    try:
+        await log_activity(
+            db,
+            str(current_user.id),
+            current_user.email,
+            AdminActions.EXPORT,
+            ResourceTypes.ORDER,
+            details={"start": start.isoformat(), "end": end.isoformat()},
+        )
+
+        orders = db.checkout.find(
+            {
+                "status": "completed",
+                "created_at": {
+                    "$gte": datetime.combine(start, datetime.min.time()),
+                    "$lt": datetime.combine(end + timedelta(days=1), datetime.min.time()),
+                },
+            }
+        ).sort("created_at", 1)
+
+        return StreamingResponse(
+            export_invoices_zip(orders, db.users, db.eco_impact),
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": f"attachment; filename=invoices_{start:%Y%m%d}_{end:%Y%m%d}.zip"
+            },
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to export invoices: {str(e)}",
+        )
+
+
 @router.get("/donations")
 async def get_donations(
     page: int = 1,
@@ -478,6 +535,9 @@ async def get_system_metrics(current_user: User = Depends(get_current_admin_user
             api_requests_today=0,  # Track API requests
             error_rate=0.0,  # Track error rate
             uptime=str(timedelta(seconds=int(time.time() - psutil.boot_time()))),
+            password_hashing=get_password_hasher().stats(),
+            payment_gateway=get_payment_gateway().breaker.stats(),
+            request_steps=get_step_latencies().stats(),
         )
 
     except ImportError:
@@ -490,9 +550,63 @@ async def get_system_metrics(current_user: User = Depends(get_current_admin_user
             api_requests_today=0,
             error_rate=0.0,
             uptime="Unknown",
+            password_hashing=get_password_hasher().stats(),
+            payment_gateway=get_payment_gateway().breaker.stats(),
+            request_steps=get_step_latencies().stats(),
         )
     except Exception as e:
         raise HTTPException(
             status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get system metrics: {str(e)}",
         )
+
+
+@router.get("/system/caches")
+async def get_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """Get hit/miss counters for the in-process caches"""
+    return {
+        "auth_users": get_user_cache().stats(),
+        "catalog": get_catalog_cache().stats(),
+        "invoices": get_invoice_renderer().stats(),
+        "stock": get_stock_view().stats(),
+        "admin_stats": get_dashboard_stats_cache().stats(),
+    }
+
+
+@router.get("/system/outbox")
+async def get_outbox_status(current_user: User = Depends(get_current_admin_user)):
+    """Get the outbox backlog and the most recent permanently failed tasks"""
+    try:
+        failed = await db.outbox.find(
+            {"status": "failed"}, {"payload": 0}
+        ).sort("failed_at", -1).limit(20).to_list(length=20)
+        for task in failed:
+            task["_id"] = str(task["_id"])
+        return {"backlog": await outbox_backlog(db.outbox), "failed": failed}
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get outbox status: {str(e)}",
+        )
+
+
+@router.get("/system/indexes")
+async def get_index_usage(current_user: User = Depends(get_current_admin_user)):
+    """Get per-index usage statistics from $indexStats"""
+    try:
+        usage = await index_usage(db)
+        return {
+            "indexes": usage,
+            "unused": [
+                f"{entry['collection']}.{entry['name']}"
+                for entry in usage
+                if entry["ops"] == 0 and entry["name"] != "_id_"
+            ],
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get index usage: {str(e)}",
+        )
@@ -1,13 +1,17 @@
 from typing import List
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from bson import ObjectId
+from pymongo import ReturnDocument
 from models import (
     Cart,
+    CartQuantitiesUpdate,
+    RemoveItemsRequest,
     Checkout,
     Donation,
     Login,
     ProductResponse,
+    ProductBatchRequest,
     User,
     CreateOrderRequest,
     VerifyPaymentRequest,
@@ -19,17 +23,17 @@ from models import (
     EcoImpact,
     StylePreferences,
     ProductCreate,
+    TutorialCreate,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from passlib.context import CryptContext
-import razorpay
+import asyncio
 import os
+import json
+import math
 import hmac
 import hashlib
-from fpdf import FPDF
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 import io
-import re
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
@@ -37,34 +41,53 @@ from typing import Optional
 # Import shared config and db
 from config import (
     SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,
-    REFRESH_TOKEN_EXPIRE_DAYS, RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET, CORS_ORIGINS
+    REFRESH_TOKEN_EXPIRE_DAYS, CORS_ORIGINS,
+    HEALTH_DB_INTERVAL_SECONDS, HEALTH_PAYMENT_INTERVAL_SECONDS, RAZORPAY_WEBHOOK_SECRET,
+    ORDER_EVENTS_LONG_POLL_SECONDS, ORDER_EVENTS_CHANGE_STREAMS,
 )
 from db import (
     db, user_collection, product_collection, tutorials_collection,
     donations_collection, cart_collection, checkout_collection,
     orders_collection, wishlist_collection, eco_impact_collection,
-    style_preferences_collection, idempotency_collection
+    style_preferences_collection, idempotency_collection, outbox_collection,
+    stock_reservations_collection, daily_stats_collection, community_impact_collection,
+    run_in_transaction
 )
 from services import (
     calculate_cart_total as svc_calculate_cart_total,
     validate_cart_amount as svc_validate_cart_amount,
-    get_razorpay_client, create_order as svc_create_order,
+    get_payment_gateway, create_order as svc_create_order, PaymentGatewayError,
+    PaymentGatewayUnavailable, DependencyCheck, get_health_monitor,
+    finalize_paid_checkout, credit_checkout_impact, OutboxWorker, outbox_task, CommunityImpact,
+    create_checkout_payment_order, CheckoutNotPayable,
+    StockReservations, InsufficientStock, get_stock_view, ensure_stock_field,
+    on_hand_stock_expression,
+    verify_webhook_signature, apply_payment_event, flag_late_payment, PaymentReconciler,
+    get_order_event_bus, order_event, order_topic, user_topic, event_stream,
+    watch_order_changes, TERMINAL_STATUSES, PipelineTimer,
     verify_payment_signature, get_payment_status as svc_get_payment_status,
     calculate_total_impact, complete_checkout as svc_complete_checkout,
+    get_tutorial_index, get_catalog_cache, get_invoice_renderer,
+    get_password_hasher, PasswordHasherBusy, get_user_cache,
+    format_product, parse_fields, fetch_product_page, fetch_all_products,
+    fetch_products_by_ids, compute_dashboard_stats, get_dashboard_stats_cache,
+    record_daily, record_completed_order,
+    IdempotencyStore, build_add_items_update, build_set_quantities_update,
+    build_add_unique_items_update, apply_items_update,
+    to_paise, with_price_paise, subtotal_paise, cart_total_paise,
 )
+from http_cache import response_snapshots, snapshot_response
+from db_indexes import ensure_indexes
 
 app = FastAPI()
 
 # Import admin routes
 from admin_routes import router as admin_router
+from admin_auth import authenticate_token
 
 # Include admin routes
 app.include_router(admin_router)
 
-# Initialize Razorpay client
-razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
-razorpay_client.set_app_details({"title": "FastAPI App", "version": "1.0"})
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ORIGINS,
@@ -74,6 +97,129 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many login attempts in progress, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.on_event("startup")
+async def build_tutorial_index():
+    try:
+        await load_tutorial_index()
+    except Exception as e:
+        print(f"Tutorial index build failed: {str(e)}")
+
+
+@app.on_event("startup")
+async def create_indexes():
+    try:
+        report = await ensure_indexes()
+        for collection_name, result in report.items():
+            for index_name, error in result["errors"].items():
+                print(f"Index {collection_name}.{index_name} not created: {error}")
+    except Exception as e:
+        print(f"Index creation failed: {str(e)}")
+
+
+@app.on_event("startup")
+async def start_health_monitor():
+    monitor = get_health_monitor()
+    monitor.add_check(
+        DependencyCheck("database", lambda: db.command("ping"), HEALTH_DB_INTERVAL_SECONDS)
+    )
+    # Payments being down degrades checkout but should not pull the instance
+    # out of the load balancer, so the gateway is not critical for readiness
+    monitor.add_check(
+        DependencyCheck(
+            "razorpay", lambda: get_payment_gateway().ping(),
+            HEALTH_PAYMENT_INTERVAL_SECONDS, critical=False,
+        )
+    )
+    monitor.start()
+
+
+@app.on_event("shutdown")
+async def stop_health_monitor():
+    await get_health_monitor().stop()
+
+
+@app.on_event("startup")
+async def start_payment_reconciler():
+    payment_reconciler.start()
+
+
+@app.on_event("startup")
+async def start_outbox_worker():
+    outbox_worker.start()
+
+
+@app.on_event("startup")
+async def start_stock_reservations():
+    try:
+        backfilled = await ensure_stock_field(product_collection)
+        if backfilled:
+            print(f"Copied legacy quantity to stock on {backfilled} products")
+    except Exception as e:
+        print(f"Stock field backfill failed: {str(e)}")
+    stock_reservations.start()
+
+
+@app.on_event("startup")
+async def start_community_impact_repair():
+    community_impact.start()
+
+
+# Change stream tasks; empty unless ORDER_EVENTS_CHANGE_STREAMS is on
+order_change_watchers = []
+
+
+@app.on_event("startup")
+async def start_order_change_watchers():
+    if ORDER_EVENTS_CHANGE_STREAMS:
+        bus = get_order_event_bus()
+        order_change_watchers.extend([
+            asyncio.create_task(watch_order_changes(orders_collection, bus, "checkout_id")),
+            asyncio.create_task(watch_order_changes(checkout_collection, bus, "_id")),
+        ])
+
+
+@app.on_event("shutdown")
+async def stop_order_change_watchers():
+    for task in order_change_watchers:
+        task.cancel()
+    await asyncio.gather(*order_change_watchers, return_exceptions=True)
+    order_change_watchers.clear()
+
+
+@app.on_event("shutdown")
+async def stop_payment_reconciler():
+    await payment_reconciler.stop()
+
+
+@app.on_event("shutdown")
+async def stop_outbox_worker():
+    await outbox_worker.stop()
+
+
+@app.on_event("shutdown")
+async def stop_stock_reservations():
+    await stock_reservations.stop()
+
+
+@app.on_event("shutdown")
+async def stop_community_impact_repair():
+    await community_impact.stop()
+
+
+@app.on_event("shutdown")
+async def close_payment_gateway():
+    await get_payment_gateway().aclose()
+
+
 # Helper functions
 def donation_helper(donation: dict) -> dict:
     donation["_id"] = str(donation["_id"])
@@ -96,14 +242,7 @@ def checkout_helper(checkout: dict) -> dict:
 
 
 def product_helper(product) -> dict:
-    return {
-        "id": str(product["_id"]),
-        "name": product["name"],
-        "price": product["price"],
-        "stock": product.get("stock", product.get("quantity", 0)),
-        "companyname": product.get("companyName", product.get("companyname", "")),
-        "imageurl": product.get("image_url", product.get("imageurl", "")),
-    }
+    return format_product(product)
 
 
 def tutorial_helper(tutorial: dict) -> dict:
@@ -130,16 +269,23 @@ def eco_impact_helper(impact) -> dict:
     return impact
 
 
-# Password hashing configuration
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
+# Password hashing runs on the shared hasher's thread pool, never on the event loop
+async def hash_password(password: str) -> str:
+    return await get_password_hasher().hash(password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
 
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def verify_user_password(user: dict, password: str) -> bool:
+    """Check a login password, upgrading the stored hash if argon2 settings changed."""
+    valid, new_hash = await get_password_hasher().verify_and_update(
+        password, user["password"]
+    )
+    if valid and new_hash:
+        await user_collection.update_one(
+            {"_id": user["_id"], "password": user["password"]},
+            {"$set": {"password": new_hash}},
+        )
+        get_user_cache().invalidate(str(user["_id"]))
+    return valid
 
 
 # JWT Token Functions
@@ -162,50 +308,102 @@ def create_refresh_token(data: dict) -> str:
     return encoded_jwt
 
 
-# Payment Idempotency Functions
-IDEMPOTENCY_TTL_MINUTES = 30
+# Payment Idempotency
+idempotency_store = IdempotencyStore(idempotency_collection)
 
 
-async def check_idempotency(key: str) -> tuple[bool, dict | None]:
-    """Check if idempotency key exists. Returns (exists, existing_result)"""
-    existing = await idempotency_collection.find_one({"key": key})
-    if existing and existing.get("expires_at", datetime.now()) > datetime.now():
-        return True, existing.get("result")
-    return False, None
+async def finalize_checkout(checkout_filter: dict, razorpay_order_id: str, razorpay_payment_id: str):
+    """Complete a pending checkout once; shared by the client, webhook and reconciler paths."""
+    async def complete(session):
+        completed = await finalize_paid_checkout(
+            checkout_filter, razorpay_order_id, razorpay_payment_id,
+            checkout_collection, outbox_collection, session=session,
+        )
+        if completed is not None:
+            # The reserved stock now belongs to the order
+            await stock_reservations.commit(completed["_id"], session=session)
+        return completed
+
+    completed = await run_in_transaction(complete)
+    if completed is not None:
+        # Its outbox tasks are committed; wake a worker instead of waiting for the poll
+        outbox_worker.notify()
+        get_order_event_bus().publish(
+            order_event("completed", razorpay_order_id, completed["user_id"], completed["_id"])
+        )
+    return completed
 
 
-async def store_idempotency_result(key: str, result: dict):
-    """Store idempotency result with expiry"""
-    await idempotency_collection.update_one(
-        {"key": key},
-        {
-            "$set": {
-                "result": result,
-                "expires_at": datetime.now()
-                + timedelta(minutes=IDEMPOTENCY_TTL_MINUTES),
-                "created_at": datetime.now(),
-            }
-        },
-        upsert=True,
+# Post-checkout side effects, queued by finalize_checkout and run by outbox workers
+async def clear_cart_task(payload: dict, task_id):
+    await cart_collection.delete_one({"user_id": payload["user_id"]})
+
+
+async def credit_eco_impact_task(payload: dict, task_id):
+    await credit_checkout_impact(
+        eco_impact_collection, payload["user_id"], payload["num_items"], task_id,
+        community=community_impact,
     )
+    # The invoice prints the lifetime totals, so render it once they include this order
+    await outbox_collection.insert_one(outbox_task("prerender_invoice", payload))
+    outbox_worker.notify()
 
 
-# Amount Validation
-async def validate_cart_amount(
-    user_id: str, expected_total: float
-) -> tuple[bool, float]:
-    """Validate cart amount against requested total using cart service."""
-    user_cart = await cart_collection.find_one({"user_id": user_id})
-    if not user_cart or not user_cart.get("items"):
-        return True, 0.0
+async def prerender_invoice_task(payload: dict, task_id):
+    checkout_order = await checkout_collection.find_one({"_id": payload["checkout_id"]})
+    if checkout_order is not None:
+        await get_invoice_renderer().prerender(checkout_order, user_collection, eco_impact_collection)
+
+
+async def clear_stock_holds_task(payload: dict, task_id):
+    await stock_reservations.clear_holds(payload["checkout_id"])
+
+
+async def record_order_stats_task(payload: dict, task_id):
+    await record_completed_order(daily_stats_collection, checkout_collection, payload["checkout_id"])
+
+
+outbox_worker = OutboxWorker(outbox_collection, {
+    "clear_cart": clear_cart_task,
+    "credit_eco_impact": credit_eco_impact_task,
+    "prerender_invoice": prerender_invoice_task,
+    "clear_stock_holds": clear_stock_holds_task,
+    "record_order_stats": record_order_stats_task,
+})
 
-    # Delegate to cart service
-    return svc_validate_cart_amount(user_cart["items"], expected_total)
+
+async def publish_expired(checkout_order: dict):
+    get_order_event_bus().publish(order_event(
+        "expired", checkout_order.get("razorpay_order_id"),
+        checkout_order.get("user_id"), checkout_order["_id"],
+    ))
+
+
+async def release_expired_checkout(checkout_order: dict):
+    await stock_reservations.release(checkout_order["_id"])
+    await publish_expired(checkout_order)
+
+
+# Public community totals, kept current by eco impact credits and repaired periodically
+community_impact = CommunityImpact(eco_impact_collection, community_impact_collection)
+
+payment_reconciler = PaymentReconciler(
+    checkout_collection, orders_collection, finalize_checkout,
+    on_expired=release_expired_checkout,
+)
+
+# Stock held by pending checkouts; the sweep expires checkouts whose hold
+# lapsed, unless the gateway reports their order paid
+stock_reservations = StockReservations(
+    product_collection, stock_reservations_collection, checkout_collection,
+    on_expired=publish_expired, settle_paid=payment_reconciler.settle,
+)
 
 
+# Amount Validation
 async def get_payment_status(razorpay_payment_id: str) -> dict:
     """Get actual payment status from Razorpay using payment service."""
-    return svc_get_payment_status(razorpay_payment_id)
+    return await svc_get_payment_status(razorpay_payment_id)
 
 
 def decode_token(token: str) -> dict:
@@ -224,23 +422,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = decode_token(token)
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = await user_collection.find_one({"_id": ObjectId(user_id)})
-    if user is None:
-        raise credentials_exception
-    return user_helper(user)
+    return user_helper(await authenticate_token(token))
 
 
 async def get_current_user_optional(
@@ -256,6 +438,14 @@ async def get_current_user_optional(
         return None
 
 
+async def count_daily(when: datetime, **increments: int):
+    """Bump today's rollup counters; a failure here must not fail the request."""
+    try:
+        await record_daily(daily_stats_collection, when, **increments)
+    except Exception as e:
+        print(f"Failed to update daily stats: {str(e)}")
+
+
 # User Management Endpoints
 @app.post("/createUser/")
 async def create_user(user: User):
@@ -264,9 +454,10 @@ async def create_user(user: User):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     user_data = user.dict()
-    user_data["password"] = hash_password(user.password)
+    user_data["password"] = await hash_password(user.password)
 
     result = await user_collection.insert_one(user_data)
+    await count_daily(user_data.get("created_at") or datetime.utcnow(), new_users=1)
     created_user = await user_collection.find_one({"_id": result.inserted_id})
 
     if created_user:
@@ -290,7 +481,7 @@ async def get_user(user_id: str):
 @app.post("/login/")
 async def login(login: Login):
     user = await user_collection.find_one({"email": login.email})
-    if not user or not verify_password(login.password, user["password"]):
+    if not user or not await verify_user_password(user, login.password):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     access_token = create_access_token(data={"sub": str(user["_id"])})
@@ -307,7 +498,7 @@ async def login(login: Login):
 @app.post("/token", response_model=dict)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     user = await user_collection.find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user["password"]):
+    if not user or not await verify_user_password(user, form_data.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -352,9 +543,89 @@ async def refresh_access_token(request: dict):
 
 # Product Endpoints
 @app.get("/allProducts/", response_model=List[ProductResponse])
-async def get_all_products():
-    products = await product_collection.find().to_list(100)
-    return [product_helper(product) for product in products]
+async def get_all_products(request: Request):
+    cache = get_catalog_cache()
+    products = cache.get_snapshot()
+    if products is None:
+        async with cache.lock:
+            products = cache.get_snapshot()
+            if products is None:
+                products = cache.set_snapshot(
+                    await fetch_all_products(product_collection)
+                )
+    snapshot = response_snapshots.get("products", cache.version, lambda: products)
+    return snapshot_response(snapshot, request)
+
+
+@app.get("/products")
+async def list_products(
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    company: Optional[str] = None,
+    vendor: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    fields: Optional[str] = None,
+):
+    """
+    Page through the catalog with a keyset cursor, filters and field projection
+    """
+    try:
+        products, next_cursor = await fetch_product_page(
+            product_collection,
+            limit=limit,
+            cursor=cursor,
+            company=company,
+            vendor=vendor,
+            min_price=min_price,
+            max_price=max_price,
+            fields=parse_fields(fields),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"products": products, "next_cursor": next_cursor}
+
+
+@app.post("/products/batch")
+async def get_products_batch(batch: ProductBatchRequest):
+    """
+    Look up many products in one call (cart and wishlist hydration).
+    Results follow the order of ids, with null for unknown ids.
+    """
+    try:
+        fields = parse_fields(batch.fields)
+        products = await fetch_products_by_ids(
+            product_collection, batch.ids, get_catalog_cache(), fields
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    found = [product for product in products if product is not None]
+    if found and "stock" in found[0]:
+        # Same freshness as GET /products/{id}
+        stock = await get_stock_view().get_many(product_collection, [p["id"] for p in found])
+        products = [
+            {**product, "stock": stock.get(product["id"], product["stock"])} if product else None
+            for product in products
+        ]
+
+    return {
+        "products": products,
+        "missing": [pid for pid, product in zip(batch.ids, products) if product is None],
+    }
+
+
+@app.get("/products/availability")
+async def get_product_availability(ids: str):
+    """
+    Available stock for a comma-separated list of product ids
+    """
+    product_ids = [pid.strip() for pid in ids.split(",") if pid.strip()]
+    if not product_ids or len(product_ids) > 100:
+        raise HTTPException(status_code=400, detail="Pass between 1 and 100 product ids")
+    stock = await get_stock_view().get_many(product_collection, product_ids)
+    return {"stock": stock}
 
 
 @app.get("/products/{product_id}", response_model=ProductResponse)
@@ -362,26 +633,54 @@ async def get_product(product_id: str):
     if not ObjectId.is_valid(product_id):
         raise HTTPException(status_code=400, detail="Invalid product ID")
 
-    product = await product_collection.find_one({"_id": ObjectId(product_id)})
-    if product:
-        return product_helper(product)
+    cache = get_catalog_cache()
+    product = cache.get(product_id)
+    if not product:
+        product = await product_collection.find_one({"_id": ObjectId(product_id)})
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        product = product_helper(product)
+        cache.put(product)
 
-    raise HTTPException(status_code=404, detail="Product not found")
+    # Catalog entries live for minutes; stock comes from the short-lived view
+    stock = await get_stock_view().get(product_collection, product_id)
+    return {**product, "stock": product["stock"] if stock is None else stock}
 
 
 # Tutorial Endpoints
+async def load_tutorial_index():
+    """The shared tutorial index, rebuilt from MongoDB when missing or past its TTL."""
+    index = get_tutorial_index()
+    if index.stale():
+        async with index.lock:
+            if index.stale():
+                tutorials = await tutorials_collection.find({}).to_list(length=None)
+                index.rebuild([tutorial_helper(tutorial) for tutorial in tutorials])
+    return index
+
+
 @app.get("/allTutorials/")
-async def get_all_tutorials():
+async def get_all_tutorials(request: Request):
     try:
-        tutorials_cursor = tutorials_collection.find({})
-        tutorials_list = await tutorials_cursor.to_list(length=None)
-        return [tutorial_helper(tutorial) for tutorial in tutorials_list]
+        # The search index holds every tutorial, so it doubles as the snapshot
+        index = await load_tutorial_index()
+        snapshot = response_snapshots.get("tutorials", index.version, index.documents)
+        return snapshot_response(snapshot, request)
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Error fetching tutorials: {str(e)}"
         )
 
 
+@app.get("/tutorials/search")
+async def search_tutorials(q: str, limit: int = 5):
+    """
+    Rank tutorials for a detected object label or free-text query
+    """
+    limit = max(1, min(limit, 50))
+    return (await load_tutorial_index()).search(q, limit)
+
+
 # Donation Endpoints
 @app.post("/donations", status_code=201)
 async def create_donation(donation: Donation):
@@ -393,9 +692,10 @@ async def create_donation(donation: Donation):
 
     new_donation = donation.dict()
     if not new_donation.get("created_at"):
-        new_donation["created_at"] = datetime.now()
+        new_donation["created_at"] = datetime.utcnow()
 
     await donations_collection.insert_one(new_donation)
+    await count_daily(new_donation["created_at"], donations=1)
     return donation
 
 
@@ -410,51 +710,12 @@ async def get_all_donations():
 @app.post("/cart/add")
 async def add_to_cart(cart: Cart):
     try:
-        existing_cart = await cart_collection.find_one({"user_id": cart.user_id})
-
-        if existing_cart:
-            for new_item in cart.items:
-                product_found = False
-                for existing_item in existing_cart["items"]:
-                    if existing_item["id"] == new_item.id:
-                        await cart_collection.update_one(
-                            {"user_id": cart.user_id, "items.id": new_item.id},
-                            {"$inc": {"items.$.quantity": new_item.quantity}},
-                        )
-                        product_found = True
-                        break
-
-                if not product_found:
-                    # Explicitly create a clean CartItem-compatible dict
-                    # This ensures only the requested quantity is stored, NOT the product's stock level
-                    clean_item = {
-                        "id": str(new_item.id),
-                        "name": str(new_item.name),
-                        "price": str(new_item.price),
-                        "quantity": int(new_item.quantity),
-                        "companyname": str(new_item.companyname),
-                        "imageurl": str(new_item.imageurl),
-                    }
-                    await cart_collection.update_one(
-                        {"user_id": cart.user_id}, {"$push": {"items": clean_item}}
-                    )
-        else:
-            # Create new cart with cleaned items
-            cleaned_items = []
-            for item in cart.items:
-                cleaned_items.append(
-                    {
-                        "id": str(item.id),
-                        "name": str(item.name),
-                        "price": str(item.price),
-                        "quantity": int(item.quantity),
-                        "companyname": str(item.companyname),
-                        "imageurl": str(item.imageurl),
-                    }
-                )
-            new_cart = {"user_id": cart.user_id, "items": cleaned_items}
-            await cart_collection.insert_one(new_cart)
-
+        # One atomic write: bump quantities of existing lines, append new ones
+        await apply_items_update(
+            cart_collection,
+            cart.user_id,
+            build_add_items_update([item.dict() for item in cart.items]),
+        )
         return {"message": "Items added to cart successfully"}
 
     except Exception as e:
@@ -533,6 +794,47 @@ async def update_cart_quantity(request: dict):
         )
 
 
+@app.delete("/cart/remove-items")
+async def remove_items_from_cart(request: RemoveItemsRequest):
+    try:
+        result = await cart_collection.update_one(
+            {"user_id": request.user_id},
+            {"$pull": {"items": {"id": {"$in": request.item_ids}}}},
+        )
+
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Cart not found")
+
+        return {"message": "Items removed from cart successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error removing items: {str(e)}")
+
+
+@app.patch("/cart/update-quantities")
+async def update_cart_quantities(request: CartQuantitiesUpdate):
+    try:
+        # Absolute quantities; lines set to 0 or less are removed
+        result = await cart_collection.update_one(
+            {"user_id": request.user_id},
+            build_set_quantities_update(
+                {item.id: item.quantity for item in request.items}
+            ),
+        )
+
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Cart not found")
+
+        return {"message": "Quantities updated successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error updating quantities: {str(e)}"
+        )
+
+
 # Wishlist Endpoints
 @app.get("/wishlist/{user_id}")
 async def get_wishlist(user_id: str):
@@ -553,29 +855,12 @@ async def get_wishlist(user_id: str):
 @app.post("/wishlist/add")
 async def add_to_wishlist(wishlist: Wishlist):
     try:
-        existing_wishlist = await wishlist_collection.find_one(
-            {"user_id": wishlist.user_id}
+        # One atomic write: append only items not already in the wishlist
+        await apply_items_update(
+            wishlist_collection,
+            wishlist.user_id,
+            build_add_unique_items_update([item.dict() for item in wishlist.items]),
         )
-
-        if existing_wishlist:
-            # Add new items to existing wishlist
-            for new_item in wishlist.items:
-                item_found = False
-                for existing_item in existing_wishlist["items"]:
-                    if existing_item["id"] == new_item.id:
-                        item_found = True
-                        break
-
-                if not item_found:
-                    await wishlist_collection.update_one(
-                        {"user_id": wishlist.user_id},
-                        {"$push": {"items": new_item.dict()}},
-                    )
-        else:
-            # Create new wishlist
-            new_wishlist = wishlist.dict()
-            await wishlist_collection.insert_one(new_wishlist)
-
         return {"message": "Items added to wishlist successfully"}
     except Exception as e:
         raise HTTPException(
@@ -606,6 +891,24 @@ async def remove_from_wishlist(request: dict):
         raise HTTPException(status_code=500, detail=f"Error removing item: {str(e)}")
 
 
+@app.delete("/wishlist/remove-items")
+async def remove_items_from_wishlist(request: RemoveItemsRequest):
+    try:
+        result = await wishlist_collection.update_one(
+            {"user_id": request.user_id},
+            {"$pull": {"items": {"id": {"$in": request.item_ids}}}},
+        )
+
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Wishlist not found")
+
+        return {"message": "Items removed from wishlist successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error removing items: {str(e)}")
+
+
 @app.delete("/wishlist/clear/{user_id}")
 async def clear_wishlist(user_id: str):
     try:
@@ -625,43 +928,43 @@ async def clear_wishlist(user_id: str):
 @app.post("/payment/create-order", response_model=OrderResponse)
 async def create_razorpay_order(order_request: CreateOrderRequest):
     """
-    Create a Razorpay order for payment processing
+    Create the Razorpay order for a pending checkout, charging the checkout's
+    total; the checkout is linked to it so webhooks can complete it
     """
+    if not ObjectId.is_valid(order_request.checkout_id):
+        raise HTTPException(status_code=400, detail="Invalid checkout ID")
     try:
-        # Convert amount to paise (Razorpay expects amount in paise for INR)
-        amount_in_paise = int(order_request.amount * 100)
-
-        # Create Razorpay order
-        order_data = {
-            "amount": amount_in_paise,
-            "currency": order_request.currency,
-            "receipt": f"receipt_{order_request.user_id}_",
-            "notes": {
-                "user_id": order_request.user_id,
-            },
-            "payment_capture": 1,  # Auto capture payment
-        }
-
-        # Create order with Razorpay
-        order = razorpay_client.order.create(data=order_data)
-
-        # Store order details in database
-        order_record = {
-            "razorpay_order_id": order["id"],
-            "user_id": order_request.user_id,
-            "amount": order_request.amount,
-            "amount_in_paise": amount_in_paise,
-            "currency": order_request.currency,
-            "status": order["status"],
-            "receipt": order_data["receipt"],
-            "created_at": datetime.now(),
-            "updated_at": datetime.now(),
-        }
+        # Create order with Razorpay (auto-captured) and link the checkout
+        order_record = await create_checkout_payment_order(
+            ObjectId(order_request.checkout_id),
+            order_request.user_id,
+            checkout_collection,
+            orders_collection,
+            svc_create_order,
+            currency=order_request.currency,
+        )
 
-        await orders_collection.insert_one(order_record)
+        get_order_event_bus().publish(order_event(
+            order_record["status"], order_record["razorpay_order_id"],
+            order_request.user_id, order_request.checkout_id,
+        ))
 
-        return OrderResponse(orderId=order["id"])
+        return OrderResponse(orderId=order_record["razorpay_order_id"])
 
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Checkout not found")
+    except CheckoutNotPayable as e:
+        raise HTTPException(
+            status_code=409, detail=f"Checkout cannot be paid from status {e.status}"
+        )
+    except PaymentGatewayUnavailable as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Payment gateway is temporarily unavailable, please retry shortly",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+    except PaymentGatewayError as e:
+        raise HTTPException(status_code=502, detail=f"Failed to create order: {e.description}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
 
@@ -672,35 +975,38 @@ async def verify_razorpay_payment(verification_request: VerifyPaymentRequest):
     Verify Razorpay payment signature
     """
     try:
-        # Verify payment signature using Razorpay utility
-        params_dict = {
-            "razorpay_order_id": verification_request.orderId,
-            "razorpay_payment_id": verification_request.razorpayPaymentId,
-            "razorpay_signature": verification_request.razorpaySignature,
-        }
-
-        # This will raise SignatureVerificationError if signature is invalid
-        razorpay_client.utility.verify_payment_signature(params_dict)
+        # Signature check is a local HMAC, no round trip to Razorpay
+        if not verify_payment_signature(
+            verification_request.orderId,
+            verification_request.razorpayPaymentId,
+            verification_request.razorpaySignature,
+        ):
+            return VerifyPaymentResponse(
+                success=False, message="Invalid payment signature"
+            )
 
         # Update order status in database
-        await orders_collection.update_one(
+        order = await orders_collection.find_one_and_update(
             {"razorpay_order_id": verification_request.orderId},
             {
                 "$set": {
                     "status": "paid",
                     "razorpay_payment_id": verification_request.razorpayPaymentId,
-                    "payment_verified_at": datetime.now(),
-                    "updated_at": datetime.now(),
+                    "payment_verified_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow(),
                 }
             },
+            projection={"user_id": 1, "checkout_id": 1},
         )
+        if order is not None:
+            get_order_event_bus().publish(order_event(
+                "paid", verification_request.orderId, order.get("user_id"), order.get("checkout_id")
+            ))
 
         return VerifyPaymentResponse(
             success=True, message="Payment verified successfully"
         )
 
-    except razorpay.errors.SignatureVerificationError:
-        return VerifyPaymentResponse(success=False, message="Invalid payment signature")
     except Exception as e:
         return VerifyPaymentResponse(
             success=False, message=f"Payment verification failed: {str(e)}"
@@ -720,7 +1026,7 @@ async def get_order_status(razorpay_order_id: str):
             raise HTTPException(status_code=404, detail="Order not found")
 
         # You can also fetch latest status from Razorpay API if needed
-        # razorpay_order = razorpay_client.order.fetch(razorpay_order_id)
+        # razorpay_order = await get_payment_gateway().fetch_order(razorpay_order_id)
 
         return {
             "razorpay_order_id": order["razorpay_order_id"],
@@ -736,6 +1042,63 @@ async def get_order_status(razorpay_order_id: str):
         )
 
 
+async def current_order_status(razorpay_order_id: str) -> Optional[dict]:
+    """Latest status for a Razorpay order, preferring its checkout once settled."""
+    order = await orders_collection.find_one(
+        {"razorpay_order_id": razorpay_order_id}, {"status": 1, "user_id": 1, "checkout_id": 1}
+    )
+    if not order:
+        return None
+    status = order["status"]
+    checkout_order = await checkout_collection.find_one(
+        {"razorpay_order_id": razorpay_order_id}, {"status": 1}
+    )
+    if checkout_order and checkout_order["status"] in TERMINAL_STATUSES:
+        status = checkout_order["status"]
+    return order_event(status, razorpay_order_id, order.get("user_id"), order.get("checkout_id"))
+
+
+@app.get("/payment/order-status/{razorpay_order_id}/wait")
+async def wait_for_order_status(
+    razorpay_order_id: str,
+    known_status: Optional[str] = None,
+    timeout: float = ORDER_EVENTS_LONG_POLL_SECONDS,
+):
+    """
+    Long-poll: return as soon as the status differs from known_status,
+    or with the unchanged status after timeout seconds
+    """
+    timeout = min(max(timeout, 0.0), ORDER_EVENTS_LONG_POLL_SECONDS)
+    # Subscribe before reading so a change between the two is not missed
+    with get_order_event_bus().subscribe(order_topic(razorpay_order_id)) as subscription:
+        current = await current_order_status(razorpay_order_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if current["status"] == known_status and current["status"] not in TERMINAL_STATUSES:
+            event = await subscription.get(timeout)
+            if event is not None:
+                current = event
+    return {**current, "changed": current["status"] != known_status}
+
+
+@app.get("/payment/order-status/{razorpay_order_id}/events")
+async def stream_order_status(razorpay_order_id: str):
+    """
+    Server-sent events for one order: its current status, then each change,
+    ending once the checkout is completed or expired
+    """
+    subscription = get_order_event_bus().subscribe(order_topic(razorpay_order_id))
+    current = await current_order_status(razorpay_order_id)
+    if current is None:
+        get_order_event_bus().unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Order not found")
+    return StreamingResponse(
+        event_stream(subscription, initial=[current]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/payment/status/{razorpay_payment_id}")
 async def get_payment_status_from_razorpay(razorpay_payment_id: str):
     """
@@ -754,23 +1117,84 @@ async def get_payment_status_from_razorpay(razorpay_payment_id: str):
         )
 
 
+@app.post("/payment/webhook")
+async def razorpay_webhook(request: Request):
+    """
+    Receive Razorpay payment/order events and settle orders and checkouts.
+    Redelivered events are harmless; every update is conditional on status.
+    """
+    if not RAZORPAY_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook secret is not configured")
+
+    body = await request.body()
+    if not verify_webhook_signature(
+        body, request.headers.get("X-Razorpay-Signature", ""), RAZORPAY_WEBHOOK_SECRET
+    ):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+
+    try:
+        outcome = await apply_payment_event(
+            event, orders_collection, checkout_collection, finalize_checkout
+        )
+    except Exception as e:
+        # A 5xx makes Razorpay redeliver the event later
+        raise HTTPException(status_code=500, detail=f"Failed to process webhook: {str(e)}")
+
+    outcome.pop("checkout", None)
+    if outcome["changed"] and outcome["event"] in ("payment.captured", "order.paid", "payment.failed"):
+        order = await orders_collection.find_one(
+            {"razorpay_order_id": outcome["razorpay_order_id"]}, {"status": 1, "user_id": 1, "checkout_id": 1}
+        )
+        if order is not None:
+            get_order_event_bus().publish(order_event(
+                order["status"], outcome["razorpay_order_id"], order.get("user_id"), order.get("checkout_id")
+            ))
+    if outcome.pop("ignored", False):
+        status = "ignored"
+    else:
+        status = "processed" if outcome["changed"] else "duplicate"
+    return {"status": status, **outcome}
+
+
 # Checkout Endpoints
 @app.post("/cart/checkout")
-async def checkout(checkout_info: Checkout):
+async def checkout(checkout_info: Checkout, response: Response):
     """
-    Initiate checkout process with idempotency and amount validation.
+    Initiate checkout process with idempotency, amount validation and a
+    stock hold on every cart line. The cart is read once; per-step timings
+    go to the Server-Timing header.
     """
+    timer = PipelineTimer("checkout")
+    idempotency_key = checkout_info.idempotency_key
+    claim_token = None
+    if idempotency_key:
+        with timer.step("claim"):
+            claim_token, existing = await idempotency_store.claim(idempotency_key)
+        if existing is not None:
+            return existing
+        if claim_token is None:
+            raise HTTPException(
+                status_code=409,
+                detail="A checkout with this idempotency key is already in progress",
+            )
+
     try:
-        # Check idempotency
-        if checkout_info.idempotency_key:
-            exists, existing = await check_idempotency(checkout_info.idempotency_key)
-            if exists and existing:
-                return existing
+        with timer.step("read_cart"):
+            user_cart = await cart_collection.find_one({"user_id": checkout_info.user_id})
 
         # Validate cart amount
-        is_valid, calculated_total = await validate_cart_amount(
-            checkout_info.user_id, checkout_info.total_payment
-        )
+        cart_items = user_cart.get("items", []) if user_cart else []
+        if cart_items:
+            is_valid, calculated_total = svc_validate_cart_amount(
+                cart_items, checkout_info.total_payment
+            )
+        else:
+            is_valid, calculated_total = True, 0.0
         if not is_valid:
             error_msg = f"Amount mismatch. Expected: Rs.{calculated_total}, Received: Rs.{checkout_info.total_payment}"
             result = {
@@ -778,138 +1202,158 @@ async def checkout(checkout_info: Checkout):
                 "message": error_msg,
                 "calculated_total": calculated_total,
             }
-            if checkout_info.idempotency_key:
-                await store_idempotency_result(checkout_info.idempotency_key, result)
+            if idempotency_key:
+                await idempotency_store.complete(idempotency_key, claim_token, result)
+                idempotency_key = None
             raise HTTPException(status_code=400, detail=error_msg)
 
-        # Find the cart for the user
-        user_cart = await cart_collection.find_one({"user_id": checkout_info.user_id})
-
         if not user_cart:
             raise HTTPException(status_code=404, detail="Cart not found for the user")
 
         # Save cart items for checkout
-        order_items = user_cart.get("items", [])
+        order_items = with_price_paise(cart_items)
         total_price = calculated_total
 
+        # Hold stock for every line before the customer is sent to pay
+        checkout_id = ObjectId()
+        try:
+            with timer.step("reserve_stock"):
+                await stock_reservations.reserve(checkout_id, checkout_info.user_id, cart_items)
+        except InsufficientStock as e:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Some items are out of stock", "items": e.shortages},
+            )
+
         # Create checkout record with pending status
         checkout_doc = {
+            "_id": checkout_id,
             "user_id": checkout_info.user_id,
             "items": order_items,
             "total_price": total_price,
+            "subtotal_paise": subtotal_paise(order_items),
+            "total_paise": cart_total_paise(order_items),
             "status": "pending_payment",
             "payment_method": "razorpay",
             "idempotency_key": checkout_info.idempotency_key,
             "razorpay_order_id": None,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now(),
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
         }
 
-        checkout_result = await checkout_collection.insert_one(checkout_doc)
-        checkout_id = str(checkout_result.inserted_id)
+        try:
+            with timer.step("insert_checkout"):
+                await checkout_collection.insert_one(checkout_doc)
+        except Exception:
+            await stock_reservations.release(checkout_id)
+            raise
 
-        response = {
+        response_body = {
             "message": "Checkout initiated successfully",
-            "checkout_id": checkout_id,
+            "checkout_id": str(checkout_id),
             "total_price": total_price,
             "status": "pending_payment",
             "next_step": "Proceed to payment",
         }
 
         # Store idempotency result
-        if checkout_info.idempotency_key:
-            await store_idempotency_result(checkout_info.idempotency_key, response)
+        if idempotency_key:
+            with timer.step("complete_claim"):
+                await idempotency_store.complete(idempotency_key, claim_token, response_body)
+            idempotency_key = None
 
-        return response
+        response.headers["Server-Timing"] = timer.server_timing()
+        return response_body
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+    finally:
+        # Free an unfinished claim so the client can retry
+        if idempotency_key:
+            await idempotency_store.release(idempotency_key, claim_token)
+        timer.finish()
 
 
 @app.post("/cart/complete-checkout")
-async def complete_checkout(complete_request: CompleteCheckoutRequest):
+async def complete_checkout(
+    complete_request: CompleteCheckoutRequest,
+    response: Response,
+):
     """
-    Complete the checkout process after successful payment verification
+    Complete the checkout process after successful payment verification.
+    Reads run concurrently; the status change and the outbox tasks for the
+    cart, eco impact and invoice commit in one transaction. Per-step timings
+    go to the Server-Timing header.
     """
+    timer = PipelineTimer("complete_checkout")
     try:
         if not ObjectId.is_valid(complete_request.order_id):
             raise HTTPException(status_code=400, detail="Invalid order ID")
+        checkout_id = ObjectId(complete_request.order_id)
 
-        # Find the checkout order
-        checkout_order = await checkout_collection.find_one(
-            {"_id": ObjectId(complete_request.order_id)}
-        )
+        # Find the checkout order and verify the payment in parallel
+        with timer.step("read"):
+            checkout_order, payment_verified = await asyncio.gather(
+                checkout_collection.find_one({"_id": checkout_id}, {"status": 1}),
+                orders_collection.find_one(
+                    {
+                        "razorpay_order_id": complete_request.razorpay_order_id,
+                        "razorpay_payment_id": complete_request.razorpay_payment_id,
+                        "status": "paid",
+                    },
+                    {"_id": 1},
+                ),
+            )
 
         if not checkout_order:
             raise HTTPException(status_code=404, detail="Order not found")
 
-        # Verify payment was successful
-        payment_verified = await orders_collection.find_one(
-            {
-                "razorpay_order_id": complete_request.razorpay_order_id,
-                "razorpay_payment_id": complete_request.razorpay_payment_id,
-                "status": "paid",
-            }
-        )
-
         if not payment_verified:
             raise HTTPException(
                 status_code=400, detail="Payment not verified or incomplete"
             )
 
-        # Update checkout status to completed
-        await checkout_collection.update_one(
-            {"_id": ObjectId(complete_request.order_id)},
-            {
-                "$set": {
-                    "status": "completed",
-                    "razorpay_order_id": complete_request.razorpay_order_id,
-                    "razorpay_payment_id": complete_request.razorpay_payment_id,
-                    "updated_at": datetime.now(),
-                }
-            },
-        )
-
-        # Clear the user's cart after successful payment
-        user_id = checkout_order["user_id"]
-        await cart_collection.delete_one({"user_id": user_id})
-
-        # Update Eco-Impact
-        # Simple calculation for demonstration:
-        # CO2: 0.5kg per item, Water: 10L per item, Waste: 0.2kg per item, Trees: 0.01 per item
-        num_items = sum(
-            item.get("quantity", 1) for item in checkout_order.get("items", [])
-        )
-        co2_saved = num_items * 0.5
-        water_saved = num_items * 10.0
-        waste_diverted = num_items * 0.2
-        trees_saved = num_items * 0.01
-
-        await eco_impact_collection.update_one(
-            {"user_id": user_id},
-            {
-                "$inc": {
-                    "co2_saved": co2_saved,
-                    "water_saved": water_saved,
-                    "waste_diverted": waste_diverted,
-                    "trees_saved": trees_saved,
-                },
-                "$set": {"last_updated": datetime.now()},
-                "$addToSet": {"badges": "Eco Shopper"},
-            },
-            upsert=True,
-        )
+        if checkout_order.get("status") != "completed":
+            # Mark completed and queue the cart, eco impact and invoice work,
+            # unless a webhook or the reconciler got there first
+            with timer.step("commit"):
+                completed = await finalize_checkout(
+                    {"_id": checkout_id},
+                    complete_request.razorpay_order_id,
+                    complete_request.razorpay_payment_id,
+                )
+            if completed is None:
+                current = await checkout_collection.find_one({"_id": checkout_id}, {"status": 1})
+                if current is None:
+                    raise HTTPException(status_code=404, detail="Order not found")
+                if current.get("status") == "expired":
+                    # Paid after its stock hold was released
+                    await flag_late_payment(
+                        checkout_collection,
+                        complete_request.razorpay_order_id,
+                        complete_request.razorpay_payment_id,
+                    )
+                if current.get("status") != "completed":
+                    raise HTTPException(
+                        status_code=409,
+                        detail=f"Checkout cannot be completed from status {current.get('status')}",
+                    )
 
+        response.headers["Server-Timing"] = timer.server_timing()
         return {
             "message": "Checkout completed successfully",
             "order_id": complete_request.order_id,
             "status": "completed",
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+    finally:
+        timer.finish()
 
 
 # Order History Endpoints
@@ -926,38 +1370,24 @@ async def get_orders(user_id: str):
     return [checkout_helper(checkout) for checkout in checkout_list]
 
 
-class InvoicePDF(FPDF):
-    def header(self):
-        # Logo or Title
-        self.set_font("Arial", "B", 24)
-        self.set_text_color(16, 185, 129)  # Emerald-500
-        self.cell(0, 20, "REPURPOSE HUB", 0, 1, "C")
-        self.set_font("Arial", "", 10)
-        self.set_text_color(100, 116, 139)  # Slate-500
-        self.cell(0, 5, "Luxury Upcycled Curation Studio", 0, 1, "C")
-        self.ln(10)
-
-    def footer(self):
-        self.set_y(-30)
-        self.set_font("Arial", "I", 8)
-        self.set_text_color(148, 163, 184)
-        self.cell(
-            0,
-            10,
-            "This is a digitally generated invoice. No signature required.",
-            0,
-            1,
-            "C",
-        )
-        self.set_font("Arial", "B", 8)
-        self.set_text_color(16, 185, 129)
-        self.cell(0, 5, "Thank you for choosing sustainability!", 0, 0, "C")
+@app.get("/orders/{user_id}/events")
+async def stream_user_orders(user_id: str):
+    """
+    Server-sent events for every order status change of a user, so the
+    order history page can refresh without polling
+    """
+    subscription = get_order_event_bus().subscribe(user_topic(user_id))
+    return StreamingResponse(
+        event_stream(subscription, stop_on_terminal=False),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/orders/{order_id}/invoice")
 async def get_invoice(order_id: str):
     """
-    Generate and return a PDF invoice for a specific order
+    Return the PDF invoice for a specific order, rendering it on a cache miss
     """
     try:
         if not ObjectId.is_valid(order_id):
@@ -968,177 +1398,19 @@ async def get_invoice(order_id: str):
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
 
-        # Fetch user details
-        user_info = await user_collection.find_one(
-            {"_id": ObjectId(order.get("user_id"))}
+        path = await get_invoice_renderer().get_invoice_path(
+            order, user_collection, eco_impact_collection
         )
-        user_info = user_info or {}
-
-        # Fetch Eco Impact for this user
-        impact = await eco_impact_collection.find_one({"user_id": order.get("user_id")})
-
-        # Create PDF
-        pdf = InvoicePDF()
-        pdf.add_page()
-
-        # Invoice Info
-        pdf.set_font("Arial", "B", 14)
-        pdf.set_text_color(30, 41, 59)  # Slate-900
-        pdf.cell(0, 10, f"TAX INVOICE: #{str(order['_id'])[-8:].upper()}", 0, 1)
-
-        pdf.set_font("Arial", "", 10)
-        pdf.set_text_color(71, 85, 105)  # Slate-600
-        pdf.cell(0, 6, f"Date: {order['created_at'].strftime('%d %B, %Y')}", 0, 1)
-        pdf.cell(
-            0, 6, f"Status: {order['status'].replace('_', ' ').capitalize()}", 0, 1
-        )
-        pdf.ln(10)
-
-        # Customer & Company Info
-        y_top = pdf.get_y()
-        pdf.set_font("Arial", "B", 10)
-        pdf.set_text_color(148, 163, 184)  # Slate-400
-        pdf.cell(95, 8, "BILLED TO", 0, 0)
-        pdf.cell(95, 8, "FROM", 0, 1)
-
-        pdf.set_font("Arial", "B", 11)
-        pdf.set_text_color(30, 41, 59)
-        pdf.cell(95, 6, user_info.get("full_name", "Valued Customer"), 0, 0)
-        pdf.cell(95, 6, "Repurpose Hub Studio", 0, 1)
-
-        pdf.set_font("Arial", "", 10)
-        pdf.set_text_color(71, 85, 105)
-        pdf.cell(95, 5, user_info.get("email", ""), 0, 0)
-        pdf.cell(95, 5, "contact@repurposehub.com", 0, 1)
-        pdf.ln(15)
-
-        # Items Table Header
-        pdf.set_fill_color(248, 250, 252)  # Slate-50
-        pdf.set_font("Arial", "B", 10)
-        pdf.cell(100, 12, " PRODUCT DESCRIPTION", 1, 0, "L", True)
-        pdf.cell(30, 12, "QTY", 1, 0, "C", True)
-        pdf.cell(30, 12, "PRICE", 1, 0, "C", True)
-        pdf.cell(30, 12, "TOTAL", 1, 1, "C", True)
-
-        # Items Table Rows
-        pdf.set_font("Arial", "", 10)
-        items = order.get("items", [])
-        for item in items:
-            # SAFETY: Always favor the captured 'quantity' from the checkout record
-            # If quantity is unusually high (like 100), we ensure we aren't accidentally pulling 'stock'
-            qty = int(item.get("quantity", 1))
-
-            # If both are present and they match exactly 100, it's a legacy stock bug
-            # but we assume the cart data is correct now.
-
-            # Safer price parsing
-            price_str = str(item.get("price", "0"))
-            # Remove "Rs." and whitespace from start, then remove commas
-            clean_price = re.sub(r"^Rs\.\s*", "", price_str)
-            clean_price = clean_price.replace(",", "")
-            price_val = (
-                float(clean_price) if clean_price and clean_price[0].isdigit() else 0.0
-            )
-            total_val = price_val * qty
-
-            pdf.cell(100, 12, f" {item['name'][:45]}...", 1)
-            pdf.cell(30, 12, f"{qty}", 1, 0, "C")
-            pdf.cell(30, 12, f"Rs. {price_val:,.2f}", 1, 0, "C")
-            pdf.cell(30, 12, f"Rs. {total_val:,.2f}", 1, 1, "C")
-
-        # Summary
-        pdf.ln(5)
-        # Use explicit variables for subtotal to avoid any confusion
-        subtotal = 0
-        for item in items:
-            p_str = str(item.get("price", "0"))
-            p_clean = re.sub(r"^Rs\.\s*", "", p_str).replace(",", "")
-            p = float(p_clean) if p_clean and p_clean[0].isdigit() else 0.0
-            q = int(item.get("quantity", 1))
-            subtotal += p * q
-
-        service_fee = subtotal * 0.2
-        total_final = subtotal + service_fee
-
-        pdf.set_x(120)
-        pdf.cell(40, 10, "Subtotal:", 0, 0, "R")
-        pdf.cell(30, 10, f"Rs. {subtotal:,.2f}", 0, 1, "R")
-        pdf.set_x(120)
-        pdf.cell(40, 10, "Service Fee (20%):", 0, 0, "R")
-        pdf.cell(30, 10, f"Rs. {service_fee:,.2f}", 0, 1, "R")
-
-        pdf.ln(2)
-        pdf.set_x(110)
-        pdf.set_fill_color(16, 185, 129)
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(50, 14, " TOTAL AMOUNT CAPTURED", 0, 0, "R", True)
-        pdf.cell(30, 14, f"Rs. {total_final:,.2f} ", 0, 1, "R", True)
-
-        # Sustainability Report Block
-        pdf.ln(20)
-        pdf.set_text_color(30, 41, 59)
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 10, "BEYOND THE PURCHASE: YOUR SUSTAINABILITY IMPACT", 0, 1)
-        pdf.set_draw_color(16, 185, 129)
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-        pdf.ln(5)
-
-        pdf.set_font("Arial", "", 10)
-        pdf.set_text_color(71, 85, 105)
-
-        # Current Order Impact
-        num_items = sum(i.get("quantity", 1) for i in items)
-        pdf.cell(
-            0,
-            8,
-            f"This order alone diverted {num_items * 0.2:.2f}kg of waste and offset {num_items * 0.5:.2f}kg of CO2.",
-            0,
-            1,
-        )
-
-        if impact:
-            pdf.ln(5)
-            pdf.set_font("Arial", "B", 10)
-            pdf.set_text_color(16, 185, 129)
-            pdf.cell(0, 6, "YOUR TOTAL LIFETIME LEGACY:", 0, 1)
-            pdf.set_font("Arial", "", 10)
-            pdf.set_text_color(71, 85, 105)
-            pdf.cell(
-                0,
-                6,
-                f"* Total Carbon Offset: {impact.get('co2_saved', 0):.2f} kg",
-                0,
-                1,
-            )
-            pdf.cell(
-                0,
-                6,
-                f"* Water Resources Saved: {impact.get('water_saved', 0):.2f} Liters",
-                0,
-                1,
-            )
-            pdf.cell(
-                0,
-                6,
-                f"* Waste Diverted: {impact.get('waste_diverted', 0):.2f} kg",
-                0,
-                1,
-            )
-
-        # Return as PDF stream
-        pdf_output = pdf.output(dest="S")
-        if isinstance(pdf_output, str):
-            pdf_output = pdf_output.encode("latin1", errors="replace")
-
-        return Response(
-            content=pdf_output,
+        return FileResponse(
+            path,
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f"attachment; filename=Invoice_{order_id[-8:]}.pdf"
             },
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Invoice Error: {str(e)}")
         raise HTTPException(
@@ -1178,6 +1450,7 @@ async def get_eco_impact(user_id: str):
             "last_updated": datetime.now(),
         }
         result = await eco_impact_collection.insert_one(new_impact)
+        await community_impact.add({}, new_users=1)
         impact = await eco_impact_collection.find_one({"_id": result.inserted_id})
 
     return eco_impact_helper(impact)
@@ -1186,33 +1459,9 @@ async def get_eco_impact(user_id: str):
 @app.get("/community-impact")
 async def get_community_impact():
     """
-    Get aggregate community impact data
+    Get aggregate community impact data (running totals, served from memory)
     """
-    pipeline = [
-        {
-            "$group": {
-                "_id": None,
-                "total_co2": {"$sum": "$co2_saved"},
-                "total_water": {"$sum": "$water_saved"},
-                "total_waste": {"$sum": "$waste_diverted"},
-                "total_trees": {"$sum": "$trees_saved"},
-                "total_users": {"$sum": 1},
-            }
-        }
-    ]
-    cursor = eco_impact_collection.aggregate(pipeline)
-    result = await cursor.to_list(length=1)
-
-    if not result:
-        return {
-            "total_co2": 0.0,
-            "total_water": 0.0,
-            "total_waste": 0.0,
-            "total_trees": 0.0,
-            "total_users": 0,
-        }
-
-    return result[0]
+    return await community_impact.get()
 
 
 # Style Quiz Endpoints
@@ -1252,8 +1501,9 @@ async def admin_create_product(product: ProductCreate):
     Create a new product (Admin only)
     """
     try:
-        product_data = product.dict()
+        product_data = {**product.dict(), "price_paise": to_paise(product.price)}
         result = await product_collection.insert_one(product_data)
+        get_catalog_cache().add(product_helper(product_data))
         return {
             "message": "Product created successfully",
             "id": str(result.inserted_id),
@@ -1265,18 +1515,31 @@ async def admin_create_product(product: ProductCreate):
 @app.put("/admin/products/{product_id}")
 async def admin_update_product(product_id: str, product: ProductCreate):
     """
-    Update an existing product (Admin only)
+    Update an existing product (Admin only). `stock` is the count on hand:
+    units held by pending checkouts are subtracted from it in the same
+    write, so releasing them later does not push stock past that count
     """
     if not ObjectId.is_valid(product_id):
         raise HTTPException(status_code=400, detail="Invalid product ID")
 
     try:
-        result = await product_collection.update_one(
-            {"_id": ObjectId(product_id)}, {"$set": product.dict()}
+        product_data = {**product.dict(), "price_paise": to_paise(product.price)}
+        on_hand = product_data.pop("stock")
+        updated = await product_collection.find_one_and_update(
+            {"_id": ObjectId(product_id)},
+            [{"$set": {
+                **{field: {"$literal": value} for field, value in product_data.items()},
+                "stock": on_hand_stock_expression(on_hand),
+            }}],
+            return_document=ReturnDocument.AFTER,
         )
-        if result.matched_count == 0:
+        if updated is None:
             raise HTTPException(status_code=404, detail="Product not found")
+        get_catalog_cache().put(product_helper(updated))
+        get_stock_view().invalidate([product_id])
         return {"message": "Product updated successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating product: {str(e)}")
 
@@ -1293,36 +1556,48 @@ async def admin_delete_product(product_id: str):
         result = await product_collection.delete_one({"_id": ObjectId(product_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Product not found")
+        get_catalog_cache().remove(product_id)
+        get_stock_view().invalidate([product_id])
         return {"message": "Product deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting product: {str(e)}")
 
 
-@app.get("/admin/analytics")
-async def get_admin_analytics():
+@app.post("/admin/tutorials")
+async def admin_create_tutorial(tutorial: TutorialCreate):
     """
-    Get platform analytics (Admin only)
+    Create a new tutorial (Admin only)
     """
     try:
-        total_products = await product_collection.count_documents({})
-        total_users = await user_collection.count_documents({})
-        total_orders = await checkout_collection.count_documents(
-            {"status": "completed"}
-        )
+        tutorial_data = tutorial.dict()
+        result = await tutorials_collection.insert_one(tutorial_data)
+        get_tutorial_index().add(tutorial_helper(tutorial_data))
+        return {
+            "message": "Tutorial created successfully",
+            "id": str(result.inserted_id),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating tutorial: {str(e)}")
 
-        # Calculate total revenue
-        pipeline = [
-            {"$match": {"status": "completed"}},
-            {"$group": {"_id": None, "total_revenue": {"$sum": "$total_price"}}},
-        ]
-        revenue_result = await checkout_collection.aggregate(pipeline).to_list(length=1)
-        total_revenue = revenue_result[0]["total_revenue"] if revenue_result else 0
 
+@app.get("/admin/analytics")
+async def get_admin_analytics(estimated: bool = False):
+    """
+    Get platform analytics (Admin only); shares the dashboard stats cache
+    """
+    try:
+        stats = await get_dashboard_stats_cache().get(
+            ("dashboard", estimated),
+            lambda: compute_dashboard_stats(
+                user_collection, product_collection, checkout_collection,
+                donations_collection, estimated=estimated,
+            ),
+        )
         return {
-            "total_products": total_products,
-            "total_users": total_users,
-            "total_orders": total_orders,
-            "total_revenue": total_revenue,
+            "total_products": stats["total_products"],
+            "total_users": stats["total_users"],
+            "total_orders": stats["completed_orders"],
+            "total_revenue": stats["total_revenue"],
         }
     except Exception as e:
         raise HTTPException(
@@ -1338,18 +1613,30 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    try:
-        # Test MongoDB connection
-        await db.command("ping")
+    """Liveness: the process is serving requests. Dependency status is
+    reported from the last background probes and never fails this check."""
+    monitor = get_health_monitor()
+    checks = monitor.snapshot()
+    statuses = {name: check["status"] for name, check in checks.items()}
+    return {
+        "status": "healthy" if all(s == "up" for s in statuses.values()) else "degraded",
+        "database": "connected" if statuses.get("database") == "up" else statuses.get("database"),
+        "razorpay": "connected" if statuses.get("razorpay") == "up" else statuses.get("razorpay"),
+        "monitor_running": monitor.running,
+        "checks": checks,
+        "timestamp": datetime.now().isoformat(),
+    }
 
-        # Test Razorpay connection (list orders with limit 1)
-        razorpay_client.order.all({"count": 1})
 
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "razorpay": "connected",
-            "timestamp": datetime.now().isoformat(),
-        }
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Service unhealthy: {str(e)}")
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: every critical dependency passed its latest probe."""
+    monitor = get_health_monitor()
+    body = {
+        "ready": monitor.is_ready(),
+        "checks": monitor.snapshot(),
+        "timestamp": datetime.now().isoformat(),
+    }
+    if not body["ready"]:
+        return JSONResponse(status_code=503, content=body)
+    return body
@@ -0,0 +1,40 @@
+"""Rebuild the daily_stats rollup buckets from users, checkouts and donations.
+
+Usage (from this directory):
+    python backfill_daily_stats.py [--start 2025-01-01] [--end 2025-12-31] [--batch-size 1000]
+
+Run once after deploying the rollups, or again for a range to repair drift
+(for example orders lost from the live counters by a crash). Sources are
+streamed in _id order in batches, and the buckets in the range are
+overwritten with the recomputed counts, so reruns are safe.
+"""
+import argparse
+import asyncio
+from datetime import date
+
+from db import db
+from services.daily_stats import rebuild_daily_stats
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+async def run(start, end, batch_size: int) -> None:
+    await rebuild_daily_stats(
+        db.daily_stats, db.users, db.checkout, db.donations,
+        start=start, end=end, batch_size=batch_size,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--start", type=date.fromisoformat, help="First day (default: all history)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day (default: all history)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    if args.start and args.end and args.end < args.start:
+        parser.error("--end must not be before --start")
+    asyncio.run(run(args.start, args.end, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
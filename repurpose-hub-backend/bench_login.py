@@ -0,0 +1,123 @@
+"""Login throughput benchmark.
+
+In-process (default): verifies N passwords concurrently, first inline on the
+event loop (the old behaviour) and then through the shared PasswordHasher,
+while a probe task measures how late a 5 ms sleep wakes up - a stand-in for
+catalog request latency on the same worker.
+
+    python bench_login.py --logins 64
+
+Against a running server: fires concurrent /login/ requests while polling
+/allProducts/, and reports login throughput and catalog latency.
+
+    python bench_login.py --url http://localhost:8000 --email a@b.c --password secret
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from services.passwords import PasswordHasher, build_crypt_context
+
+PROBE_INTERVAL = 0.005
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def report(label, elapsed, logins, delays_ms):
+    print(
+        f"{label:<10} {logins / elapsed:8.1f} logins/s   "
+        f"loop delay p50 {percentile(delays_ms, 50):7.1f} ms  "
+        f"p99 {percentile(delays_ms, 99):7.1f} ms  max {max(delays_ms, default=0):7.1f} ms"
+    )
+
+
+async def probe(delays_ms, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        delays_ms.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+async def run_in_process(logins: int, workers: int) -> None:
+    context = build_crypt_context()
+    hashed = context.hash("correct horse battery staple")
+    hasher = PasswordHasher(context, max_workers=workers, max_queue=logins)
+
+    async def inline_verify():
+        return context.verify("correct horse battery staple", hashed)
+
+    async def pooled_verify():
+        return await hasher.verify("correct horse battery staple", hashed)
+
+    for label, verify in [("inline", inline_verify), ("executor", pooled_verify)]:
+        delays_ms, stop = [], asyncio.Event()
+        probe_task = asyncio.create_task(probe(delays_ms, stop))
+        await asyncio.sleep(PROBE_INTERVAL * 2)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(verify() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe_task
+        assert all(results)
+        report(label, elapsed, logins, delays_ms)
+
+    print(f"hasher stats: {hasher.stats()}")
+
+
+def run_http(url: str, email: str, password: str, logins: int, concurrency: int) -> None:
+    catalog_ms, done = [], []
+
+    def poll_catalog():
+        with requests.Session() as session:
+            while not done:
+                started = time.perf_counter()
+                session.get(f"{url}/allProducts/", timeout=30)
+                catalog_ms.append((time.perf_counter() - started) * 1000)
+
+    def login(_):
+        response = requests.post(
+            f"{url}/login/", json={"email": email, "password": password}, timeout=30
+        )
+        return response.status_code
+
+    with ThreadPoolExecutor(max_workers=concurrency + 1) as pool:
+        poller = pool.submit(poll_catalog)
+        started = time.perf_counter()
+        statuses = list(pool.map(login, range(logins)))
+        elapsed = time.perf_counter() - started
+        done.append(True)
+        poller.result()
+
+    print(f"logins: {logins / elapsed:.1f}/s, status codes: {sorted(set(statuses))}")
+    if catalog_ms:
+        print(
+            f"catalog latency during logins: p50 {statistics.median(catalog_ms):.1f} ms, "
+            f"p99 {percentile(catalog_ms, 99):.1f} ms over {len(catalog_ms)} requests"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4, help="Hasher threads (in-process mode)")
+    parser.add_argument("--url", help="Benchmark a running server instead")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.url:
+        run_http(args.url.rstrip("/"), args.email, args.password, args.logins, args.concurrency)
+    else:
+        asyncio.run(run_in_process(args.logins, args.workers))
+
+
+if __name__ == "__main__":
+    main()
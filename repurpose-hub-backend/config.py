@@ -1,5 +1,6 @@
 """Shared configuration for the application."""
 import os
+import tempfile
 
 # JWT Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-super-secret-key-change-in-production")
@@ -10,6 +11,93 @@ REFRESH_TOKEN_EXPIRE_DAYS = 7
 # Razorpay Configuration
 RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID", "rzp_test_RZmsXRdoSG9Eu4")
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "L2ogP0mVvA0wSAGdweRJlupr")
+# Point at fake_razorpay.py for offline tests and load tests
+RAZORPAY_BASE_URL = os.getenv("RAZORPAY_BASE_URL", "https://api.razorpay.com")
+RAZORPAY_TIMEOUT_SECONDS = float(os.getenv("RAZORPAY_TIMEOUT_SECONDS", "10"))
+RAZORPAY_CONNECT_TIMEOUT_SECONDS = float(os.getenv("RAZORPAY_CONNECT_TIMEOUT_SECONDS", "3"))
+RAZORPAY_MAX_CONNECTIONS = int(os.getenv("RAZORPAY_MAX_CONNECTIONS", "20"))
+# Webhook signing secret (Dashboard > Webhooks); separate from the API key secret
+RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
+# Reconciliation sweep of checkouts stuck in pending_payment
+PAYMENT_RECONCILE_INTERVAL_SECONDS = float(os.getenv("PAYMENT_RECONCILE_INTERVAL_SECONDS", "300"))
+PAYMENT_RECONCILE_STALE_MINUTES = int(os.getenv("PAYMENT_RECONCILE_STALE_MINUTES", "15"))
+PAYMENT_RECONCILE_EXPIRE_HOURS = int(os.getenv("PAYMENT_RECONCILE_EXPIRE_HOURS", "24"))
+PAYMENT_RECONCILE_BATCH_SIZE = int(os.getenv("PAYMENT_RECONCILE_BATCH_SIZE", "100"))
+PAYMENT_RECONCILE_CONCURRENCY = int(os.getenv("PAYMENT_RECONCILE_CONCURRENCY", "5"))
+# Circuit breaker around Razorpay calls (rolling window, then fail fast while open)
+PAYMENT_BREAKER_WINDOW_SECONDS = float(os.getenv("PAYMENT_BREAKER_WINDOW_SECONDS", "30"))
+PAYMENT_BREAKER_MIN_CALLS = int(os.getenv("PAYMENT_BREAKER_MIN_CALLS", "10"))
+PAYMENT_BREAKER_FAILURE_RATE = float(os.getenv("PAYMENT_BREAKER_FAILURE_RATE", "0.5"))
+PAYMENT_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("PAYMENT_BREAKER_SLOW_CALL_SECONDS", "2"))
+PAYMENT_BREAKER_SLOW_CALL_RATE = float(os.getenv("PAYMENT_BREAKER_SLOW_CALL_RATE", "0.5"))
+PAYMENT_BREAKER_OPEN_SECONDS = float(os.getenv("PAYMENT_BREAKER_OPEN_SECONDS", "15"))
+PAYMENT_BREAKER_HALF_OPEN_CALLS = int(os.getenv("PAYMENT_BREAKER_HALF_OPEN_CALLS", "1"))
+
+# Health Monitor Configuration (background probes; /health and /ready read the results)
+HEALTH_DB_INTERVAL_SECONDS = float(os.getenv("HEALTH_DB_INTERVAL_SECONDS", "5"))
+HEALTH_PAYMENT_INTERVAL_SECONDS = float(os.getenv("HEALTH_PAYMENT_INTERVAL_SECONDS", "30"))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+HEALTH_STALE_AFTER_INTERVALS = float(os.getenv("HEALTH_STALE_AFTER_INTERVALS", "3"))
+
+# Order Events Configuration (SSE / long-poll status push)
+ORDER_EVENTS_QUEUE_SIZE = int(os.getenv("ORDER_EVENTS_QUEUE_SIZE", "16"))
+ORDER_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("ORDER_EVENTS_HEARTBEAT_SECONDS", "15"))
+ORDER_EVENTS_STREAM_SECONDS = float(os.getenv("ORDER_EVENTS_STREAM_SECONDS", "300"))
+ORDER_EVENTS_LONG_POLL_SECONDS = float(os.getenv("ORDER_EVENTS_LONG_POLL_SECONDS", "25"))
+# Republish changes made by other workers; requires MongoDB running as a replica set
+ORDER_EVENTS_CHANGE_STREAMS = os.getenv("ORDER_EVENTS_CHANGE_STREAMS", "false").lower() == "true"
+
+# Outbox Configuration (post-checkout side effects run by background workers)
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "4"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+
+# Inventory Configuration (stock held at checkout until paid, released or expired)
+INVENTORY_HOLD_MINUTES = int(os.getenv("INVENTORY_HOLD_MINUTES", "30"))
+INVENTORY_SWEEP_INTERVAL_SECONDS = float(os.getenv("INVENTORY_SWEEP_INTERVAL_SECONDS", "60"))
+INVENTORY_SWEEP_BATCH_SIZE = int(os.getenv("INVENTORY_SWEEP_BATCH_SIZE", "100"))
+INVENTORY_VIEW_TTL_SECONDS = float(os.getenv("INVENTORY_VIEW_TTL_SECONDS", "2"))
+INVENTORY_VIEW_MAX_ITEMS = int(os.getenv("INVENTORY_VIEW_MAX_ITEMS", "5000"))
+
+# Admin Dashboard Configuration (stats shared by all admins for this long)
+ADMIN_STATS_TTL_SECONDS = float(os.getenv("ADMIN_STATS_TTL_SECONDS", "15"))
+
+# Community Impact Configuration (running totals; the repair recomputes them from eco_impact)
+COMMUNITY_IMPACT_MAX_AGE_SECONDS = float(os.getenv("COMMUNITY_IMPACT_MAX_AGE_SECONDS", "30"))
+COMMUNITY_IMPACT_REPAIR_INTERVAL_SECONDS = float(os.getenv("COMMUNITY_IMPACT_REPAIR_INTERVAL_SECONDS", "3600"))
+
+# Catalog Cache Configuration
+CATALOG_CACHE_TTL_SECONDS = int(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+CATALOG_CACHE_MAX_ITEMS = int(os.getenv("CATALOG_CACHE_MAX_ITEMS", "5000"))
+
+# Tutorial Index Configuration (rebuilt from MongoDB once this old)
+TUTORIAL_INDEX_TTL_SECONDS = float(os.getenv("TUTORIAL_INDEX_TTL_SECONDS", "300"))
+
+# Password Hashing Configuration (argon2; changing these rehashes on next login)
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "3"))
+PASSWORD_HASH_MEMORY_COST = int(os.getenv("PASSWORD_HASH_MEMORY_COST", "65536"))
+PASSWORD_HASH_PARALLELISM = int(os.getenv("PASSWORD_HASH_PARALLELISM", "4"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "256"))
+
+# Auth User Cache Configuration
+AUTH_USER_CACHE_TTL_SECONDS = int(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30"))
+AUTH_USER_CACHE_MAX_ITEMS = int(os.getenv("AUTH_USER_CACHE_MAX_ITEMS", "10000"))
+
+# Idempotency Configuration
+IDEMPOTENCY_TTL_MINUTES = 30
+IDEMPOTENCY_CLAIM_SECONDS = 60
+IDEMPOTENCY_LOCAL_MAX_KEYS = int(os.getenv("IDEMPOTENCY_LOCAL_MAX_KEYS", "10000"))
+
+# Invoice Configuration
+INVOICE_CACHE_DIR = os.getenv(
+    "INVOICE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "repurpose-hub-invoices")
+)
+INVOICE_CACHE_MAX_BYTES = int(os.getenv("INVOICE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+INVOICE_RENDER_WORKERS = int(os.getenv("INVOICE_RENDER_WORKERS", "2"))
+INVOICE_EXPORT_PROCESSES = int(os.getenv("INVOICE_EXPORT_PROCESSES", str(os.cpu_count() or 2)))
+INVOICE_EXPORT_BATCH_SIZE = int(os.getenv("INVOICE_EXPORT_BATCH_SIZE", "32"))
 
 # CORS Configuration
 CORS_ORIGINS = [
@@ -1,5 +1,7 @@
 """Shared database configuration and client."""
 import os
+from typing import Any, Awaitable, Callable, Optional
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
 # MongoDB connection
@@ -20,4 +22,40 @@ orders_collection = db.orders
 wishlist_collection = db.wishlist
 eco_impact_collection = db.eco_impact
 style_preferences_collection = db.style_preferences
-idempotency_collection = db.idempotency
\ No newline at end of file
+idempotency_collection = db.idempotency
+outbox_collection = db.outbox
+stock_reservations_collection = db.stock_reservations
+daily_stats_collection = db.daily_stats
+community_impact_collection = db.community_impact
+
+
+# Multi-document transactions need a replica set or mongos ("auto" detects it;
+# run_all.sh starts a single-node replica set locally)
+MONGODB_TRANSACTIONS = os.getenv("MONGODB_TRANSACTIONS", "auto").lower()
+_transactions_supported: Optional[bool] = None
+
+
+async def transactions_supported() -> bool:
+    global _transactions_supported
+    if _transactions_supported is None:
+        if MONGODB_TRANSACTIONS in ("on", "off"):
+            _transactions_supported = MONGODB_TRANSACTIONS == "on"
+        else:
+            try:
+                hello = await db.command("hello")
+                _transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+            except Exception:
+                _transactions_supported = False
+    return _transactions_supported
+
+
+async def run_in_transaction(callback: Callable[[Any], Awaitable[Any]]) -> Any:
+    """Run ``callback(session)`` as one transaction, retried on transient errors.
+
+    On a standalone server the callback gets ``session=None`` and its writes
+    apply one by one, so callbacks should order them to be safe to re-run.
+    """
+    if not await transactions_supported():
+        return await callback(None)
+    async with await mongo_client.start_session() as session:
+        return await session.with_transaction(callback)
@@ -0,0 +1,114 @@
+"""MongoDB index declarations, applied idempotently at startup."""
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from db import db
+from services.catalog import CATALOG_INDEXES
+
+# Collection name -> indexes it needs, keyed to the queries the app runs
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        IndexModel([("role", ASCENDING), ("created_at", DESCENDING)], name="role_created_at"),
+    ],
+    "products": [
+        IndexModel(keys, name="_".join(field for field, _ in keys))
+        for keys in CATALOG_INDEXES
+    ],
+    "cart": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "wishlist": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "eco_impact": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "style_preferences": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "checkout": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="status_created_at"),
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        IndexModel([("razorpay_order_id", ASCENDING)], name="razorpay_order_id", sparse=True),
+        # Reconciliation sweep of stale pending_payment checkouts
+        IndexModel([("status", ASCENDING), ("updated_at", ASCENDING)], name="status_updated_at"),
+    ],
+    "orders": [
+        IndexModel([("razorpay_order_id", ASCENDING)], name="razorpay_order_id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+    ],
+    "idempotency": [
+        IndexModel([("key", ASCENDING)], name="key_unique", unique=True),
+        # Server-side expiry: documents are removed once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "outbox": [
+        IndexModel([("status", ASCENDING), ("available_at", ASCENDING)], name="status_available_at"),
+        # Finished tasks are kept for a week for debugging, then removed
+        IndexModel([("done_at", ASCENDING)], name="done_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "stock_reservations": [
+        # Sweep of lapsed holds and interrupted releases
+        IndexModel([("status", ASCENDING), ("expires_at", ASCENDING)], name="status_expires_at"),
+        IndexModel([("closed_at", ASCENDING)], name="closed_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "donations": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="status_created_at"),
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+    ],
+    "activity_logs": [
+        IndexModel([("timestamp", DESCENDING)], name="timestamp_desc"),
+        IndexModel([("action", ASCENDING), ("timestamp", DESCENDING)], name="action_timestamp"),
+        IndexModel(
+            [("resource_type", ASCENDING), ("timestamp", DESCENDING)],
+            name="resource_type_timestamp",
+        ),
+    ],
+}
+
+
+async def ensure_indexes(database: AsyncIOMotorDatabase = db) -> Dict[str, Any]:
+    """Create every declared index. Existing identical indexes are a no-op.
+
+    Failures (e.g. duplicates blocking a unique index) are reported per
+    index instead of aborting startup.
+    """
+    report: Dict[str, Any] = {}
+    for collection_name, models in INDEXES.items():
+        created, errors = [], {}
+        for model in models:
+            name = model.document["name"]
+            try:
+                created.extend(await database[collection_name].create_indexes([model]))
+            except Exception as e:
+                errors[name] = str(e)
+        report[collection_name] = {"indexes": created, "errors": errors}
+    return report
+
+
+async def index_usage(database: AsyncIOMotorDatabase = db) -> List[Dict[str, Any]]:
+    """Per-index usage counters from $indexStats for every declared collection."""
+    usage = []
+    for collection_name in INDEXES:
+        stats = await database[collection_name].aggregate([{"$indexStats": {}}]).to_list(
+            length=None
+        )
+        for stat in stats:
+            accesses = stat.get("accesses", {})
+            usage.append(
+                {
+                    "collection": collection_name,
+                    "name": stat.get("name"),
+                    "key": dict(stat.get("key", {})),
+                    "ops": accesses.get("ops", 0),
+                    "since": accesses.get("since"),
+                }
+            )
+    usage.sort(key=lambda entry: (entry["collection"], -entry["ops"]))
+    return usage
@@ -0,0 +1,157 @@
+"""Local stand-in for the Razorpay REST API, for offline tests and load tests.
+
+Implements the endpoints the app calls (create/list/fetch orders, fetch
+payments, list an order's payments) with in-memory state and an optional artificial latency, plus a
+test-only endpoint that "pays" an order and returns the checkout signature.
+
+    python fake_razorpay.py --port 9000 --latency-ms 150
+    RAZORPAY_BASE_URL=http://localhost:9000 uvicorn app:app
+
+Credentials are the same RAZORPAY_KEY_ID / RAZORPAY_KEY_SECRET the app uses.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+
+from config import RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET
+
+app = FastAPI(title="Fake Razorpay")
+basic = HTTPBasic()
+
+LATENCY_SECONDS = float(os.getenv("FAKE_RAZORPAY_LATENCY_MS", "0")) / 1000
+
+orders: Dict[str, Dict[str, Any]] = {}
+payments: Dict[str, Dict[str, Any]] = {}
+
+
+def razorpay_error(status_code: int, description: str) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail={"code": "BAD_REQUEST_ERROR", "description": description},
+    )
+
+
+@app.exception_handler(HTTPException)
+async def error_body(request, exc: HTTPException):
+    detail = exc.detail if isinstance(exc.detail, dict) else {"description": str(exc.detail)}
+    return JSONResponse(status_code=exc.status_code, content={"error": detail})
+
+
+async def authenticated(credentials: HTTPBasicCredentials = Depends(basic)) -> None:
+    if not (
+        secrets.compare_digest(credentials.username, RAZORPAY_KEY_ID)
+        and secrets.compare_digest(credentials.password, RAZORPAY_KEY_SECRET)
+    ):
+        raise razorpay_error(401, "The api key provided is invalid")
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+
+
+def new_id(prefix: str) -> str:
+    return f"{prefix}_{secrets.token_hex(7)}"
+
+
+@app.post("/v1/orders", dependencies=[Depends(authenticated)])
+async def create_order(body: Dict[str, Any]):
+    amount = body.get("amount")
+    if not isinstance(amount, int) or amount < 100:
+        raise razorpay_error(400, "The amount must be atleast INR 1.00")
+    order = {
+        "id": new_id("order"),
+        "entity": "order",
+        "amount": amount,
+        "amount_paid": 0,
+        "amount_due": amount,
+        "currency": body.get("currency", "INR"),
+        "receipt": body.get("receipt"),
+        "notes": body.get("notes") or {},
+        "status": "created",
+        "attempts": 0,
+        "created_at": int(time.time()),
+    }
+    orders[order["id"]] = order
+    return order
+
+
+@app.get("/v1/orders", dependencies=[Depends(authenticated)])
+async def list_orders(count: int = 10):
+    items = list(orders.values())[-count:]
+    return {"entity": "collection", "count": len(items), "items": items}
+
+
+@app.get("/v1/orders/{order_id}", dependencies=[Depends(authenticated)])
+async def fetch_order(order_id: str):
+    if order_id not in orders:
+        raise razorpay_error(400, "The id provided does not exist")
+    return orders[order_id]
+
+
+@app.get("/v1/orders/{order_id}/payments", dependencies=[Depends(authenticated)])
+async def fetch_order_payments(order_id: str):
+    if order_id not in orders:
+        raise razorpay_error(400, "The id provided does not exist")
+    items = [p for p in payments.values() if p["order_id"] == order_id]
+    return {"entity": "collection", "count": len(items), "items": items}
+
+
+@app.get("/v1/payments/{payment_id}", dependencies=[Depends(authenticated)])
+async def fetch_payment(payment_id: str):
+    if payment_id not in payments:
+        raise razorpay_error(400, "The id provided does not exist")
+    return payments[payment_id]
+
+
+@app.post("/_fake/orders/{order_id}/pay")
+async def pay_order(order_id: str, method: Optional[str] = "upi"):
+    """Test-only: capture a payment for an order, as the checkout widget would."""
+    order = orders.get(order_id)
+    if order is None:
+        raise razorpay_error(400, "The id provided does not exist")
+    payment = {
+        "id": new_id("pay"),
+        "entity": "payment",
+        "amount": order["amount"],
+        "currency": order["currency"],
+        "status": "captured",
+        "order_id": order_id,
+        "method": method,
+        "email": "test@example.com",
+        "contact": "+919999999999",
+        "created_at": int(time.time()),
+    }
+    payments[payment["id"]] = payment
+    order.update(status="paid", amount_paid=order["amount"], amount_due=0, attempts=order["attempts"] + 1)
+
+    signature = hmac.new(
+        RAZORPAY_KEY_SECRET.encode(), f"{order_id}|{payment['id']}".encode(), hashlib.sha256
+    ).hexdigest()
+    return {
+        "razorpay_order_id": order_id,
+        "razorpay_payment_id": payment["id"],
+        "razorpay_signature": signature,
+    }
+
+
+def main():
+    import uvicorn
+
+    global LATENCY_SECONDS
+    parser = argparse.ArgumentParser(description="Fake Razorpay API server")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_SECONDS * 1000)
+    args = parser.parse_args()
+    LATENCY_SECONDS = args.latency_ms / 1000
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Pre-serialized, precompressed JSON snapshots served with ETag revalidation."""
+import gzip
+import hashlib
+import json
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}."""
+    codings = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """True if an If-None-Match header matches the given strong ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class EncodedSnapshot:
+    """A JSON payload serialized once, with its ETag and compressed variants."""
+
+    def __init__(self, payload: Any):
+        self.body = json.dumps(
+            jsonable_encoder(payload), separators=(",", ":"), ensure_ascii=False
+        ).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.gzip = gzip.compress(self.body, compresslevel=6)
+        self.br = brotli.compress(self.body) if brotli else None
+
+    def encode_for(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Pick the smallest variant the client accepts: (body, content-encoding)."""
+        accepted = parse_accept_encoding(accept_encoding)
+        if self.br is not None and accepted.get("br", 0) > 0:
+            return self.br, "br"
+        if accepted.get("gzip", 0) > 0:
+            return self.gzip, "gzip"
+        return self.body, None
+
+
+class SnapshotStore:
+    """Keeps one EncodedSnapshot per name, rebuilt only when its version changes."""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Any, EncodedSnapshot]] = {}
+
+    def get(self, name: str, version: Any, build: Callable[[], Any]) -> EncodedSnapshot:
+        entry = self._entries.get(name)
+        if entry is None or entry[0] != version:
+            entry = (version, EncodedSnapshot(build()))
+            self._entries[name] = entry
+        return entry[1]
+
+
+def snapshot_response(snapshot: EncodedSnapshot, request: Request) -> Response:
+    """304 if the client's copy is current, otherwise the precompressed body."""
+    headers = {
+        "ETag": snapshot.etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+    if etag_matches(snapshot.etag, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+
+    body, encoding = snapshot.encode_for(request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Shared snapshot store for collection endpoints
+response_snapshots = SnapshotStore()
@@ -0,0 +1,156 @@
+"""Backfill integer price_paise fields on existing products, carts and checkouts.
+
+Usage (from this directory):
+    python migrate_prices.py [--batch-size 500] [--collection products] [--restart]
+
+Documents are streamed in _id order in batches and updated with one
+bulk_write per batch. After each batch the last _id is checkpointed in the
+``migrations`` collection, so an interrupted run resumes where it stopped.
+Each update is conditional on the source field being unchanged, so a
+concurrent write (which already stores price_paise) is never overwritten.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import UpdateOne
+
+from db import db
+from services.pricing import to_paise, with_price_paise, subtotal_paise, order_total_paise
+
+MIGRATION_NAME = "price_paise"
+DEFAULT_BATCH_SIZE = 500
+
+
+def product_update(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Fields to $set on a product, or None if it is already migrated."""
+    paise = to_paise(doc.get("price", 0))
+    if doc.get("price_paise") == paise:
+        return None
+    return {"price_paise": paise}
+
+
+def cart_update(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Fields to $set on a cart, or None if every line has price_paise."""
+    items = doc.get("items") or []
+    if all("price_paise" in item for item in items):
+        return None
+    return {"items": with_price_paise(items)}
+
+
+def checkout_update(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Fields to $set on a checkout record, or None if it is already migrated."""
+    items = doc.get("items") or []
+    if "total_paise" in doc and all("price_paise" in item for item in items):
+        return None
+    items = with_price_paise(items)
+    return {
+        "items": items,
+        "subtotal_paise": subtotal_paise(items),
+        # Keep the amount that was actually charged rather than recomputing it
+        "total_paise": order_total_paise(doc),
+    }
+
+
+# Collection -> (field the update is derived from, transform)
+MIGRATIONS: Dict[str, Any] = {
+    "products": ("price", product_update),
+    "cart": ("items", cart_update),
+    "checkout": ("items", checkout_update),
+}
+
+
+async def migrate_collection(
+    collection: Any,
+    checkpoints: Any,
+    source_field: str,
+    transform: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Callable[[str], None] = print,
+) -> Dict[str, Any]:
+    """Migrate one collection, resuming from its checkpoint. Returns the final state."""
+    checkpoint_id = f"{MIGRATION_NAME}:{collection.name}"
+    state = await checkpoints.find_one({"_id": checkpoint_id}) or {}
+    if state.get("completed_at"):
+        progress(f"{collection.name}: already migrated")
+        return state
+
+    last_id = state.get("last_id")
+    scanned = state.get("scanned", 0)
+    updated = state.get("updated", 0)
+    total = await collection.estimated_document_count()
+
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        batch = (
+            await collection.find(query)
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(length=batch_size)
+        )
+        if not batch:
+            break
+
+        ops = []
+        for doc in batch:
+            update = transform(doc)
+            if update is not None:
+                ops.append(
+                    UpdateOne(
+                        {"_id": doc["_id"], source_field: doc.get(source_field)},
+                        {"$set": update},
+                    )
+                )
+        if ops:
+            result = await collection.bulk_write(ops, ordered=False)
+            updated += result.modified_count
+
+        last_id = batch[-1]["_id"]
+        scanned += len(batch)
+        await checkpoints.update_one(
+            {"_id": checkpoint_id},
+            {
+                "$set": {
+                    "last_id": last_id,
+                    "scanned": scanned,
+                    "updated": updated,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+            upsert=True,
+        )
+        progress(f"{collection.name}: {scanned}/~{total} scanned, {updated} updated")
+
+    state = {"last_id": last_id, "scanned": scanned, "updated": updated,
+             "completed_at": datetime.utcnow()}
+    await checkpoints.update_one({"_id": checkpoint_id}, {"$set": state}, upsert=True)
+    progress(f"{collection.name}: done, {updated} of {scanned} documents updated")
+    return state
+
+
+async def run(collections, batch_size: int, restart: bool) -> None:
+    checkpoints = db.migrations
+    for name in collections:
+        if restart:
+            await checkpoints.delete_one({"_id": f"{MIGRATION_NAME}:{name}"})
+        source_field, transform = MIGRATIONS[name]
+        await migrate_collection(db[name], checkpoints, source_field, transform, batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--collection", action="append", choices=list(MIGRATIONS),
+        help="Collection to migrate (repeatable, default: all)",
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore saved checkpoints and rescan"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.collection or list(MIGRATIONS), args.batch_size, args.restart))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from bson import ObjectId
 
@@ -36,11 +36,17 @@ class ProductResponse(BaseModel):
     id: str
     name: str
     price: str
+    price_paise: int = 0
     stock: int
     companyname: str
     imageurl: str
 
 
+class ProductBatchRequest(BaseModel):
+    ids: List[str]
+    fields: Optional[str] = None
+
+
 class ProductCreate(BaseModel):
     name: str
     price: str
@@ -49,6 +55,17 @@ class ProductCreate(BaseModel):
     image_url: str
 
 
+# Tutorial Models
+class TutorialCreate(BaseModel):
+    title: str
+    desc: str = ""
+    author: str = ""
+    yt_link: str
+    img_src: Optional[str] = None
+    timing: Optional[str] = None
+    date_added: Optional[str] = None
+
+
 class CartItem(BaseModel):
     id: str
     quantity: int
@@ -63,6 +80,21 @@ class Cart(BaseModel):
     items: List[CartItem]
 
 
+class CartQuantity(BaseModel):
+    id: str
+    quantity: int
+
+
+class CartQuantitiesUpdate(BaseModel):
+    user_id: str
+    items: List[CartQuantity]
+
+
+class RemoveItemsRequest(BaseModel):
+    user_id: str
+    item_ids: List[str]
+
+
 # Wishlist Models
 class WishlistItem(BaseModel):
     id: str
@@ -104,9 +136,11 @@ class Donation(BaseModel):
 
 # Razorpay Payment Models
 class CreateOrderRequest(BaseModel):
-    amount: float
-    currency: str = "INR"
+    checkout_id: str
     user_id: str
+    currency: str = "INR"
+    # Ignored: the checkout's own total is charged
+    amount: Optional[float] = None
 
 
 class VerifyPaymentRequest(BaseModel):
@@ -186,6 +220,9 @@ class AdminStats(BaseModel):
     processing_donations: int
     new_users_today: int
     revenue_today: float
+    # True when the unfiltered totals are metadata estimates
+    estimated: bool = False
+    computed_at: Optional[datetime] = None
 
 
 class SystemMetrics(BaseModel):
@@ -196,6 +233,9 @@ class SystemMetrics(BaseModel):
     api_requests_today: int
     error_rate: float
     uptime: str
+    password_hashing: Dict[str, Any] = {}
+    payment_gateway: Dict[str, Any] = {}
+    request_steps: Dict[str, Any] = {}
 
 
 # Exports for convenient importing
@@ -204,8 +244,12 @@ __all__ = [
     "Login",
     "ProductResponse",
     "ProductCreate",
+    "TutorialCreate",
     "CartItem",
     "Cart",
+    "CartQuantity",
+    "CartQuantitiesUpdate",
+    "RemoveItemsRequest",
     "WishlistItem",
     "Wishlist",
     "Checkout",
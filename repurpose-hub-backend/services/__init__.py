@@ -1,25 +1,176 @@
 """Services package - business logic modules."""
-from .cart import calculate_cart_total, validate_cart_amount, parse_price
-from .payment import get_razorpay_client, create_order, verify_payment_signature, get_payment_status
+from .cart import (
+    calculate_cart_total, validate_cart_amount, parse_price, merge_cart_items,
+    build_add_items_update, build_set_quantities_update, build_add_unique_items_update,
+    apply_items_update,
+)
+from .payment import (
+    RazorpayGateway, PaymentGatewayError, PaymentGatewayUnavailable, get_payment_gateway,
+    create_order, verify_payment_signature, get_payment_status,
+)
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .health import DependencyCheck, HealthMonitor, get_health_monitor
+from .order_events import (
+    OrderEventBus, get_order_event_bus, order_event, order_topic, user_topic,
+    watch_order_changes, event_stream, TERMINAL_STATUSES,
+)
+from .latency import StepLatencies, PipelineTimer, get_step_latencies
 from .eco_impact import calculate_item_impact, calculate_total_impact, get_impact_summary
-from .checkout import create_order_record, update_order_status, complete_checkout
+from .community_impact import CommunityImpact, community_totals_pipeline
+from .checkout import (
+    create_order_record, update_order_status, complete_checkout, finalize_paid_checkout,
+    credit_checkout_impact, create_checkout_payment_order, CheckoutNotPayable,
+    CHECKOUT_COMPLETED_TASKS,
+)
+from .inventory import (
+    StockReservations, StockView, InsufficientStock, get_stock_view, ensure_stock_field,
+    stock_on_hand, on_hand_stock_expression,
+)
+from .outbox import OutboxWorker, outbox_task, outbox_backlog
+from .reconciliation import (
+    verify_webhook_signature, mark_order_paid, flag_late_payment, apply_payment_event,
+    PaymentReconciler,
+)
+from .admin_stats import (
+    compute_dashboard_stats, DashboardStatsCache, get_dashboard_stats_cache,
+)
+from .daily_stats import (
+    record_daily, record_completed_order, query_series, series_range, rebuild_daily_stats,
+)
+from .tutorial_search import TutorialIndex, get_tutorial_index
+from .catalog_cache import CatalogCache, get_catalog_cache
+from .passwords import PasswordHasher, PasswordHasherBusy, get_password_hasher
+from .user_cache import UserCache, get_user_cache, load_user
+from .idempotency import IdempotencyStore, IdempotencyConflict
+from .pricing import (
+    to_paise, paise_to_rupees, item_price_paise, with_price_paise, subtotal_paise,
+    cart_total_paise, order_total_paise,
+)
+from .invoice import (
+    render_invoice, InvoiceCache, InvoiceRenderer, get_invoice_renderer, export_invoices_zip,
+)
+from .catalog import (
+    format_product, parse_fields, fetch_product_page, fetch_all_products,
+    fetch_products_by_ids,
+)
 
 __all__ = [
     # Cart
     "calculate_cart_total",
     "validate_cart_amount", 
     "parse_price",
+    "merge_cart_items",
+    "build_add_items_update",
+    "build_set_quantities_update",
+    "build_add_unique_items_update",
+    "apply_items_update",
     # Payment
-    "get_razorpay_client",
+    "RazorpayGateway",
+    "PaymentGatewayError",
+    "PaymentGatewayUnavailable",
+    "get_payment_gateway",
     "create_order",
     "verify_payment_signature",
     "get_payment_status",
+    # Circuit Breaker
+    "CircuitBreaker",
+    "CircuitOpenError",
+    # Health
+    "DependencyCheck",
+    "HealthMonitor",
+    "get_health_monitor",
+    # Order Events
+    "OrderEventBus",
+    "get_order_event_bus",
+    "order_event",
+    "order_topic",
+    "user_topic",
+    "watch_order_changes",
+    "event_stream",
+    "TERMINAL_STATUSES",
+    # Latency
+    "StepLatencies",
+    "PipelineTimer",
+    "get_step_latencies",
     # Eco Impact
     "calculate_item_impact",
     "calculate_total_impact",
     "get_impact_summary",
+    # Community Impact
+    "CommunityImpact",
+    "community_totals_pipeline",
     # Checkout
     "create_order_record",
     "update_order_status",
     "complete_checkout",
+    "finalize_paid_checkout",
+    "credit_checkout_impact",
+    "create_checkout_payment_order",
+    "CheckoutNotPayable",
+    "CHECKOUT_COMPLETED_TASKS",
+    # Inventory
+    "StockReservations",
+    "StockView",
+    "InsufficientStock",
+    "get_stock_view",
+    "ensure_stock_field",
+    "stock_on_hand",
+    "on_hand_stock_expression",
+    # Outbox
+    "OutboxWorker",
+    "outbox_task",
+    "outbox_backlog",
+    # Reconciliation
+    "verify_webhook_signature",
+    "mark_order_paid",
+    "flag_late_payment",
+    "apply_payment_event",
+    "PaymentReconciler",
+    # Admin Stats
+    "compute_dashboard_stats",
+    "DashboardStatsCache",
+    "get_dashboard_stats_cache",
+    # Daily Stats
+    "record_daily",
+    "record_completed_order",
+    "query_series",
+    "series_range",
+    "rebuild_daily_stats",
+    # Tutorial Search
+    "TutorialIndex",
+    "get_tutorial_index",
+    # Catalog Cache
+    "CatalogCache",
+    "get_catalog_cache",
+    # Passwords
+    "PasswordHasher",
+    "PasswordHasherBusy",
+    "get_password_hasher",
+    # User Cache
+    "UserCache",
+    "get_user_cache",
+    "load_user",
+    # Idempotency
+    "IdempotencyStore",
+    "IdempotencyConflict",
+    # Pricing
+    "to_paise",
+    "paise_to_rupees",
+    "item_price_paise",
+    "with_price_paise",
+    "subtotal_paise",
+    "cart_total_paise",
+    "order_total_paise",
+    # Invoice
+    "render_invoice",
+    "InvoiceCache",
+    "InvoiceRenderer",
+    "get_invoice_renderer",
+    "export_invoices_zip",
+    # Catalog
+    "format_product",
+    "parse_fields",
+    "fetch_product_page",
+    "fetch_all_products",
+    "fetch_products_by_ids",
 ]
\ No newline at end of file
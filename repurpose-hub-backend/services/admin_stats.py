@@ -0,0 +1,162 @@
+"""Admin stats service - dashboard counters from one aggregation per collection."""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import ADMIN_STATS_TTL_SECONDS
+from .pricing import paise_to_rupees
+
+# Checkout statuses counted as pending on the dashboard
+PENDING_ORDER_STATUSES = ["pending", "pending_payment"]
+
+# Charged total in paise; legacy checkouts only have the float total_price
+ORDER_PAISE = {
+    "$ifNull": ["$total_paise", {"$round": [{"$multiply": [{"$ifNull": ["$total_price", 0]}, 100]}, 0]}]
+}
+
+
+def _count(facet: List[Dict[str, Any]]) -> int:
+    return facet[0]["n"] if facet else 0
+
+
+def checkout_stats_pipeline(today: datetime, exact_total: bool) -> List[Dict[str, Any]]:
+    facets: Dict[str, Any] = {
+        "pending": [{"$match": {"status": {"$in": PENDING_ORDER_STATUSES}}}, {"$count": "n"}],
+        "revenue": [
+            {"$match": {"status": "completed"}},
+            {"$group": {
+                "_id": None,
+                "orders": {"$sum": 1},
+                "total_paise": {"$sum": ORDER_PAISE},
+                "today_paise": {"$sum": {"$cond": [{"$gte": ["$created_at", today]}, ORDER_PAISE, 0]}},
+            }},
+        ],
+    }
+    if exact_total:
+        return [{"$facet": {"total": [{"$count": "n"}], **facets}}]
+    # Without the total only these statuses matter, and the status index can skip the rest
+    return [
+        {"$match": {"status": {"$in": PENDING_ORDER_STATUSES + ["completed"]}}},
+        {"$facet": facets},
+    ]
+
+
+def counts_pipeline(named_filters: Dict[str, Dict[str, Any]], exact_total: bool) -> List[Dict[str, Any]]:
+    """One pass computing a count per filter, plus the total if ``exact_total``."""
+    facets = {name: [{"$match": query}, {"$count": "n"}] for name, query in named_filters.items()}
+    if exact_total:
+        facets["total"] = [{"$count": "n"}]
+    return [{"$facet": facets}]
+
+
+async def _facet(collection: Any, pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+    result = await collection.aggregate(pipeline).to_list(length=1)
+    return result[0] if result else {}
+
+
+async def compute_dashboard_stats(
+    users: Any,
+    products: Any,
+    checkouts: Any,
+    donations: Any,
+    estimated: bool = False,
+    today: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Dashboard counters, with every collection queried concurrently.
+
+    With ``estimated`` the unfiltered totals come from collection metadata
+    (``estimatedDocumentCount``) instead of a full count, which keeps the
+    cost flat as collections grow; the filtered counts and revenue stay
+    exact.
+    """
+    today = today or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    exact = not estimated
+    collections = (users, products, checkouts, donations)
+    user_facet, checkout_facet, donation_facet, *totals = await asyncio.gather(
+        _facet(users, counts_pipeline({"new_today": {"created_at": {"$gte": today}}}, exact)),
+        _facet(checkouts, checkout_stats_pipeline(today, exact)),
+        _facet(donations, counts_pipeline({"processing": {"status": "Processing"}}, exact)),
+        *(
+            [collection.estimated_document_count() for collection in collections]
+            if estimated else [products.count_documents({})]
+        ),
+    )
+    if estimated:
+        total_users, total_products, total_orders, total_donations = totals
+    else:
+        total_users = _count(user_facet["total"])
+        total_products = totals[0]
+        total_orders = _count(checkout_facet["total"])
+        total_donations = _count(donation_facet["total"])
+    revenue = (checkout_facet.get("revenue") or [{}])[0]
+    return {
+        "total_users": total_users,
+        "total_products": total_products,
+        "total_orders": total_orders,
+        "total_donations": total_donations,
+        "completed_orders": revenue.get("orders", 0),
+        "total_revenue": paise_to_rupees(int(revenue.get("total_paise", 0))),
+        "revenue_today": paise_to_rupees(int(revenue.get("today_paise", 0))),
+        "pending_orders": _count(checkout_facet.get("pending", [])),
+        "processing_donations": _count(donation_facet.get("processing", [])),
+        "new_users_today": _count(user_facet.get("new_today", [])),
+        "estimated": estimated,
+        "computed_at": datetime.now(),
+    }
+
+
+class DashboardStatsCache:
+    """Short-lived cache of computed dashboard stats, shared by all admins.
+
+    Concurrent requests for an expired entry wait for one recomputation
+    instead of each running the aggregations.
+    """
+
+    def __init__(self, ttl_seconds: float = ADMIN_STATS_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: Dict[Any, Tuple[float, Dict[str, Any]]] = {}
+        self._locks: Dict[Any, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, key: Any) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None and self._clock() - entry[0] < self.ttl_seconds:
+            return entry[1]
+        return None
+
+    async def get(self, key: Any, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        cached = self._fresh(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            cached = self._fresh(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+            value = await compute()
+            self._entries[key] = (self._clock(), value)
+            return value
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "ttl_seconds": self.ttl_seconds}
+
+
+# Shared cache instance
+_dashboard_stats_cache: Optional[DashboardStatsCache] = None
+
+
+def get_dashboard_stats_cache() -> DashboardStatsCache:
+    """Get or create the shared dashboard stats cache."""
+    global _dashboard_stats_cache
+    if _dashboard_stats_cache is None:
+        _dashboard_stats_cache = DashboardStatsCache()
+    return _dashboard_stats_cache
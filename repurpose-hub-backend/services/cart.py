@@ -1,11 +1,13 @@
-"""Cart service - pure cart operations."""
-import re
+"""Cart service - cart pricing, item cleanup and atomic cart/wishlist item updates."""
 from typing import List, Dict, Any, Tuple
 
+from pymongo.errors import DuplicateKeyError
+
+from .pricing import to_paise, item_price_paise, cart_total_paise, paise_to_rupees
+
 def parse_price(price_str: str) -> float:
     """Parse price string to float. Handles 'Rs.' prefix and comma separators."""
-    clean_price = re.sub(r"^Rs\.\s*", "", str(price_str)).replace(",", "")
-    return float(clean_price) if clean_price and clean_price[0].isdigit() else 0.0
+    return paise_to_rupees(to_paise(price_str))
 
 
 def calculate_cart_total(items: List[Dict[str, Any]], service_fee_rate: float = 1.2) -> float:
@@ -18,13 +20,7 @@ def calculate_cart_total(items: List[Dict[str, Any]], service_fee_rate: float =
     Returns:
         Total including service fee, rounded to 2 decimals
     """
-    total = 0.0
-    for item in items:
-        price = parse_price(item.get("price", "0"))
-        qty = int(item.get("quantity", 1))
-        total += price * qty
-    
-    return round(total * service_fee_rate, 2)
+    return paise_to_rupees(cart_total_paise(items, service_fee_rate))
 
 
 def validate_cart_amount(items: List[Dict[str, Any]], expected_total: float) -> Tuple[bool, float]:
@@ -43,4 +39,195 @@ def validate_cart_amount(items: List[Dict[str, Any]], expected_total: float) ->
     tolerance = calculated_total * 0.01
     is_valid = abs(calculated_total - expected_total) <= tolerance
     
-    return is_valid, calculated_total
\ No newline at end of file
+    return is_valid, calculated_total
+
+def clean_cart_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only CartItem fields so product stock never leaks into the cart."""
+    return {
+        "id": str(item["id"]),
+        "name": str(item["name"]),
+        "price": str(item["price"]),
+        "price_paise": item_price_paise(item),
+        "quantity": int(item["quantity"]),
+        "companyname": str(item["companyname"]),
+        "imageurl": str(item["imageurl"]),
+    }
+
+
+def merge_cart_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collapse repeated ids in one request into a single line with summed quantity."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        item = clean_cart_item(item)
+        if item["id"] in merged:
+            merged[item["id"]]["quantity"] += item["quantity"]
+        else:
+            merged[item["id"]] = item
+    return list(merged.values())
+
+
+def build_add_items_update(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Pipeline update that adds items to a cart in one atomic write.
+
+    Lines already in the cart get their quantity incremented; new lines are
+    appended. Works with upsert=True for a cart that does not exist yet.
+    """
+    incoming = {"$literal": merge_cart_items(items)}
+    existing = {"$ifNull": ["$items", []]}
+    return [
+        {
+            "$set": {
+                "items": {
+                    "$concatArrays": [
+                        {
+                            "$map": {
+                                "input": existing,
+                                "as": "item",
+                                "in": {
+                                    "$let": {
+                                        "vars": {
+                                            "match": {
+                                                "$filter": {
+                                                    "input": incoming,
+                                                    "as": "new",
+                                                    "cond": {"$eq": ["$$new.id", "$$item.id"]},
+                                                }
+                                            }
+                                        },
+                                        "in": {
+                                            "$cond": [
+                                                {"$gt": [{"$size": "$$match"}, 0]},
+                                                {
+                                                    "$mergeObjects": [
+                                                        "$$item",
+                                                        {
+                                                            "quantity": {
+                                                                "$add": [
+                                                                    "$$item.quantity",
+                                                                    {"$arrayElemAt": ["$$match.quantity", 0]},
+                                                                ]
+                                                            }
+                                                        },
+                                                    ]
+                                                },
+                                                "$$item",
+                                            ]
+                                        },
+                                    }
+                                },
+                            }
+                        },
+                        {
+                            "$filter": {
+                                "input": incoming,
+                                "as": "new",
+                                "cond": {
+                                    "$eq": [
+                                        {"$in": ["$$new.id", {"$map": {"input": existing, "in": "$$this.id"}}]},
+                                        False,
+                                    ]
+                                },
+                            }
+                        },
+                    ]
+                }
+            }
+        }
+    ]
+
+
+def build_set_quantities_update(quantities: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Pipeline update that sets absolute quantities for several lines at once.
+
+    Lines set to 0 or less are removed; ids not in the cart are ignored.
+    """
+    updates = {"$literal": [{"id": k, "quantity": int(v)} for k, v in quantities.items()]}
+    return [
+        {
+            "$set": {
+                "items": {
+                    "$map": {
+                        "input": {"$ifNull": ["$items", []]},
+                        "as": "item",
+                        "in": {
+                            "$let": {
+                                "vars": {
+                                    "match": {
+                                        "$filter": {
+                                            "input": updates,
+                                            "as": "u",
+                                            "cond": {"$eq": ["$$u.id", "$$item.id"]},
+                                        }
+                                    }
+                                },
+                                "in": {
+                                    "$cond": [
+                                        {"$gt": [{"$size": "$$match"}, 0]},
+                                        {
+                                            "$mergeObjects": [
+                                                "$$item",
+                                                {"quantity": {"$arrayElemAt": ["$$match.quantity", 0]}},
+                                            ]
+                                        },
+                                        "$$item",
+                                    ]
+                                },
+                            }
+                        },
+                    }
+                }
+            }
+        },
+        {
+            "$set": {
+                "items": {
+                    "$filter": {
+                        "input": "$items",
+                        "as": "item",
+                        "cond": {"$gt": ["$$item.quantity", 0]},
+                    }
+                }
+            }
+        },
+    ]
+
+
+def build_add_unique_items_update(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Pipeline update that appends items whose id is not already present (wishlist)."""
+    unique: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        unique.setdefault(str(item["id"]), item)
+    incoming = {"$literal": list(unique.values())}
+    existing = {"$ifNull": ["$items", []]}
+    return [
+        {
+            "$set": {
+                "items": {
+                    "$concatArrays": [
+                        existing,
+                        {
+                            "$filter": {
+                                "input": incoming,
+                                "as": "new",
+                                "cond": {
+                                    "$eq": [
+                                        {"$in": ["$$new.id", {"$map": {"input": existing, "in": "$$this.id"}}]},
+                                        False,
+                                    ]
+                                },
+                            }
+                        },
+                    ]
+                }
+            }
+        }
+    ]
+
+
+async def apply_items_update(collection: Any, user_id: str, pipeline: List[Dict[str, Any]]) -> Any:
+    """Run an items pipeline update against a user's cart/wishlist, creating it if needed."""
+    try:
+        return await collection.update_one({"user_id": user_id}, pipeline, upsert=True)
+    except DuplicateKeyError:
+        # A concurrent request created the document first; apply on top of it
+        return await collection.update_one({"user_id": user_id}, pipeline)
@@ -0,0 +1,175 @@
+"""Catalog service - product queries with keyset pagination, filters and projection."""
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from .pricing import to_paise
+
+# Public product field -> stored field names, in lookup order
+PRODUCT_FIELDS = {
+    "name": ["name"],
+    "price": ["price"],
+    # Documents not yet migrated fall back to parsing the display price
+    "price_paise": ["price_paise", "price"],
+    "stock": ["stock", "quantity"],
+    "companyname": ["companyName", "companyname"],
+    "imageurl": ["image_url", "imageurl"],
+}
+
+FIELD_DEFAULTS = {"name": "", "price": "", "price_paise": 0, "stock": 0, "companyname": "", "imageurl": ""}
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_BATCH_IDS = 100
+
+# Filters are equality matches followed by the _id range of the keyset cursor
+CATALOG_INDEXES = [
+    [("companyName", 1), ("_id", 1)],
+    [("vendor", 1), ("_id", 1)],
+    [("price_paise", 1), ("_id", 1)],
+]
+
+
+def format_product(doc: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Convert a product document to its API shape, limited to `fields` if given."""
+    product = {"id": str(doc["_id"])}
+    for field in fields or PRODUCT_FIELDS:
+        value = FIELD_DEFAULTS[field]
+        for stored in PRODUCT_FIELDS[field]:
+            if stored in doc:
+                value = doc[stored]
+                break
+        if field == "price_paise" and not isinstance(value, int):
+            value = to_paise(value)
+        product[field] = value
+    return product
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated field list. Raises ValueError on unknown fields."""
+    if not fields:
+        return None
+    requested = [f.strip().lower() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in PRODUCT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def build_projection(fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+    """Mongo projection for the stored fields backing the requested API fields."""
+    if fields is None:
+        return None
+    return {stored: 1 for field in fields for stored in PRODUCT_FIELDS[field]}
+
+
+def build_product_filter(
+    company: Optional[str] = None,
+    vendor: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    after: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build the Mongo filter for a catalog page. Raises ValueError on a bad cursor."""
+    query: Dict[str, Any] = {}
+    if company:
+        query["companyName"] = company
+    if vendor:
+        query["vendor"] = vendor
+
+    # Bounds are in rupees; products store integer paise
+    price_bounds = {}
+    if min_price is not None:
+        price_bounds["$gte"] = to_paise(min_price)
+    if max_price is not None:
+        price_bounds["$lte"] = to_paise(max_price)
+    if price_bounds:
+        query["price_paise"] = price_bounds
+
+    if after:
+        if not ObjectId.is_valid(after):
+            raise ValueError("Invalid cursor")
+        query["_id"] = {"$gt": ObjectId(after)}
+
+    return query
+
+
+async def fetch_product_page(
+    collection: Any,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    company: Optional[str] = None,
+    vendor: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    fields: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page of products ordered by _id.
+
+    Returns (products, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = build_product_filter(company, vendor, min_price, max_price, cursor)
+
+    docs = (
+        await collection.find(query, build_projection(fields))
+        .sort("_id", 1)
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+
+    next_cursor = str(docs[limit - 1]["_id"]) if len(docs) > limit else None
+    return [format_product(doc, fields) for doc in docs[:limit]], next_cursor
+
+
+async def fetch_all_products(collection: Any) -> List[Dict[str, Any]]:
+    """Walk every catalog page; used by the unpaginated /allProducts/ endpoint."""
+    products: List[Dict[str, Any]] = []
+    cursor = None
+    while True:
+        page, cursor = await fetch_product_page(collection, MAX_PAGE_SIZE, cursor)
+        products.extend(page)
+        if cursor is None:
+            return products
+
+
+async def fetch_products_by_ids(
+    collection: Any,
+    product_ids: List[str],
+    cache: Any = None,
+    fields: Optional[List[str]] = None,
+) -> List[Optional[Dict[str, Any]]]:
+    """Look up many products at once, in request order, with None for unknown ids.
+
+    Cached products are used as-is; the rest come from one ``$in`` query
+    limited to the public fields. Full products fetched that way are
+    added to the cache. Raises ValueError past MAX_BATCH_IDS ids.
+    """
+    if len(product_ids) > MAX_BATCH_IDS:
+        raise ValueError(f"At most {MAX_BATCH_IDS} ids per request")
+
+    found: Dict[str, Dict[str, Any]] = {}
+    missing: List[ObjectId] = []
+    for product_id in dict.fromkeys(product_ids):
+        cached = cache.get(product_id) if cache is not None else None
+        if cached is not None:
+            found[product_id] = cached
+        elif ObjectId.is_valid(product_id):
+            missing.append(ObjectId(product_id))
+
+    if missing:
+        docs = await collection.find(
+            {"_id": {"$in": missing}}, build_projection(fields or list(PRODUCT_FIELDS))
+        ).to_list(length=len(missing))
+        for doc in docs:
+            product = format_product(doc, fields)
+            if cache is not None and fields is None:
+                cache.put(product)
+            found[product["id"]] = product
+
+    def shape(product: Dict[str, Any]) -> Dict[str, Any]:
+        if fields is None:
+            return product
+        return {"id": product["id"], **{field: product[field] for field in fields}}
+
+    return [shape(found[pid]) if pid in found else None for pid in product_ids]
@@ -0,0 +1,123 @@
+"""Catalog cache service - in-process product snapshot with TTL and write-through."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from config import CATALOG_CACHE_TTL_SECONDS, CATALOG_CACHE_MAX_ITEMS
+
+
+class CatalogCache:
+    """Product list snapshot plus a bounded by-id map, both expiring after a TTL.
+
+    Admin writes patch or invalidate entries immediately in this process;
+    the TTL bounds staleness for writes made through other workers.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = CATALOG_CACHE_TTL_SECONDS,
+        max_items: int = CATALOG_CACHE_MAX_ITEMS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self._clock = clock
+        self._snapshot: Optional[List[Dict[str, Any]]] = None
+        self._snapshot_at = 0.0
+        self._by_id: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Bumped whenever the snapshot contents change
+        self.version = 0
+        # Serializes reloads so an expiry triggers one query, not one per request
+        self.lock = asyncio.Lock()
+
+    def _fresh(self, stored_at: float) -> bool:
+        return self._clock() - stored_at < self.ttl_seconds
+
+    def get_snapshot(self) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached product list, or None if missing or expired."""
+        if self._snapshot is not None and self._fresh(self._snapshot_at):
+            self.hits += 1
+            return self._snapshot
+        self.misses += 1
+        return None
+
+    def set_snapshot(self, products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Store a freshly loaded product list and index its entries by id."""
+        now = self._clock()
+        self._snapshot = list(products)
+        self._snapshot_at = now
+        self.version += 1
+        for product in self._snapshot:
+            self._store(product, now)
+        return self._snapshot
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Return a cached product by id, or None if missing or expired."""
+        entry = self._by_id.get(product_id)
+        if entry is not None and self._fresh(entry[0]):
+            self._by_id.move_to_end(product_id)
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self._by_id[product_id]
+        self.misses += 1
+        return None
+
+    def put(self, product: Dict[str, Any]) -> None:
+        """Cache a single product and patch it into the snapshot if listed there."""
+        self._store(product, self._clock())
+        if self._snapshot is not None:
+            for i, existing in enumerate(self._snapshot):
+                if existing["id"] == product["id"]:
+                    self._snapshot[i] = product
+                    self.version += 1
+                    break
+
+    def add(self, product: Dict[str, Any]) -> None:
+        """Cache a newly created product; the list snapshot is reloaded on next read."""
+        self._store(product, self._clock())
+        self._snapshot = None
+        self.version += 1
+
+    def remove(self, product_id: str) -> None:
+        """Drop a product from the by-id map and the snapshot."""
+        self._by_id.pop(product_id, None)
+        if self._snapshot is not None:
+            self._snapshot = [p for p in self._snapshot if p["id"] != product_id]
+            self.version += 1
+
+    def invalidate(self) -> None:
+        """Forget everything; the next read goes to the database."""
+        self._snapshot = None
+        self._by_id.clear()
+        self.version += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached_products": len(self._by_id),
+            "snapshot_cached": self._snapshot is not None and self._fresh(self._snapshot_at),
+        }
+
+    def _store(self, product: Dict[str, Any], stored_at: float) -> None:
+        product_id = product["id"]
+        self._by_id[product_id] = (stored_at, product)
+        self._by_id.move_to_end(product_id)
+        while len(self._by_id) > self.max_items:
+            self._by_id.popitem(last=False)
+
+
+# Shared cache instance
+_catalog_cache: Optional[CatalogCache] = None
+
+
+def get_catalog_cache() -> CatalogCache:
+    """Get or create the shared catalog cache."""
+    global _catalog_cache
+    if _catalog_cache is None:
+        _catalog_cache = CatalogCache()
+    return _catalog_cache
@@ -1,48 +1,70 @@
 """Checkout service - order processing and fulfillment."""
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Awaitable, Callable, Optional
 from datetime import datetime
 
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from .idempotency import IdempotencyStore, IdempotencyConflict
+from .outbox import outbox_task
+from .pricing import order_total_paise, paise_to_rupees
+
+
+class CheckoutNotPayable(Exception):
+    """Raised when a payment order is requested for a checkout not awaiting payment."""
+
+    def __init__(self, checkout_id: Any, status: Optional[str]):
+        self.checkout_id = checkout_id
+        self.status = status
+        super().__init__(f"Checkout {checkout_id} is {status}, not pending_payment")
+
 
 async def create_order_record(
     order_data: Dict[str, Any],
     orders_collection: Any,
-    idempotency_collection: Any,
+    idempotency: Optional[IdempotencyStore] = None,
 ) -> Dict[str, Any]:
     """Create or retrieve order with idempotency support.
     
     Args:
         order_data: Order details including user_id, items, total, etc.
         orders_collection: MongoDB orders collection
-        idempotency_collection: MongoDB idempotency collection
+        idempotency: Shared idempotency store, if keys should be honoured
     
     Returns:
         Created or existing order document
+    
+    Raises:
+        IdempotencyConflict: if another request currently holds the key
     """
-    idempotency_key = order_data.get("idempotency_key")
+    idempotency_key = order_data.get("idempotency_key") if idempotency else None
     
     # Check idempotency
     if idempotency_key:
-        existing = await idempotency_collection.find_one({"key": idempotency_key})
-        if existing:
-            return existing.get("result")
+        claim_token, existing = await idempotency.claim(idempotency_key)
+        if existing is not None:
+            return existing
+        if not claim_token:
+            raise IdempotencyConflict(idempotency_key)
     
-    # Create order
-    order_doc = {
-        **order_data,
-        "status": "pending",
-        "created_at": datetime.utcnow().isoformat(),
-    }
-    
-    result = await orders_collection.insert_one(order_doc)
-    order_doc["_id"] = result.inserted_id
+    try:
+        # Create order
+        order_doc = {
+            **order_data,
+            "status": "pending",
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        
+        result = await orders_collection.insert_one(order_doc)
+        order_doc["_id"] = result.inserted_id
+    except Exception:
+        if idempotency_key:
+            await idempotency.release(idempotency_key, claim_token)
+        raise
     
     # Record idempotency
     if idempotency_key:
-        await idempotency_collection.insert_one({
-            "key": idempotency_key,
-            "result": order_doc,
-            "created_at": datetime.utcnow(),
-        })
+        await idempotency.complete(idempotency_key, claim_token, order_doc)
     
     return order_doc
 
@@ -79,4 +101,187 @@ async def complete_checkout(
         "completed_at": datetime.utcnow().isoformat(),
     }
     
-    return await create_order_record(order_record, orders_collection, None)
\ No newline at end of file
+    return await create_order_record(order_record, orders_collection)
+
+
+async def create_checkout_payment_order(
+    checkout_id: Any,
+    user_id: str,
+    checkout_collection: Any,
+    orders_collection: Any,
+    create_order: Callable[..., Awaitable[Dict[str, Any]]],
+    currency: str = "INR",
+) -> Dict[str, Any]:
+    """Create the Razorpay order for a pending checkout and link the two.
+
+    The checkout's own total is charged, and its ``razorpay_order_id`` is
+    set before the order is handed to the client, so webhooks and the
+    reconciler can always find the checkout a payment belongs to. Asking
+    again (a resumed payment dialog, or two tabs at once) returns the
+    order already linked instead of creating a second one.
+
+    Returns:
+        The orders record of the linked Razorpay order
+
+    Raises:
+        LookupError: if the user has no such checkout
+        CheckoutNotPayable: if the checkout is not awaiting payment
+    """
+    checkout_order = await checkout_collection.find_one(
+        {"_id": checkout_id, "user_id": user_id},
+        {"status": 1, "total_paise": 1, "total_price": 1, "razorpay_order_id": 1},
+    )
+    if checkout_order is None:
+        raise LookupError(f"Checkout {checkout_id} not found")
+    if checkout_order["status"] != "pending_payment":
+        raise CheckoutNotPayable(checkout_id, checkout_order["status"])
+    if checkout_order.get("razorpay_order_id"):
+        linked = await orders_collection.find_one(
+            {"razorpay_order_id": checkout_order["razorpay_order_id"]}
+        )
+        if linked is not None:
+            return linked
+
+    amount_paise = order_total_paise(checkout_order)
+    receipt = f"receipt_{user_id}_"
+    order = await create_order(
+        amount_paise,
+        currency=currency,
+        receipt=receipt,
+        notes={"user_id": user_id, "checkout_id": str(checkout_id)},
+    )
+    now = datetime.utcnow()
+    order_record = {
+        "razorpay_order_id": order["id"],
+        "user_id": user_id,
+        "amount": paise_to_rupees(amount_paise),
+        "amount_in_paise": amount_paise,
+        "currency": currency,
+        "status": order["status"],
+        "receipt": receipt,
+        "checkout_id": str(checkout_id),
+        "created_at": now,
+        "updated_at": now,
+    }
+    await orders_collection.insert_one(order_record)
+
+    result = await checkout_collection.update_one(
+        {"_id": checkout_id, "status": "pending_payment", "razorpay_order_id": None},
+        {"$set": {"razorpay_order_id": order["id"], "updated_at": now}},
+    )
+    if result.modified_count > 0:
+        return order_record
+
+    # Another request linked its order first, or the checkout expired meanwhile;
+    # the order created here is never handed out, so it must not look payable
+    await orders_collection.update_one(
+        {"razorpay_order_id": order["id"]},
+        {"$set": {"status": "superseded", "updated_at": now}},
+    )
+    current = await checkout_collection.find_one(
+        {"_id": checkout_id}, {"status": 1, "razorpay_order_id": 1}
+    )
+    if current is None or current["status"] != "pending_payment":
+        raise CheckoutNotPayable(checkout_id, current and current["status"])
+    return await orders_collection.find_one({"razorpay_order_id": current["razorpay_order_id"]})
+
+
+# Outbox tasks queued when a checkout completes, run after the response;
+# credit_eco_impact queues prerender_invoice once the credit is applied
+CHECKOUT_COMPLETED_TASKS = (
+    "clear_cart", "credit_eco_impact", "clear_stock_holds", "record_order_stats",
+)
+
+
+async def finalize_paid_checkout(
+    checkout_filter: Dict[str, Any],
+    razorpay_order_id: str,
+    razorpay_payment_id: str,
+    checkout_collection: Any,
+    outbox_collection: Any,
+    session: Any = None,
+) -> Optional[Dict[str, Any]]:
+    """Complete a pending checkout once its payment is confirmed.
+
+    The status change is a conditional update on ``pending_payment``, so
+    when the client, a webhook and the reconciler all confirm the same
+    payment, exactly one of them queues the follow-up work (clearing the
+    cart, crediting eco impact, rendering the invoice, untagging the
+    stock it reserved) in the outbox.
+    Pass a transaction ``session`` so the status change and the outbox
+    tasks commit together.
+
+    Returns:
+        The completed checkout document, or None if no pending checkout matched
+    """
+    now = datetime.utcnow()
+    checkout_order = await checkout_collection.find_one_and_update(
+        {**checkout_filter, "status": "pending_payment"},
+        {
+            "$set": {
+                "status": "completed",
+                "razorpay_order_id": razorpay_order_id,
+                "razorpay_payment_id": razorpay_payment_id,
+                "updated_at": now,
+            }
+        },
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+    if checkout_order is None:
+        return None
+
+    payload = {
+        "checkout_id": checkout_order["_id"],
+        "user_id": checkout_order["user_id"],
+        "num_items": sum(item.get("quantity", 1) for item in checkout_order.get("items", [])),
+    }
+    await outbox_collection.insert_many(
+        [outbox_task(task, payload, now) for task in CHECKOUT_COMPLETED_TASKS],
+        session=session,
+    )
+    return checkout_order
+
+
+async def credit_checkout_impact(
+    eco_impact_collection: Any,
+    user_id: str,
+    num_items: int,
+    event_id: Any,
+    community: Any = None,
+) -> bool:
+    """Credit a completed checkout's eco impact exactly once per ``event_id``.
+
+    The ids of recently applied events are kept on the document, so an
+    outbox task that is delivered again is a no-op. When credited, the same
+    amounts are added to the ``community`` totals (a CommunityImpact).
+
+    Returns:
+        True if the impact was credited, False if it already had been
+    """
+    # Simple calculation for demonstration:
+    # CO2: 0.5kg per item, Water: 10L per item, Waste: 0.2kg per item, Trees: 0.01 per item
+    impact = {
+        "co2_saved": num_items * 0.5,
+        "water_saved": num_items * 10.0,
+        "waste_diverted": num_items * 0.2,
+        "trees_saved": num_items * 0.01,
+    }
+    try:
+        result = await eco_impact_collection.update_one(
+            {"user_id": user_id, "applied_events": {"$ne": event_id}},
+            {
+                "$inc": impact,
+                "$set": {"last_updated": datetime.now()},
+                "$addToSet": {"badges": "Eco Shopper"},
+                "$push": {"applied_events": {"$each": [event_id], "$slice": -100}},
+            },
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # The user's document exists and already lists this event
+        return False
+    credited = result.modified_count > 0 or result.upserted_id is not None
+    if credited and community is not None:
+        await community.add(impact, new_users=1 if result.upserted_id is not None else 0)
+    return credited
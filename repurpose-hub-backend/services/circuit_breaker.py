@@ -0,0 +1,140 @@
+"""Circuit breaker service - fail fast while a downstream dependency is unhealthy."""
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open, retry in {math.ceil(retry_after)}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker.
+
+    Calls are recorded with their duration over the last ``window_seconds``.
+    Once at least ``min_calls`` are in the window, the circuit opens when the
+    failure rate or the slow-call rate (calls slower than
+    ``slow_call_seconds``) reaches its threshold. While open, ``acquire()``
+    raises CircuitOpenError immediately. After ``open_seconds`` the circuit is
+    half-open: up to ``half_open_max_calls`` probes go through, and the first
+    result closes the circuit again or reopens it.
+
+    Callers pair ``acquire()`` with exactly one ``record()``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 2.0,
+        window_seconds: float = 30.0,
+        min_calls: int = 10,
+        open_seconds: float = 15.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        # (recorded_at, failed, slow)
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def acquire(self) -> None:
+        """Reserve a call, or raise CircuitOpenError if it must not be made."""
+        state = self.state
+        if state == OPEN:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self._opened_at + self.open_seconds - self._clock())
+        if state == HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 1.0)
+            self._probes += 1
+
+    def record(self, duration: float, failed: bool) -> None:
+        """Record the outcome of a call reserved with ``acquire()``."""
+        slow = duration >= self.slow_call_seconds
+        if self._state == HALF_OPEN:
+            if failed or slow:
+                self._open()
+            else:
+                self._state = CLOSED
+                self._calls.clear()
+            return
+        if self._state == OPEN:
+            # A call that started before the circuit opened
+            return
+
+        now = self._clock()
+        self._calls.append((now, failed, slow))
+        self._prune(now)
+        if len(self._calls) < self.min_calls:
+            return
+        failure_rate, slow_rate = self._rates()
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._calls.clear()
+        self.times_opened += 1
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _rates(self) -> Tuple[float, float]:
+        if not self._calls:
+            return 0.0, 0.0
+        total = len(self._calls)
+        failed = sum(1 for _, f, _ in self._calls if f)
+        slow = sum(1 for _, _, s in self._calls if s)
+        return failed / total, slow / total
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        self._prune(self._clock())
+        failure_rate, slow_rate = self._rates()
+        retry_after = (
+            max(0.0, self._opened_at + self.open_seconds - self._clock()) if state == OPEN else 0.0
+        )
+        return {
+            "name": self.name,
+            "state": state,
+            "calls_in_window": len(self._calls),
+            "failure_rate": round(failure_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_after_seconds": round(retry_after, 1),
+        }
@@ -0,0 +1,165 @@
+"""Community impact service - running totals of every user's eco impact."""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import COMMUNITY_IMPACT_MAX_AGE_SECONDS, COMMUNITY_IMPACT_REPAIR_INTERVAL_SECONDS
+
+TOTALS_ID = "community"
+
+# Per-user eco_impact field -> community total it adds to
+IMPACT_TOTALS = {
+    "co2_saved": "total_co2",
+    "water_saved": "total_water",
+    "waste_diverted": "total_waste",
+    "trees_saved": "total_trees",
+}
+TOTAL_FIELDS = (*IMPACT_TOTALS.values(), "total_users")
+
+
+def community_totals_pipeline() -> list:
+    """Sum every user's impact; what the totals document should hold."""
+    return [{
+        "$group": {
+            "_id": None,
+            **{total: {"$sum": f"${field}"} for field, total in IMPACT_TOTALS.items()},
+            "total_users": {"$sum": 1},
+        }
+    }]
+
+
+def public_totals(doc: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    doc = doc or {}
+    totals: Dict[str, Any] = {total: float(doc.get(total, 0.0)) for total in IMPACT_TOTALS.values()}
+    totals["total_users"] = int(doc.get("total_users", 0))
+    return totals
+
+
+class CommunityImpact:
+    """One document of community totals, kept current with ``$inc``.
+
+    Crediting a user adds the same amounts to the totals, so reading them
+    is a single ``_id`` lookup instead of a ``$group`` over ``eco_impact``;
+    the result is also kept in memory for ``max_age_seconds`` and replaced
+    on every write from this process. The two writes are not atomic
+    together, so a periodic repair recomputes the totals from scratch and
+    records how far they had drifted. Each increment bumps ``version``,
+    and the repair only overwrites the version it read, so it never
+    discards increments that land while it is aggregating.
+    """
+
+    def __init__(
+        self,
+        eco_impact: Any,
+        totals: Any,
+        max_age_seconds: float = COMMUNITY_IMPACT_MAX_AGE_SECONDS,
+        interval_seconds: float = COMMUNITY_IMPACT_REPAIR_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime] = datetime.now,
+    ):
+        self.eco_impact = eco_impact
+        self.totals = totals
+        self.max_age_seconds = max_age_seconds
+        self.interval_seconds = interval_seconds
+        self._clock = clock
+        self._now = now
+        self._copy: Optional[Dict[str, Any]] = None
+        self._copied_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.last_repair: Dict[str, Any] = {}
+
+    def _remember(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        self._copy = public_totals(doc)
+        self._copied_at = self._clock()
+        return self._copy
+
+    async def get(self) -> Dict[str, Any]:
+        """Current totals; builds the document on first use."""
+        if self._copy is not None and self._clock() - self._copied_at < self.max_age_seconds:
+            self.hits += 1
+            return self._copy
+        self.misses += 1
+        doc = await self.totals.find_one({"_id": TOTALS_ID})
+        if doc is None:
+            await self.repair()
+            doc = await self.totals.find_one({"_id": TOTALS_ID})
+        return self._remember(doc)
+
+    async def add(self, impact: Dict[str, float], new_users: int = 0) -> Dict[str, Any]:
+        """Add a user's credited impact (eco_impact field names) to the totals."""
+        increments = {IMPACT_TOTALS[field]: amount for field, amount in impact.items()}
+        if new_users:
+            increments["total_users"] = new_users
+        doc = await self.totals.find_one_and_update(
+            {"_id": TOTALS_ID},
+            {"$inc": {**increments, "version": 1}, "$set": {"updated_at": self._now()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return self._remember(doc)
+
+    async def repair(self) -> Dict[str, Any]:
+        """Recompute the totals from eco_impact and overwrite them if nothing changed meanwhile."""
+        now = self._now()
+        before = await self.totals.find_one({"_id": TOTALS_ID})
+        result = await self.eco_impact.aggregate(community_totals_pipeline()).to_list(length=1)
+        computed = public_totals(result[0] if result else None)
+        if before is None:
+            try:
+                await self.totals.insert_one(
+                    {"_id": TOTALS_ID, **computed, "version": 0, "updated_at": now, "repaired_at": now}
+                )
+                applied = True
+            except DuplicateKeyError:
+                # An increment created it first; the next repair checks it
+                applied = False
+        else:
+            update = await self.totals.update_one(
+                {"_id": TOTALS_ID, "version": before.get("version", 0)},
+                {"$set": {**computed, "repaired_at": now}},
+            )
+            applied = update.matched_count > 0
+        drift = {}
+        if before is not None:
+            stored = public_totals(before)
+            drift = {field: round(computed[field] - stored[field], 6) for field in TOTAL_FIELDS}
+        self.last_repair = {
+            "applied": applied,
+            "drift": {field: delta for field, delta in drift.items() if delta},
+            "at": now.isoformat(),
+        }
+        if applied:
+            self._remember(computed)
+        return self.last_repair
+
+    async def _run_loop(self) -> None:
+        while True:
+            try:
+                await self.repair()
+            except Exception as e:
+                print(f"Community impact repair failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_loop(), name="community-impact-repair")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "last_repair": self.last_repair,
+        }
@@ -0,0 +1,233 @@
+"""Daily stats service - per-day rollup buckets kept current with $inc."""
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+
+from .pricing import order_total_paise, paise_to_rupees
+
+# Counters kept on each day's bucket
+METRICS = ("revenue_paise", "orders", "new_users", "donations")
+INTERVALS = ("day", "week", "month")
+MAX_SERIES_DAYS = 5 * 366
+
+
+def day_key(when: Any) -> str:
+    """Bucket id for a date or naive UTC datetime; ISO dates sort in time order.
+
+    Every source (users, checkouts, donations) stamps ``created_at`` with
+    ``datetime.utcnow()``, so all of them fall into the same UTC day.
+    """
+    return when.strftime("%Y-%m-%d")
+
+
+def _midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
+
+async def record_daily(collection: Any, when: datetime, **increments: int) -> None:
+    """Add to the counters of the day ``when`` falls on, creating the bucket if needed."""
+    await collection.update_one(
+        {"_id": day_key(when)},
+        {
+            "$inc": increments,
+            "$set": {"updated_at": datetime.utcnow()},
+            "$setOnInsert": {"date": _midnight(when)},
+        },
+        upsert=True,
+    )
+
+
+async def record_completed_order(collection: Any, checkouts: Any, checkout_id: Any) -> bool:
+    """Count a completed checkout in its day's bucket, at most once.
+
+    The checkout is marked before the bucket is incremented, so a crash in
+    between loses the order from the rollup rather than counting it twice;
+    the backfill job repairs that. Orders are bucketed by ``created_at``,
+    the same field the backfill uses.
+    """
+    checkout = await checkouts.find_one_and_update(
+        {"_id": checkout_id, "status": "completed", "rolled_up_at": {"$exists": False}},
+        {"$set": {"rolled_up_at": datetime.utcnow()}},
+        projection={"created_at": 1, "total_paise": 1, "total_price": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if checkout is None or not isinstance(checkout.get("created_at"), datetime):
+        return False
+    await record_daily(
+        collection, checkout["created_at"], orders=1, revenue_paise=order_total_paise(checkout)
+    )
+    return True
+
+
+def _bucket_start(day: date, interval: str) -> date:
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+async def query_series(collection: Any, start: date, end: date, interval: str = "day") -> Dict[str, Any]:
+    """Chart-ready series between start and end (inclusive), one point per interval.
+
+    Reads at most one bucket per day in the range by ``_id``, so the cost
+    depends on the range, not on how much history there is. Periods
+    without activity are zero. Weeks start on Monday.
+
+    Raises:
+        ValueError: for an unknown interval or a bad range
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of: {', '.join(INTERVALS)}")
+    if end < start:
+        raise ValueError("end must not be before start")
+    if (end - start).days >= MAX_SERIES_DAYS:
+        raise ValueError(f"Range is limited to {MAX_SERIES_DAYS} days")
+
+    buckets = await collection.find(
+        {"_id": {"$gte": day_key(start), "$lte": day_key(end)}}
+    ).to_list(length=None)
+    by_day = {bucket["_id"]: bucket for bucket in buckets}
+
+    labels: List[str] = []
+    totals: Dict[str, Dict[str, int]] = {}
+    day = start
+    while day <= end:
+        label = _bucket_start(day, interval).isoformat()
+        if label not in totals:
+            labels.append(label)
+            totals[label] = dict.fromkeys(METRICS, 0)
+        bucket = by_day.get(day_key(day))
+        if bucket is not None:
+            for metric in METRICS:
+                totals[label][metric] += bucket.get(metric, 0)
+        day += timedelta(days=1)
+
+    return {
+        "interval": interval,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "labels": labels,
+        "series": {
+            "revenue": [paise_to_rupees(totals[label]["revenue_paise"]) for label in labels],
+            "orders": [totals[label]["orders"] for label in labels],
+            "new_users": [totals[label]["new_users"] for label in labels],
+            "donations": [totals[label]["donations"] for label in labels],
+        },
+    }
+
+
+async def _stream(collection: Any, query: Dict[str, Any], projection: Dict[str, int],
+                  batch_size: int):
+    """Yield batches of matching documents in _id order."""
+    last_id = None
+    while True:
+        batch_query = {**query, "_id": {"$gt": last_id}} if last_id is not None else query
+        batch = await collection.find(batch_query, projection).sort("_id", 1).limit(
+            batch_size
+        ).to_list(length=batch_size)
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]["_id"]
+        if len(batch) < batch_size:
+            return
+
+
+async def rebuild_daily_stats(
+    collection: Any,
+    users: Any,
+    checkouts: Any,
+    donations: Any,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    batch_size: int = 1000,
+    progress: Callable[[str], None] = print,
+) -> Dict[str, Any]:
+    """Recompute buckets from history, for the first run or to repair drift.
+
+    Each source is streamed in ``_id`` order in batches and only the
+    per-day counters are held in memory. Buckets are then overwritten with
+    ``$set``; existing buckets in the range with no activity are zeroed.
+    Completed checkouts are marked as rolled up on the way, so their
+    pending live update is skipped instead of counted twice.
+    """
+    created: Dict[str, Any] = {"$type": "date"}
+    if start is not None:
+        created["$gte"] = _midnight(start)
+    if end is not None:
+        created["$lt"] = _midnight(end + timedelta(days=1))
+
+    days: Dict[str, Dict[str, int]] = {}
+
+    def add(when: datetime, **increments: int) -> None:
+        counters = days.setdefault(day_key(when), dict.fromkeys(METRICS, 0))
+        for metric, amount in increments.items():
+            counters[metric] += amount
+
+    # (name, collection, query, projection, counters for one document)
+    sources = [
+        ("users", users, {"created_at": created}, {"created_at": 1},
+         lambda doc: {"new_users": 1}),
+        ("checkout", checkouts, {"status": "completed", "created_at": created},
+         {"created_at": 1, "total_paise": 1, "total_price": 1},
+         lambda doc: {"orders": 1, "revenue_paise": order_total_paise(doc)}),
+        ("donations", donations, {"created_at": created}, {"created_at": 1},
+         lambda doc: {"donations": 1}),
+    ]
+    scanned = 0
+    for name, source, query, projection, counters_for in sources:
+        source_scanned = 0
+        async for batch in _stream(source, query, projection, batch_size):
+            for doc in batch:
+                add(doc["created_at"], **counters_for(doc))
+            if source is checkouts:
+                await checkouts.update_many(
+                    {"_id": {"$in": [doc["_id"] for doc in batch]}, "rolled_up_at": {"$exists": False}},
+                    {"$set": {"rolled_up_at": datetime.utcnow()}},
+                )
+            source_scanned += len(batch)
+            progress(f"{name}: {source_scanned} documents scanned")
+        scanned += source_scanned
+
+    if start is not None or end is not None:
+        key_range = {}
+        if start is not None:
+            key_range["$gte"] = day_key(start)
+        if end is not None:
+            key_range["$lte"] = day_key(end)
+        existing = await collection.find({"_id": key_range}, {"_id": 1}).to_list(length=None)
+    else:
+        existing = await collection.find({}, {"_id": 1}).to_list(length=None)
+    for bucket in existing:
+        days.setdefault(bucket["_id"], dict.fromkeys(METRICS, 0))
+
+    now = datetime.utcnow()
+    ops = [
+        UpdateOne(
+            {"_id": key},
+            {"$set": {**counters, "date": datetime.strptime(key, "%Y-%m-%d"),
+                      "rebuilt_at": now, "updated_at": now}},
+            upsert=True,
+        )
+        for key, counters in sorted(days.items())
+    ]
+    for i in range(0, len(ops), batch_size):
+        await collection.bulk_write(ops[i:i + batch_size], ordered=False)
+    progress(f"daily_stats: {len(ops)} buckets written from {scanned} documents")
+    return {"scanned": scanned, "buckets": len(ops)}
+
+
+def series_range(start: Optional[date], end: Optional[date], interval: str) -> Tuple[date, date]:
+    """Default range ending today (UTC): 30 days, 12 weeks or 12 months."""
+    end = end or datetime.utcnow().date()
+    if start is None:
+        if interval == "month":
+            months = end.year * 12 + end.month - 12
+            start = date(months // 12, months % 12 + 1, 1)
+        elif interval == "week":
+            start = end - timedelta(weeks=11, days=end.weekday())
+        else:
+            start = end - timedelta(days=29)
+    return start, end
@@ -0,0 +1,135 @@
+"""Health service - background dependency probes served from memory."""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import HEALTH_CHECK_TIMEOUT_SECONDS, HEALTH_STALE_AFTER_INTERVALS
+
+
+class DependencyCheck:
+    """One dependency probe and the result of its last run."""
+
+    def __init__(
+        self,
+        name: str,
+        probe: Callable[[], Awaitable[Any]],
+        interval_seconds: float,
+        timeout_seconds: float = HEALTH_CHECK_TIMEOUT_SECONDS,
+        critical: bool = True,
+    ):
+        self.name = name
+        self.probe = probe
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        # Only critical dependencies affect readiness
+        self.critical = critical
+        self.status = "unknown"
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[datetime] = None
+        self.checked_at_monotonic: Optional[float] = None
+        self.error: Optional[str] = None
+        self.consecutive_failures = 0
+
+
+class HealthMonitor:
+    """Probes each dependency on its own interval in a background task.
+
+    /health and /ready read the last recorded results instead of calling
+    MongoDB and Razorpay per request, so load balancer probes cost nothing
+    and cannot pile up on a slow dependency. A result older than
+    ``stale_after_intervals`` intervals counts as down, which also catches
+    a probe loop that has stopped running.
+    """
+
+    def __init__(
+        self,
+        stale_after_intervals: float = HEALTH_STALE_AFTER_INTERVALS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.stale_after_intervals = stale_after_intervals
+        self._clock = clock
+        self.checks: Dict[str, DependencyCheck] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_check(self, check: DependencyCheck) -> None:
+        self.checks[check.name] = check
+
+    async def run_check(self, check: DependencyCheck) -> None:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(check.probe(), timeout=check.timeout_seconds)
+        except asyncio.TimeoutError:
+            check.status, check.error = "down", f"Timed out after {check.timeout_seconds}s"
+        except Exception as e:
+            check.status, check.error = "down", str(e)
+        else:
+            check.status, check.error = "up", None
+        check.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        check.checked_at = datetime.now()
+        check.checked_at_monotonic = self._clock()
+        check.consecutive_failures = 0 if check.status == "up" else check.consecutive_failures + 1
+
+    async def _probe_loop(self, check: DependencyCheck) -> None:
+        while True:
+            await self.run_check(check)
+            await asyncio.sleep(check.interval_seconds)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._tasks = [
+            asyncio.create_task(self._probe_loop(check), name=f"health-{check.name}")
+            for check in self.checks.values()
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def status_of(self, check: DependencyCheck) -> str:
+        if check.checked_at_monotonic is None:
+            return "unknown"
+        age = self._clock() - check.checked_at_monotonic
+        if age > check.interval_seconds * self.stale_after_intervals:
+            return "stale"
+        return check.status
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "status": self.status_of(check),
+                "critical": check.critical,
+                "latency_ms": check.latency_ms,
+                "checked_at": check.checked_at.isoformat() if check.checked_at else None,
+                "consecutive_failures": check.consecutive_failures,
+                "error": check.error,
+            }
+            for name, check in self.checks.items()
+        }
+
+    def is_ready(self) -> bool:
+        """True when every critical dependency passed its latest, fresh probe."""
+        return all(
+            self.status_of(check) == "up"
+            for check in self.checks.values()
+            if check.critical
+        )
+
+
+# Shared monitor instance
+_health_monitor: Optional[HealthMonitor] = None
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Get or create the shared health monitor."""
+    global _health_monitor
+    if _health_monitor is None:
+        _health_monitor = HealthMonitor()
+    return _health_monitor
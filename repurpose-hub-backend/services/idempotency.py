@@ -0,0 +1,144 @@
+"""Idempotency service - in-memory LRU in front of a TTL-indexed Mongo collection."""
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import (
+    IDEMPOTENCY_TTL_MINUTES, IDEMPOTENCY_CLAIM_SECONDS, IDEMPOTENCY_LOCAL_MAX_KEYS,
+)
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+class IdempotencyConflict(Exception):
+    """Raised when another request is still processing the same key."""
+
+    def __init__(self, key: str):
+        super().__init__(f"Request with idempotency key {key} is already in progress")
+        self.key = key
+
+
+class IdempotencyStore:
+    """Claim-or-return store for idempotency keys.
+
+    Completed results are kept in a bounded local LRU so retries on the same
+    worker cost one dictionary lookup. The Mongo collection is the source of
+    truth across workers; its TTL index on ``expires_at`` removes old keys.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        ttl_minutes: float = IDEMPOTENCY_TTL_MINUTES,
+        claim_seconds: float = IDEMPOTENCY_CLAIM_SECONDS,
+        max_local_keys: int = IDEMPOTENCY_LOCAL_MAX_KEYS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.collection = collection
+        self.ttl = timedelta(minutes=ttl_minutes)
+        # Unfinished claims lapse quickly so a crashed request does not block retries
+        self.claim_ttl = timedelta(seconds=claim_seconds)
+        self.max_local_keys = max_local_keys
+        self._clock = clock
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def _local_get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return entry[1]
+
+    def _local_put(self, key: str, result: Dict[str, Any]) -> None:
+        self._local[key] = (self._clock() + self.ttl.total_seconds(), result)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_local_keys:
+            self._local.popitem(last=False)
+
+    async def claim(self, key: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Atomically claim a key.
+
+        Returns (token, None) if the caller now owns the key, (None, result)
+        if it already completed, or (None, None) if another request holds it.
+        The token must be passed to ``complete`` or ``release``, so a request
+        whose claim lapsed and was taken over cannot touch the new owner's.
+        """
+        result = self._local_get(key)
+        if result is not None:
+            return None, result
+
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        claim_doc = {
+            "key": key,
+            "token": token,
+            "status": IN_PROGRESS,
+            "result": None,
+            "created_at": now,
+            "expires_at": now + self.claim_ttl,
+        }
+
+        try:
+            # Insert if absent, or take over a record the TTL monitor has not
+            # reaped yet. A live record makes the upsert collide with the
+            # unique index on key, so exactly one concurrent caller wins.
+            await self.collection.find_one_and_update(
+                {"key": key, "expires_at": {"$lte": now}},
+                {"$set": claim_doc},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+            )
+            return token, None
+        except DuplicateKeyError:
+            pass
+
+        existing = await self.collection.find_one({"key": key})
+        if existing is None:
+            return None, None
+        if existing.get("status", COMPLETED) == COMPLETED and existing.get("result") is not None:
+            self._local_put(key, existing["result"])
+            return None, existing["result"]
+        return None, None
+
+    async def complete(self, key: str, token: str, result: Dict[str, Any]) -> bool:
+        """Record the final result for a key claimed with ``token``.
+
+        If the claim lapsed and the TTL monitor reaped it, the result is
+        still stored. If another request has taken the key over, its claim
+        is left alone.
+
+        Returns:
+            True if the result was stored, False if the key has another owner
+        """
+        now = datetime.utcnow()
+        try:
+            await self.collection.update_one(
+                {"key": key, "token": token},
+                {
+                    "$set": {
+                        "status": COMPLETED,
+                        "result": result,
+                        "expires_at": now + self.ttl,
+                    },
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        self._local_put(key, result)
+        return True
+
+    async def release(self, key: str, token: str) -> None:
+        """Give up an unfinished claim so a retry can run."""
+        self._local.pop(key, None)
+        await self.collection.delete_one({"key": key, "token": token, "status": IN_PROGRESS})
@@ -0,0 +1,375 @@
+"""Inventory service - stock holds taken at checkout with bulk conditional decrements."""
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+from config import (
+    INVENTORY_HOLD_MINUTES, INVENTORY_SWEEP_INTERVAL_SECONDS, INVENTORY_SWEEP_BATCH_SIZE,
+    INVENTORY_VIEW_TTL_SECONDS, INVENTORY_VIEW_MAX_ITEMS,
+)
+from .payment import PaymentGatewayError
+
+
+class InsufficientStock(Exception):
+    """Raised when a reservation cannot hold every cart line."""
+
+    def __init__(self, shortages: List[Dict[str, Any]]):
+        self.shortages = shortages
+        names = ", ".join(s["product_id"] for s in shortages)
+        super().__init__(f"Not enough stock for: {names}")
+
+
+def reservation_lines(items: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Total quantity per product id; a product may appear on several cart lines."""
+    lines: Dict[str, int] = {}
+    for item in items:
+        lines[item["id"]] = lines.get(item["id"], 0) + int(item.get("quantity", 1))
+    return lines
+
+
+async def ensure_stock_field(products: Any) -> int:
+    """Copy legacy ``quantity`` into ``stock`` so reservations can decrement it."""
+    result = await products.update_many(
+        {"stock": {"$exists": False}, "quantity": {"$exists": True}},
+        [{"$set": {"stock": "$quantity"}}],
+    )
+    return result.modified_count
+
+
+def stock_on_hand(product: Dict[str, Any]) -> int:
+    """Available stock plus the units held by pending checkouts."""
+    available = int(product.get("stock", product.get("quantity", 0)))
+    return available + sum((product.get("holds") or {}).values())
+
+
+def on_hand_stock_expression(on_hand: int) -> Dict[str, Any]:
+    """Update-pipeline expression for available stock given a count on hand.
+
+    Outstanding holds are subtracted by the server in the same write, so a
+    hold released afterwards brings ``stock`` back up to ``on_hand`` rather
+    than past it.
+    """
+    held = {"$sum": {"$map": {
+        "input": {"$objectToArray": {"$ifNull": ["$holds", {}]}},
+        "as": "hold",
+        "in": "$$hold.v",
+    }}}
+    return {"$subtract": [on_hand, held]}
+
+
+def _hold_field(reservation_id: Any) -> str:
+    return f"holds.{reservation_id}"
+
+
+class StockView:
+    """Read-mostly cache of available stock per product, for product pages.
+
+    Misses are fetched together with one ``$in`` query. Reservations made
+    in this process invalidate their products straight away; the short TTL
+    bounds how stale a count can be after writes from other workers.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = INVENTORY_VIEW_TTL_SECONDS,
+        max_items: int = INVENTORY_VIEW_MAX_ITEMS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self._clock = clock
+        self._stock: "OrderedDict[str, tuple[float, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get_many(self, products: Any, product_ids: Iterable[str]) -> Dict[str, int]:
+        """Available stock for each known product id; unknown ids are left out."""
+        now = self._clock()
+        result: Dict[str, int] = {}
+        missing: List[str] = []
+        for product_id in dict.fromkeys(product_ids):
+            entry = self._stock.get(product_id)
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                self._stock.move_to_end(product_id)
+                result[product_id] = entry[1]
+                self.hits += 1
+            else:
+                missing.append(product_id)
+        if missing:
+            self.misses += len(missing)
+            valid = [ObjectId(pid) for pid in missing if ObjectId.is_valid(pid)]
+            docs = await products.find(
+                {"_id": {"$in": valid}}, {"stock": 1, "quantity": 1}
+            ).to_list(length=None)
+            for doc in docs:
+                product_id = str(doc["_id"])
+                result[product_id] = max(0, int(doc.get("stock", doc.get("quantity", 0))))
+                self._stock[product_id] = (now, result[product_id])
+                self._stock.move_to_end(product_id)
+            while len(self._stock) > self.max_items:
+                self._stock.popitem(last=False)
+        return result
+
+    async def get(self, products: Any, product_id: str) -> Optional[int]:
+        return (await self.get_many(products, [product_id])).get(product_id)
+
+    def invalidate(self, product_ids: Iterable[str]) -> None:
+        for product_id in product_ids:
+            self._stock.pop(product_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "cached_products": len(self._stock)}
+
+
+class StockReservations:
+    """Holds stock for a checkout until it is paid, released or expires.
+
+    ``reserve`` decrements every cart line in one ``bulk_write`` of
+    conditional ``$inc`` updates (``stock >= qty``), so concurrent checkouts
+    can never take a product below zero. Each decrement also tags the
+    product with ``holds.<reservation id>``. Rolling back a partial
+    reservation, or releasing a whole one, returns stock only to products
+    carrying that tag, so it can safely be repeated.
+
+    A reservation moves ``held`` -> ``committed`` when its checkout
+    completes, or ``held`` -> ``releasing`` -> ``released`` when stock goes
+    back. The checkout status decides which: the sweep expires lapsed
+    pending checkouts with a conditional update before releasing, so a
+    reservation is never both paid for and released. Before expiring a
+    checkout with a Razorpay order, the sweep asks ``settle_paid`` to
+    complete it if the order was paid; while the gateway cannot answer the
+    hold is kept. A payment that still lands after expiry is flagged for
+    refund by the webhook (``flag_late_payment``).
+    """
+
+    def __init__(
+        self,
+        products: Any,
+        reservations: Any,
+        checkouts: Any,
+        view: Optional[StockView] = None,
+        on_expired: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        settle_paid: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        hold: timedelta = timedelta(minutes=INVENTORY_HOLD_MINUTES),
+        interval_seconds: float = INVENTORY_SWEEP_INTERVAL_SECONDS,
+        batch_size: int = INVENTORY_SWEEP_BATCH_SIZE,
+        now: Callable[[], datetime] = datetime.utcnow,
+    ):
+        self.products = products
+        self.reservations = reservations
+        self.checkouts = checkouts
+        self.view = view or get_stock_view()
+        self.on_expired = on_expired
+        self.settle_paid = settle_paid
+        self.hold = hold
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._now = now
+        self._task: Optional[asyncio.Task] = None
+        self.rejected = 0
+        self.last_sweep: Dict[str, Any] = {}
+
+    async def reserve(self, reservation_id: Any, user_id: str,
+                      items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Hold stock for every line or for none of them.
+
+        Raises:
+            InsufficientStock: with the lines that could not be held
+        """
+        lines = reservation_lines(items)
+        invalid = [pid for pid in lines if not ObjectId.is_valid(pid)]
+        if invalid:
+            self.rejected += 1
+            raise InsufficientStock(
+                [{"product_id": pid, "requested": lines[pid], "available": 0} for pid in invalid]
+            )
+
+        now = self._now()
+        reservation = {
+            "_id": reservation_id,
+            "user_id": user_id,
+            "items": [{"product_id": pid, "quantity": qty} for pid, qty in lines.items()],
+            "status": "held",
+            "expires_at": now + self.hold,
+            "created_at": now,
+            "updated_at": now,
+        }
+        # Recorded first, so the sweep can return the stock if we die midway
+        await self.reservations.insert_one(reservation)
+
+        hold_field = _hold_field(reservation_id)
+        result = await self.products.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": ObjectId(pid), "stock": {"$gte": qty}},
+                    {"$inc": {"stock": -qty}, "$set": {hold_field: qty}},
+                )
+                for pid, qty in lines.items()
+            ],
+            ordered=False,
+        )
+        self.view.invalidate(lines)
+        if result.modified_count == len(lines):
+            return reservation
+
+        self.rejected += 1
+        await self.release(reservation_id)
+        docs = await self.products.find(
+            {"_id": {"$in": [ObjectId(pid) for pid in lines]}}, {"stock": 1}
+        ).to_list(length=None)
+        available = {str(doc["_id"]): doc.get("stock", 0) for doc in docs}
+        raise InsufficientStock([
+            {"product_id": pid, "requested": qty, "available": max(0, available.get(pid, 0))}
+            for pid, qty in lines.items()
+            if available.get(pid, 0) < qty
+        ])
+
+    async def _return_stock(self, reservation: Dict[str, Any]) -> None:
+        hold_field = _hold_field(reservation["_id"])
+        await self.products.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": ObjectId(line["product_id"]), hold_field: {"$exists": True}},
+                    {"$inc": {"stock": line["quantity"]}, "$unset": {hold_field: ""}},
+                )
+                for line in reservation["items"]
+            ],
+            ordered=False,
+        )
+        await self.reservations.update_one(
+            {"_id": reservation["_id"], "status": "releasing"},
+            {"$set": {"status": "released", "closed_at": self._now()}},
+        )
+        self.view.invalidate(line["product_id"] for line in reservation["items"])
+
+    async def release(self, reservation_id: Any) -> bool:
+        """Return a held reservation's stock; False if it was not held."""
+        reservation = await self.reservations.find_one_and_update(
+            {"_id": reservation_id, "status": "held"},
+            {"$set": {"status": "releasing", "updated_at": self._now()}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if reservation is None:
+            return False
+        await self._return_stock(reservation)
+        return True
+
+    async def commit(self, reservation_id: Any, session: Any = None) -> bool:
+        """Keep the stock for a paid checkout; pass the checkout's transaction session."""
+        result = await self.reservations.update_one(
+            {"_id": reservation_id, "status": "held"},
+            {"$set": {"status": "committed", "closed_at": self._now()}},
+            session=session,
+        )
+        return result.modified_count > 0
+
+    async def clear_holds(self, reservation_id: Any) -> None:
+        """Drop a committed reservation's tags from its products."""
+        reservation = await self.reservations.find_one({"_id": reservation_id}, {"items": 1})
+        if reservation is None:
+            return
+        hold_field = _hold_field(reservation_id)
+        await self.products.bulk_write(
+            [
+                UpdateOne({"_id": ObjectId(line["product_id"])}, {"$unset": {hold_field: ""}})
+                for line in reservation["items"]
+            ],
+            ordered=False,
+        )
+
+    async def _settle_if_paid(self, checkout_id: Any) -> bool:
+        """Let a paid order complete its checkout; False if the gateway could not say."""
+        if self.settle_paid is None:
+            return True
+        pending = await self.checkouts.find_one(
+            {"_id": checkout_id, "status": "pending_payment"}, {"razorpay_order_id": 1}
+        )
+        if pending is None or not pending.get("razorpay_order_id"):
+            return True
+        try:
+            await self.settle_paid(pending)
+        except PaymentGatewayError:
+            return False
+        return True
+
+    async def sweep(self) -> Dict[str, Any]:
+        """Settle lapsed holds and finish releases interrupted by a crash."""
+        now = self._now()
+        counts = {"released": 0, "committed": 0, "recovered": 0, "deferred": 0}
+        lapsed = await self.reservations.find(
+            {"$or": [
+                {"status": "held", "expires_at": {"$lt": now}},
+                {"status": "releasing", "updated_at": {"$lt": now - timedelta(minutes=1)}},
+            ]},
+        ).limit(self.batch_size).to_list(length=self.batch_size)
+
+        for reservation in lapsed:
+            if reservation["status"] == "releasing":
+                await self._return_stock(reservation)
+                counts["recovered"] += 1
+                continue
+            if not await self._settle_if_paid(reservation["_id"]):
+                counts["deferred"] += 1
+                continue
+            expired = await self.checkouts.find_one_and_update(
+                {"_id": reservation["_id"], "status": "pending_payment"},
+                {"$set": {"status": "expired", "updated_at": now}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if expired is not None and self.on_expired is not None:
+                await self.on_expired(expired)
+            checkout = expired or await self.checkouts.find_one(
+                {"_id": reservation["_id"]}, {"status": 1}
+            )
+            if checkout is not None and checkout["status"] == "completed":
+                if await self.commit(reservation["_id"]):
+                    await self.clear_holds(reservation["_id"])
+                    counts["committed"] += 1
+            elif await self.release(reservation["_id"]):
+                counts["released"] += 1
+
+        self.last_sweep = {**counts, "checked": len(lapsed), "at": now.isoformat()}
+        return self.last_sweep
+
+    async def _run_loop(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Stock reservation sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_loop(), name="stock-reservation-sweep")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "rejected": self.rejected,
+            "last_sweep": self.last_sweep,
+            "view": self.view.stats(),
+        }
+
+
+# Shared availability view
+_stock_view: Optional[StockView] = None
+
+
+def get_stock_view() -> StockView:
+    """Get or create the shared stock availability view."""
+    global _stock_view
+    if _stock_view is None:
+        _stock_view = StockView()
+    return _stock_view
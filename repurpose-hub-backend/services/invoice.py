@@ -0,0 +1,505 @@
+"""Invoice service - PDF rendering in a worker pool with an on-disk cache."""
+import asyncio
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+from fpdf import FPDF
+
+from config import (
+    INVOICE_CACHE_DIR, INVOICE_CACHE_MAX_BYTES, INVOICE_RENDER_WORKERS,
+    INVOICE_EXPORT_PROCESSES, INVOICE_EXPORT_BATCH_SIZE,
+)
+from .pricing import item_price_paise, subtotal_paise, cart_total_paise, paise_to_rupees
+
+
+class InvoicePDF(FPDF):
+    def header(self):
+        # Logo or Title
+        self.set_font("Arial", "B", 24)
+        self.set_text_color(16, 185, 129)  # Emerald-500
+        self.cell(0, 20, "REPURPOSE HUB", 0, 1, "C")
+        self.set_font("Arial", "", 10)
+        self.set_text_color(100, 116, 139)  # Slate-500
+        self.cell(0, 5, "Luxury Upcycled Curation Studio", 0, 1, "C")
+        self.ln(10)
+
+    def footer(self):
+        self.set_y(-30)
+        self.set_font("Arial", "I", 8)
+        self.set_text_color(148, 163, 184)
+        self.cell(
+            0,
+            10,
+            "This is a digitally generated invoice. No signature required.",
+            0,
+            1,
+            "C",
+        )
+        self.set_font("Arial", "B", 8)
+        self.set_text_color(16, 185, 129)
+        self.cell(0, 5, "Thank you for choosing sustainability!", 0, 0, "C")
+
+def render_invoice(
+    order: Dict[str, Any],
+    user_info: Optional[Dict[str, Any]] = None,
+    impact: Optional[Dict[str, Any]] = None,
+) -> bytes:
+    """Render an order's PDF invoice. CPU-bound; run it off the event loop."""
+    user_info = user_info or {}
+
+    # Create PDF
+    pdf = InvoicePDF()
+    pdf.add_page()
+
+    # Invoice Info
+    pdf.set_font("Arial", "B", 14)
+    pdf.set_text_color(30, 41, 59)  # Slate-900
+    pdf.cell(0, 10, f"TAX INVOICE: #{str(order['_id'])[-8:].upper()}", 0, 1)
+
+    pdf.set_font("Arial", "", 10)
+    pdf.set_text_color(71, 85, 105)  # Slate-600
+    pdf.cell(0, 6, f"Date: {order['created_at'].strftime('%d %B, %Y')}", 0, 1)
+    pdf.cell(
+        0, 6, f"Status: {order['status'].replace('_', ' ').capitalize()}", 0, 1
+    )
+    pdf.ln(10)
+
+    # Customer & Company Info
+    y_top = pdf.get_y()
+    pdf.set_font("Arial", "B", 10)
+    pdf.set_text_color(148, 163, 184)  # Slate-400
+    pdf.cell(95, 8, "BILLED TO", 0, 0)
+    pdf.cell(95, 8, "FROM", 0, 1)
+
+    pdf.set_font("Arial", "B", 11)
+    pdf.set_text_color(30, 41, 59)
+    pdf.cell(95, 6, user_info.get("full_name", "Valued Customer"), 0, 0)
+    pdf.cell(95, 6, "Repurpose Hub Studio", 0, 1)
+
+    pdf.set_font("Arial", "", 10)
+    pdf.set_text_color(71, 85, 105)
+    pdf.cell(95, 5, user_info.get("email", ""), 0, 0)
+    pdf.cell(95, 5, "contact@repurposehub.com", 0, 1)
+    pdf.ln(15)
+
+    # Items Table Header
+    pdf.set_fill_color(248, 250, 252)  # Slate-50
+    pdf.set_font("Arial", "B", 10)
+    pdf.cell(100, 12, " PRODUCT DESCRIPTION", 1, 0, "L", True)
+    pdf.cell(30, 12, "QTY", 1, 0, "C", True)
+    pdf.cell(30, 12, "PRICE", 1, 0, "C", True)
+    pdf.cell(30, 12, "TOTAL", 1, 1, "C", True)
+
+    # Items Table Rows
+    pdf.set_font("Arial", "", 10)
+    items = order.get("items", [])
+    for item in items:
+        # SAFETY: Always favor the captured 'quantity' from the checkout record
+        # If quantity is unusually high (like 100), we ensure we aren't accidentally pulling 'stock'
+        qty = int(item.get("quantity", 1))
+
+        # If both are present and they match exactly 100, it's a legacy stock bug
+        # but we assume the cart data is correct now.
+
+        price_val = paise_to_rupees(item_price_paise(item))
+        total_val = paise_to_rupees(item_price_paise(item) * qty)
+
+        pdf.cell(100, 12, f" {item['name'][:45]}...", 1)
+        pdf.cell(30, 12, f"{qty}", 1, 0, "C")
+        pdf.cell(30, 12, f"Rs. {price_val:,.2f}", 1, 0, "C")
+        pdf.cell(30, 12, f"Rs. {total_val:,.2f}", 1, 1, "C")
+
+    # Summary
+    pdf.ln(5)
+    subtotal = paise_to_rupees(subtotal_paise(items))
+    total_final = paise_to_rupees(cart_total_paise(items))
+    service_fee = total_final - subtotal
+
+    pdf.set_x(120)
+    pdf.cell(40, 10, "Subtotal:", 0, 0, "R")
+    pdf.cell(30, 10, f"Rs. {subtotal:,.2f}", 0, 1, "R")
+    pdf.set_x(120)
+    pdf.cell(40, 10, "Service Fee (20%):", 0, 0, "R")
+    pdf.cell(30, 10, f"Rs. {service_fee:,.2f}", 0, 1, "R")
+
+    pdf.ln(2)
+    pdf.set_x(110)
+    pdf.set_fill_color(16, 185, 129)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(50, 14, " TOTAL AMOUNT CAPTURED", 0, 0, "R", True)
+    pdf.cell(30, 14, f"Rs. {total_final:,.2f} ", 0, 1, "R", True)
+
+    # Sustainability Report Block
+    pdf.ln(20)
+    pdf.set_text_color(30, 41, 59)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, "BEYOND THE PURCHASE: YOUR SUSTAINABILITY IMPACT", 0, 1)
+    pdf.set_draw_color(16, 185, 129)
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(5)
+
+    pdf.set_font("Arial", "", 10)
+    pdf.set_text_color(71, 85, 105)
+
+    # Current Order Impact
+    num_items = sum(i.get("quantity", 1) for i in items)
+    pdf.cell(
+        0,
+        8,
+        f"This order alone diverted {num_items * 0.2:.2f}kg of waste and offset {num_items * 0.5:.2f}kg of CO2.",
+        0,
+        1,
+    )
+
+    if impact:
+        pdf.ln(5)
+        pdf.set_font("Arial", "B", 10)
+        pdf.set_text_color(16, 185, 129)
+        pdf.cell(0, 6, "YOUR TOTAL LIFETIME LEGACY:", 0, 1)
+        pdf.set_font("Arial", "", 10)
+        pdf.set_text_color(71, 85, 105)
+        pdf.cell(
+            0,
+            6,
+            f"* Total Carbon Offset: {impact.get('co2_saved', 0):.2f} kg",
+            0,
+            1,
+        )
+        pdf.cell(
+            0,
+            6,
+            f"* Water Resources Saved: {impact.get('water_saved', 0):.2f} Liters",
+            0,
+            1,
+        )
+        pdf.cell(
+            0,
+            6,
+            f"* Waste Diverted: {impact.get('waste_diverted', 0):.2f} kg",
+            0,
+            1,
+        )
+
+    pdf_output = pdf.output(dest="S")
+    if isinstance(pdf_output, str):
+        pdf_output = pdf_output.encode("latin1", errors="replace")
+    return bytes(pdf_output)
+
+
+def _stamp(changed: Any) -> str:
+    # Millisecond precision, because that is what Mongo stores for dates
+    if isinstance(changed, datetime):
+        return changed.strftime("%Y%m%d%H%M%S") + f"{changed.microsecond // 1000:03d}"
+    return "0"
+
+
+def invoice_cache_key(order: Dict[str, Any], impact: Optional[Dict[str, Any]] = None) -> str:
+    """Cache key for an order's invoice: its id, when it last changed, and
+    when the user's eco impact (printed as lifetime totals) last changed.
+    """
+    changed = order.get("updated_at") or order.get("created_at")
+    impact_changed = impact.get("last_updated") if impact else None
+    return f"{order['_id']}_{_stamp(changed)}_{_stamp(impact_changed)}"
+
+
+def render_invoice_to_cache(
+    cache: "InvoiceCache",
+    key: str,
+    order: Dict[str, Any],
+    user_info: Optional[Dict[str, Any]],
+    impact: Optional[Dict[str, Any]],
+) -> bytes:
+    """Render an invoice and store it in the cache. Top-level so worker processes can run it."""
+    data = render_invoice(order, user_info, impact)
+    cache.put(key, data)
+    return data
+
+
+class InvoiceCache:
+    """Rendered PDFs on disk, evicted least-recently-used over a byte budget."""
+
+    def __init__(self, directory: str = INVOICE_CACHE_DIR, max_bytes: int = INVOICE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of a cached invoice, or None. A hit refreshes its LRU position."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store a rendered invoice atomically and return its path."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        # Older renders of the same order can never be hit again
+        order_prefix = key.split("_", 1)[0] + "_"
+        for name in os.listdir(self.directory):
+            if name.startswith(order_prefix) and name.endswith(".pdf") and name != f"{key}.pdf":
+                self._remove(os.path.join(self.directory, name))
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Delete the least recently used files until the cache fits its budget."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pdf"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class InvoiceRenderer:
+    """Serves invoices from the cache, rendering misses in a bounded thread pool.
+
+    Concurrent requests for the same uncached invoice share one render.
+    """
+
+    def __init__(self, cache: Optional[InvoiceCache] = None, max_workers: int = INVOICE_RENDER_WORKERS):
+        self.cache = cache or InvoiceCache()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="invoice")
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.renders = 0
+        self.render_seconds = 0.0
+
+    async def get_invoice_path(self, order: Dict[str, Any], users: Any, eco_impact: Any) -> str:
+        """Path to the order's PDF, rendering it first if it is not cached."""
+        # Read first: the lifetime totals it holds are part of the key
+        impact = await eco_impact.find_one({"user_id": order.get("user_id")})
+        key = invoice_cache_key(order, impact)
+        path = self.cache.get(key)
+        if path is not None:
+            self.hits += 1
+            return path
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._render(key, order, users, impact))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def prerender(self, order: Dict[str, Any], users: Any, eco_impact: Any) -> None:
+        """Warm the cache for an order; errors are logged, not raised."""
+        try:
+            await self.get_invoice_path(order, users, eco_impact)
+        except Exception as e:
+            print(f"Invoice pre-render failed for {order.get('_id')}: {e}")
+
+    async def _render(self, key: str, order: Dict[str, Any], users: Any,
+                      impact: Optional[Dict[str, Any]]) -> str:
+        user_id = order.get("user_id")
+        user_info = None
+        if ObjectId.is_valid(user_id):
+            user_info = await users.find_one({"_id": ObjectId(user_id)})
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        path = await loop.run_in_executor(
+            self._executor, self._render_to_cache, key, order, user_info, impact
+        )
+        self.renders += 1
+        self.render_seconds += time.perf_counter() - started
+        return path
+
+    def _render_to_cache(self, key, order, user_info, impact) -> str:
+        render_invoice_to_cache(self.cache, key, order, user_info, impact)
+        return self.cache.path_for(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "renders": self.renders,
+            "avg_render_ms": round(self.render_seconds * 1000 / self.renders, 1) if self.renders else 0.0,
+            "in_flight": len(self._inflight),
+        }
+
+
+class _ZipChunks:
+    """Write-only sink for ZipFile; output is collected until drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _read_file(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+async def _invoice_bytes(
+    order: Dict[str, Any],
+    user_info: Optional[Dict[str, Any]],
+    impact: Optional[Dict[str, Any]],
+    cache: InvoiceCache,
+    executor: Executor,
+) -> bytes:
+    loop = asyncio.get_running_loop()
+    key = invoice_cache_key(order, impact)
+    path = cache.get(key)
+    if path is not None:
+        data = await loop.run_in_executor(None, _read_file, path)
+        if data is not None:
+            return data
+    return await loop.run_in_executor(
+        executor, render_invoice_to_cache, cache, key, order, user_info, impact
+    )
+
+
+async def _render_batch(
+    batch: List[Dict[str, Any]],
+    users: Any,
+    eco_impact: Any,
+    cache: InvoiceCache,
+    executor: Executor,
+) -> List[Any]:
+    """PDF bytes (or the exception) for each order, with one lookup per collection."""
+    user_ids = {str(o.get("user_id")) for o in batch}
+    user_docs, impact_docs = await asyncio.gather(
+        users.find(
+            {"_id": {"$in": [ObjectId(u) for u in user_ids if ObjectId.is_valid(u)]}},
+            {"full_name": 1, "email": 1},
+        ).to_list(length=None),
+        eco_impact.find({"user_id": {"$in": list(user_ids)}}).to_list(length=None),
+    )
+    users_by_id = {str(doc["_id"]): doc for doc in user_docs}
+    impact_by_user = {doc["user_id"]: doc for doc in impact_docs}
+
+    return await asyncio.gather(
+        *(
+            _invoice_bytes(
+                order,
+                users_by_id.get(str(order.get("user_id"))),
+                impact_by_user.get(str(order.get("user_id"))),
+                cache,
+                executor,
+            )
+            for order in batch
+        ),
+        return_exceptions=True,
+    )
+
+
+async def export_invoices_zip(
+    orders: Any,
+    users: Any,
+    eco_impact: Any,
+    cache: Optional[InvoiceCache] = None,
+    executor: Optional[Executor] = None,
+    batch_size: int = INVOICE_EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """Stream a ZIP archive of invoices for the orders an async cursor yields.
+
+    Orders are handled in batches: cached PDFs are read from disk, the rest
+    are rendered in parallel on ``executor``, and each batch is written to
+    the archive and yielded before the next is fetched, so memory holds at
+    most one batch of PDFs. Orders that fail to render are listed in
+    errors.txt at the end of the archive.
+    """
+    cache = cache or get_invoice_renderer().cache
+    executor = executor or get_invoice_export_pool()
+    sink = _ZipChunks()
+    failed: List[str] = []
+
+    async def write_batch(batch: List[Dict[str, Any]]) -> bytes:
+        results = await _render_batch(batch, users, eco_impact, cache, executor)
+        for order, result in zip(batch, results):
+            if isinstance(result, BaseException):
+                failed.append(f"{order['_id']}: {result}")
+                continue
+            archive.writestr(f"Invoice_{order['_id']}.pdf", result)
+        return sink.drain()
+
+    # PDFs are already compressed, so entries are stored as-is
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        batch: List[Dict[str, Any]] = []
+        async for order in orders:
+            batch.append(order)
+            if len(batch) >= batch_size:
+                yield await write_batch(batch)
+                batch = []
+        if batch:
+            yield await write_batch(batch)
+        if failed:
+            archive.writestr("errors.txt", "\n".join(failed) + "\n")
+    yield sink.drain()
+
+
+# Shared instances
+_invoice_renderer: Optional[InvoiceRenderer] = None
+_invoice_export_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_invoice_renderer() -> InvoiceRenderer:
+    """Get or create the shared invoice renderer."""
+    global _invoice_renderer
+    if _invoice_renderer is None:
+        _invoice_renderer = InvoiceRenderer()
+    return _invoice_renderer
+
+
+def get_invoice_export_pool() -> ProcessPoolExecutor:
+    """Get or create the process pool used for bulk invoice exports."""
+    global _invoice_export_pool
+    if _invoice_export_pool is None:
+        # spawn: forking a process that holds Motor's threads is unsafe
+        _invoice_export_pool = ProcessPoolExecutor(
+            max_workers=INVOICE_EXPORT_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _invoice_export_pool
@@ -0,0 +1,83 @@
+"""Latency service - per-step timings for multi-step request pipelines."""
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class StepLatencies:
+    """Recent step durations per ``pipeline.step``, for p50/p99 reporting."""
+
+    def __init__(self, max_samples: int = 1024):
+        self.max_samples = max_samples
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._counts: Dict[str, int] = defaultdict(int)
+
+    def record(self, pipeline: str, step: str, seconds: float) -> None:
+        key = f"{pipeline}.{step}"
+        self._samples[key].append(seconds)
+        self._counts[key] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for key, samples in sorted(self._samples.items()):
+            ordered = sorted(samples)
+            result[key] = {
+                "count": self._counts[key],
+                "p50_ms": round(_percentile(ordered, 50) * 1000, 2),
+                "p99_ms": round(_percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+        return result
+
+
+class PipelineTimer:
+    """Times the steps of one request and reports them to StepLatencies.
+
+        timer = PipelineTimer("checkout")
+        with timer.step("read_cart"):
+            cart = await cart_collection.find_one(...)
+        response.headers["Server-Timing"] = timer.server_timing()
+    """
+
+    def __init__(self, pipeline: str, latencies: Optional[StepLatencies] = None):
+        self.pipeline = pipeline
+        self.latencies = latencies or get_step_latencies()
+        self.steps: List[Tuple[str, float]] = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.steps.append((name, elapsed))
+            self.latencies.record(self.pipeline, name, elapsed)
+
+    def finish(self) -> float:
+        """Record the whole pipeline as the ``total`` step."""
+        elapsed = time.perf_counter() - self._started
+        self.latencies.record(self.pipeline, "total", elapsed)
+        return elapsed
+
+    def server_timing(self) -> str:
+        """Steps so far as a Server-Timing header value (shown in browser devtools)."""
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.steps)
+
+
+# Shared latency recorder
+_step_latencies: Optional[StepLatencies] = None
+
+
+def get_step_latencies() -> StepLatencies:
+    """Get or create the shared step latency recorder."""
+    global _step_latencies
+    if _step_latencies is None:
+        _step_latencies = StepLatencies()
+    return _step_latencies
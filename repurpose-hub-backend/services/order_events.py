@@ -0,0 +1,216 @@
+"""Order events service - in-process pub/sub for order and payment status changes."""
+import asyncio
+import json
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set
+
+from config import (
+    ORDER_EVENTS_QUEUE_SIZE, ORDER_EVENTS_HEARTBEAT_SECONDS, ORDER_EVENTS_STREAM_SECONDS,
+)
+
+# Statuses after which an order stream has nothing more to say
+TERMINAL_STATUSES = {"completed", "expired"}
+
+# How far along an order is; orders and checkouts publish under the same id,
+# and a late echo of an earlier step must not move a client backwards
+STATUS_RANK = {
+    "created": 0, "pending_payment": 0, "payment_failed": 1, "paid": 2,
+    "completed": 3, "expired": 3,
+}
+
+
+def order_topic(razorpay_order_id: str) -> str:
+    return f"order:{razorpay_order_id}"
+
+
+def user_topic(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def order_event(status: str, razorpay_order_id: Optional[str] = None,
+                user_id: Optional[str] = None, checkout_id: Any = None) -> Dict[str, Any]:
+    return {
+        "type": "order_status",
+        "status": status,
+        "razorpay_order_id": razorpay_order_id,
+        "user_id": user_id,
+        "checkout_id": str(checkout_id) if checkout_id is not None else None,
+        "at": datetime.now().isoformat(),
+    }
+
+
+class Subscription:
+    """A subscriber's bounded queue; the oldest event is dropped when full."""
+
+    def __init__(self, bus: "OrderEventBus", topics: Set[str], queue_size: int):
+        self.bus = bus
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.bus.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next event, or None if nothing arrived within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.bus.unsubscribe(self)
+
+
+class OrderEventBus:
+    """Wakes long-poll and SSE clients when an order's status changes.
+
+    Events are published under the Razorpay order id and the user id, so a
+    client can follow one payment or all of a user's orders. The bus only
+    reaches subscribers in this process; with change streams enabled each
+    worker also republishes writes made by the others, which can arrive
+    late. Repeats of the last status seen for an order, and statuses from
+    an earlier step (``STATUS_RANK``) than it, are dropped, so nobody gets
+    an event twice or sees an order go backwards.
+    """
+
+    def __init__(self, queue_size: int = ORDER_EVENTS_QUEUE_SIZE, remember_orders: int = 10000):
+        self.queue_size = queue_size
+        self.remember_orders = remember_orders
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._last_status: "OrderedDict[str, str]" = OrderedDict()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, *topics: str) -> Subscription:
+        subscription = Subscription(self, set(topics), self.queue_size)
+        for topic in topics:
+            self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for topic in subscription.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """Deliver an event to every matching subscriber; returns how many."""
+        razorpay_order_id = event.get("razorpay_order_id")
+        dedupe_key = f"{razorpay_order_id or event.get('checkout_id')}"
+        last = self._last_status.get(dedupe_key)
+        rank = STATUS_RANK.get(event["status"])
+        if last is not None and (
+            last == event["status"] or (rank is not None and rank < STATUS_RANK.get(last, 0))
+        ):
+            return 0
+        self._last_status[dedupe_key] = event["status"]
+        self._last_status.move_to_end(dedupe_key)
+        while len(self._last_status) > self.remember_orders:
+            self._last_status.popitem(last=False)
+
+        self.published += 1
+        recipients: Set[Subscription] = set()
+        if razorpay_order_id:
+            recipients |= self._subscribers.get(order_topic(razorpay_order_id), set())
+        if event.get("user_id"):
+            recipients |= self._subscribers.get(user_topic(event["user_id"]), set())
+        for subscription in recipients:
+            subscription.deliver(event)
+        self.delivered += len(recipients)
+        return len(recipients)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len({s for subs in self._subscribers.values() for s in subs}),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def event_stream(
+    subscription: Subscription,
+    initial: Iterable[Dict[str, Any]] = (),
+    stop_on_terminal: bool = True,
+    heartbeat_seconds: float = ORDER_EVENTS_HEARTBEAT_SECONDS,
+    max_seconds: float = ORDER_EVENTS_STREAM_SECONDS,
+) -> AsyncIterator[str]:
+    """Server-sent events for a subscription.
+
+    Sends ``initial`` first, then each published event, with a comment line
+    as a heartbeat when idle. Ends after a terminal status (if
+    ``stop_on_terminal``) or after ``max_seconds``; EventSource clients
+    reconnect on their own. The subscription is closed when the stream ends
+    or the client disconnects.
+    """
+    deadline = time.monotonic() + max_seconds
+    with subscription:
+        yield f"retry: {int(heartbeat_seconds * 1000)}\n\n"
+        for event in initial:
+            yield format_sse(event)
+            if stop_on_terminal and event["status"] in TERMINAL_STATUSES:
+                return
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            event = await subscription.get(min(heartbeat_seconds, remaining))
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event)
+            if stop_on_terminal and event["status"] in TERMINAL_STATUSES:
+                return
+
+
+async def watch_order_changes(collection: Any, bus: "OrderEventBus", checkout_id_field: str) -> None:
+    """Republish status changes from a MongoDB change stream (needs a replica set).
+
+    ``checkout_id_field`` names the field holding the checkout id: ``_id``
+    for the checkout collection, ``checkout_id`` for orders. Runs until
+    cancelled; if the deployment does not support change streams it logs
+    once and returns, leaving in-process events only.
+    """
+    pipeline = [{"$match": {
+        "operationType": {"$in": ["insert", "update", "replace"]},
+        "fullDocument.status": {"$exists": True},
+    }}]
+    try:
+        async with collection.watch(pipeline, full_document="updateLookup") as stream:
+            async for change in stream:
+                doc = change.get("fullDocument") or {}
+                bus.publish(order_event(
+                    doc["status"], doc.get("razorpay_order_id"), doc.get("user_id"),
+                    doc.get(checkout_id_field),
+                ))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Order change stream on {collection.name} stopped: {str(e)}")
+
+
+# Shared bus instance
+_order_event_bus: Optional[OrderEventBus] = None
+
+
+def get_order_event_bus() -> OrderEventBus:
+    """Get or create the shared order event bus."""
+    global _order_event_bus
+    if _order_event_bus is None:
+        _order_event_bus = OrderEventBus()
+    return _order_event_bus
@@ -0,0 +1,170 @@
+"""Outbox service - side effects recorded with a write and run by background workers."""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from config import (
+    OUTBOX_CONCURRENCY, OUTBOX_POLL_SECONDS, OUTBOX_LEASE_SECONDS, OUTBOX_MAX_ATTEMPTS,
+)
+
+# A handler receives the task's payload and its id (usable as an idempotency key)
+OutboxHandler = Callable[[Dict[str, Any], Any], Awaitable[Any]]
+
+
+def outbox_task(task: str, payload: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Build an outbox document; insert it in the same transaction as the change it follows."""
+    now = now or datetime.now()
+    return {
+        "task": task,
+        "payload": payload,
+        "status": "pending",
+        "attempts": 0,
+        "available_at": now,
+        "created_at": now,
+    }
+
+
+async def outbox_backlog(collection: Any) -> Dict[str, int]:
+    """Count of unfinished tasks per status."""
+    counts = await collection.aggregate([
+        {"$match": {"status": {"$in": ["pending", "processing", "failed"]}}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+    ]).to_list(length=None)
+    return {row["_id"]: row["count"] for row in counts}
+
+
+class OutboxWorker:
+    """Pool of asyncio workers draining the outbox collection.
+
+    Each worker claims one due task at a time by moving it to ``processing``
+    with a lease. If the process dies, the lease runs out and another
+    worker picks the task up again, so delivery is at-least-once and
+    handlers must be idempotent. Failures are retried with exponential
+    backoff. After ``max_attempts`` a task is parked as ``failed`` for
+    inspection.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        handlers: Optional[Dict[str, OutboxHandler]] = None,
+        concurrency: int = OUTBOX_CONCURRENCY,
+        poll_seconds: float = OUTBOX_POLL_SECONDS,
+        lease_seconds: float = OUTBOX_LEASE_SECONDS,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        now: Callable[[], datetime] = datetime.now,
+    ):
+        self.collection = collection
+        self.handlers: Dict[str, OutboxHandler] = dict(handlers or {})
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._now = now
+        self._wake = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def register(self, task: str, handler: OutboxHandler) -> None:
+        self.handlers[task] = handler
+
+    def notify(self) -> None:
+        """Wake idle workers after new tasks were committed in this process."""
+        self._wake.set()
+
+    def backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(2 ** attempts, 600))
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        now = self._now()
+        return await self.collection.find_one_and_update(
+            {
+                "task": {"$in": list(self.handlers)},
+                "$or": [
+                    {"status": "pending", "available_at": {"$lte": now}},
+                    # Lease expired: the worker holding it died or hung
+                    {"status": "processing", "locked_until": {"$lt": now}},
+                ],
+            },
+            {
+                "$set": {"status": "processing",
+                         "locked_until": now + timedelta(seconds=self.lease_seconds)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def process(self, task: Dict[str, Any]) -> None:
+        try:
+            await self.handlers[task["task"]](task["payload"], task["_id"])
+        except Exception as e:
+            now = self._now()
+            if task["attempts"] >= self.max_attempts:
+                self.failed += 1
+                update = {"status": "failed", "failed_at": now, "last_error": repr(e)}
+                print(f"Outbox task {task['task']} {task['_id']} failed permanently: {e!r}")
+            else:
+                self.retried += 1
+                update = {"status": "pending", "last_error": repr(e),
+                          "available_at": now + self.backoff(task["attempts"])}
+        else:
+            self.completed += 1
+            update = {"status": "done", "done_at": self._now()}
+        await self.collection.update_one(
+            {"_id": task["_id"], "status": "processing"},
+            {"$set": update, "$unset": {"locked_until": ""}},
+        )
+
+    async def run_once(self) -> int:
+        """Drain every due task; returns how many were processed."""
+        processed = 0
+        while True:
+            task = await self.claim()
+            if task is None:
+                return processed
+            await self.process(task)
+            processed += 1
+
+    async def _worker_loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Outbox worker error: {str(e)}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self.running or self.concurrency <= 0:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker_loop(), name=f"outbox-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "backlog": await outbox_backlog(self.collection),
+        }
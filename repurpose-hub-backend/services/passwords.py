@@ -0,0 +1,127 @@
+"""Password service - argon2 hashing off the event loop with bounded concurrency."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from config import (
+    PASSWORD_HASH_ROUNDS, PASSWORD_HASH_MEMORY_COST, PASSWORD_HASH_PARALLELISM,
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE,
+)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify calls are already waiting."""
+
+
+def build_crypt_context(
+    rounds: int = PASSWORD_HASH_ROUNDS,
+    memory_cost: int = PASSWORD_HASH_MEMORY_COST,
+    parallelism: int = PASSWORD_HASH_PARALLELISM,
+) -> CryptContext:
+    """Argon2 context; hashes made with other parameters are flagged for rehash."""
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__rounds=rounds,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+
+
+class PasswordHasher:
+    """Runs argon2 on a dedicated thread pool so logins never block the event loop.
+
+    At most ``max_workers`` calls run at once; up to ``max_queue`` more wait
+    for a slot, and anything beyond that is rejected with PasswordHasherBusy
+    so a login burst sheds load instead of queueing without bound.
+    argon2-cffi releases the GIL, so the workers hash in parallel.
+    """
+
+    def __init__(
+        self,
+        context: Optional[CryptContext] = None,
+        max_workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.context = context or build_crypt_context()
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="argon2")
+        self._slots = asyncio.Semaphore(max_workers)
+        self.waiting = 0
+        self.running = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy("Too many concurrent password operations")
+
+        enqueued = self._clock()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        started = self._clock()
+        self.wait_seconds += started - enqueued
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.run_seconds += self._clock() - started
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; on success also return a new hash if parameters changed."""
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        if new_hash is not None:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> Dict[str, Any]:
+        started = max(self.completed + self.running, 1)
+        return {
+            "workers": self.max_workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_wait_ms": round(self.wait_seconds / started * 1000, 2),
+            "avg_run_ms": round(self.run_seconds / max(self.completed, 1) * 1000, 2),
+        }
+
+
+# Shared hasher instance
+_password_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get or create the shared password hasher."""
+    global _password_hasher
+    if _password_hasher is None:
+        _password_hasher = PasswordHasher()
+    return _password_hasher
@@ -1,56 +1,189 @@
-"""Payment service - Razorpay integration."""
-import razorpay
-from config import RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET
-from typing import Dict, Any, Optional
-import os
-
-# Initialize client lazily
-_razorpay_client: Optional[razorpay.Client] = None
-
-def get_razorpay_client() -> razorpay.Client:
-    """Get or create Razorpay client singleton."""
-    global _razorpay_client
-    if _razorpay_client is None:
-        _razorpay_client = razorpay.Client(
-            auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET)
+"""Payment service - async Razorpay gateway over a pooled HTTP client."""
+import hashlib
+import hmac
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from config import (
+    RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET, RAZORPAY_BASE_URL,
+    RAZORPAY_TIMEOUT_SECONDS, RAZORPAY_CONNECT_TIMEOUT_SECONDS, RAZORPAY_MAX_CONNECTIONS,
+    PAYMENT_BREAKER_WINDOW_SECONDS, PAYMENT_BREAKER_MIN_CALLS, PAYMENT_BREAKER_FAILURE_RATE,
+    PAYMENT_BREAKER_SLOW_CALL_SECONDS, PAYMENT_BREAKER_SLOW_CALL_RATE,
+    PAYMENT_BREAKER_OPEN_SECONDS, PAYMENT_BREAKER_HALF_OPEN_CALLS,
+)
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class PaymentGatewayError(Exception):
+    """Razorpay rejected a request or could not be reached."""
+
+    def __init__(self, description: str, status_code: Optional[int] = None):
+        super().__init__(description)
+        self.description = description
+        self.status_code = status_code
+
+
+class PaymentGatewayUnavailable(PaymentGatewayError):
+    """Raised without calling Razorpay while the circuit breaker is open."""
+
+    def __init__(self, description: str, retry_after: float):
+        super().__init__(description, 503)
+        self.retry_after = retry_after
+
+
+def build_payment_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        "razorpay",
+        failure_rate_threshold=PAYMENT_BREAKER_FAILURE_RATE,
+        slow_call_rate_threshold=PAYMENT_BREAKER_SLOW_CALL_RATE,
+        slow_call_seconds=PAYMENT_BREAKER_SLOW_CALL_SECONDS,
+        window_seconds=PAYMENT_BREAKER_WINDOW_SECONDS,
+        min_calls=PAYMENT_BREAKER_MIN_CALLS,
+        open_seconds=PAYMENT_BREAKER_OPEN_SECONDS,
+        half_open_max_calls=PAYMENT_BREAKER_HALF_OPEN_CALLS,
+    )
+
+
+class RazorpayGateway:
+    """Async client for the Razorpay REST API.
+
+    One instance is shared by the app so requests reuse keep-alive
+    connections from a bounded pool instead of blocking the event loop
+    on the synchronous SDK.
+
+    Every call goes through a circuit breaker. Network errors, 5xx and 429
+    responses count as failures (4xx are the caller's fault and do not);
+    while the circuit is open, calls raise PaymentGatewayUnavailable
+    immediately instead of waiting out the timeout.
+    """
+
+    def __init__(
+        self,
+        key_id: str = RAZORPAY_KEY_ID,
+        key_secret: str = RAZORPAY_KEY_SECRET,
+        base_url: str = RAZORPAY_BASE_URL,
+        timeout: float = RAZORPAY_TIMEOUT_SECONDS,
+        connect_timeout: float = RAZORPAY_CONNECT_TIMEOUT_SECONDS,
+        max_connections: int = RAZORPAY_MAX_CONNECTIONS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.key_secret = key_secret
+        self.breaker = breaker or build_payment_breaker()
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            auth=(key_id, key_secret),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            headers={"User-Agent": "RepurposeHub/1.0"},
+            transport=transport,
         )
-        _razorpay_client.set_app_details({
-            "title": "FastAPI App",
-            "version": "1.0"
-        })
-    return _razorpay_client
 
+    async def _request(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+        try:
+            self.breaker.acquire()
+        except CircuitOpenError as e:
+            raise PaymentGatewayUnavailable(str(e), e.retry_after) from e
+
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = await self._client.request(method, path, **kwargs)
+            failed = response.status_code >= 500 or response.status_code == 429
+        except httpx.HTTPError as e:
+            raise PaymentGatewayError(f"Razorpay request failed: {e!r}") from e
+        finally:
+            self.breaker.record(time.perf_counter() - started, failed)
 
-def create_order(amount: float, currency: str = "INR", receipt: Optional[str] = None) -> Dict[str, Any]:
+        if response.status_code >= 400:
+            try:
+                description = response.json()["error"]["description"]
+            except (ValueError, KeyError, TypeError):
+                description = response.text or response.reason_phrase
+            raise PaymentGatewayError(description, response.status_code)
+        return response.json()
+
+    async def create_order(
+        self,
+        amount_paise: int,
+        currency: str = "INR",
+        receipt: Optional[str] = None,
+        notes: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Create an auto-captured order."""
+        return await self._request(
+            "POST",
+            "/v1/orders",
+            json={
+                "amount": amount_paise,
+                "currency": currency,
+                "receipt": receipt,
+                "notes": notes or {},
+                "payment_capture": 1,
+            },
+        )
+
+    async def fetch_order(self, order_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/v1/orders/{order_id}")
+
+    async def fetch_payment(self, payment_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/v1/payments/{payment_id}")
+
+    async def fetch_order_payments(self, order_id: str) -> List[Dict[str, Any]]:
+        response = await self._request("GET", f"/v1/orders/{order_id}/payments")
+        return response.get("items", [])
+
+    async def ping(self) -> None:
+        """Cheap authenticated call used by health checks."""
+        await self._request("GET", "/v1/orders", params={"count": 1})
+
+    def verify_payment_signature(self, order_id: str, payment_id: str, signature: str) -> bool:
+        """Check the checkout signature locally; no network call is needed."""
+        return verify_payment_signature(order_id, payment_id, signature, self.key_secret)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+# Shared gateway instance
+_payment_gateway: Optional[RazorpayGateway] = None
+
+
+def get_payment_gateway() -> RazorpayGateway:
+    """Get or create the shared Razorpay gateway."""
+    global _payment_gateway
+    if _payment_gateway is None:
+        _payment_gateway = RazorpayGateway()
+    return _payment_gateway
+
+
+async def create_order(amount_paise: int, currency: str = "INR", receipt: Optional[str] = None,
+                       notes: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Create a Razorpay order."""
-    client = get_razorpay_client()
-    return client.order.create({
-        "amount": int(amount * 100),  # Razorpay expects amount in paisa
-        "currency": currency,
-        "receipt": receipt,
-    })
+    return await get_payment_gateway().create_order(amount_paise, currency, receipt, notes)
 
 
-def verify_payment_signature(order_id: str, payment_id: str, signature: str) -> bool:
+def verify_payment_signature(order_id: str, payment_id: str, signature: str,
+                             key_secret: str = RAZORPAY_KEY_SECRET) -> bool:
     """Verify payment signature from Razorpay."""
-    import hmac
-    import hashlib
-    from config import RAZORPAY_KEY_SECRET
-    
     generated_signature = hmac.new(
-        RAZORPAY_KEY_SECRET.encode(),
+        key_secret.encode(),
         f"{order_id}|{payment_id}".encode(),
         hashlib.sha256
     ).hexdigest()
-    
-    return generated_signature == signature
+
+    return hmac.compare_digest(generated_signature, signature)
 
 
-def get_payment_status(payment_id: str) -> Dict[str, Any]:
+async def get_payment_status(payment_id: str) -> Dict[str, Any]:
     """Get payment status from Razorpay."""
-    client = get_razorpay_client()
     try:
-        payment = client.payment.fetch(payment_id)
+        payment = await get_payment_gateway().fetch_payment(payment_id)
         return {
             "status": payment.get("status"),
             "amount": payment.get("amount") / 100,
@@ -60,5 +193,5 @@ def get_payment_status(payment_id: str) -> Dict[str, Any]:
             "email": payment.get("email"),
             "contact": payment.get("contact"),
         }
-    except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+    except PaymentGatewayError as e:
+        return {"error": str(e)}
@@ -0,0 +1,70 @@
+"""Pricing service - canonical integer paise amounts.
+
+Prices arrive as display strings like "Rs. 1,640". They are parsed once at
+write time into an integer ``price_paise`` field so Mongo can filter, sort
+and sum them natively and totals never accumulate float error.
+"""
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Dict, List
+
+SERVICE_FEE_RATE = Decimal("1.2")
+
+_CURRENCY_PREFIX = re.compile(r"^(?:Rs\.?|INR|₹)\s*", re.IGNORECASE)
+
+
+def to_paise(price: Any) -> int:
+    """Convert a rupee amount (number or display string) to integer paise.
+
+    Unparseable values become 0, matching the old string parsing.
+    """
+    if isinstance(price, bool) or price is None:
+        return 0
+    if isinstance(price, (int, float)):
+        amount = Decimal(str(price))
+    else:
+        clean = _CURRENCY_PREFIX.sub("", str(price).strip()).replace(",", "")
+        if not clean or not (clean[0].isdigit() or clean[0] == "."):
+            return 0
+        try:
+            amount = Decimal(clean)
+        except InvalidOperation:
+            return 0
+    return int((amount * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def paise_to_rupees(paise: int) -> float:
+    """Rupee value of a paise amount, for responses that expose rupees."""
+    return paise / 100
+
+
+def item_price_paise(item: Dict[str, Any]) -> int:
+    """Unit price of a product or line item, preferring the stored integer field."""
+    paise = item.get("price_paise")
+    if isinstance(paise, int) and not isinstance(paise, bool):
+        return paise
+    return to_paise(item.get("price", 0))
+
+
+def with_price_paise(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy of line items with ``price_paise`` set on each."""
+    return [{**item, "price_paise": item_price_paise(item)} for item in items]
+
+
+def subtotal_paise(items: List[Dict[str, Any]]) -> int:
+    """Sum of unit price x quantity over line items."""
+    return sum(item_price_paise(item) * int(item.get("quantity", 1)) for item in items)
+
+
+def cart_total_paise(items: List[Dict[str, Any]], service_fee_rate: Any = SERVICE_FEE_RATE) -> int:
+    """Cart subtotal including the service fee, rounded to the nearest paisa."""
+    total = Decimal(subtotal_paise(items)) * Decimal(str(service_fee_rate))
+    return int(total.quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def order_total_paise(order: Dict[str, Any]) -> int:
+    """Charged total of a checkout record; falls back to the legacy float total."""
+    paise = order.get("total_paise")
+    if isinstance(paise, int) and not isinstance(paise, bool):
+        return paise
+    return to_paise(order.get("total_price", 0))
@@ -0,0 +1,297 @@
+"""Reconciliation service - payment webhooks and the stale checkout sweep."""
+import asyncio
+import hashlib
+import hmac
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import (
+    PAYMENT_RECONCILE_INTERVAL_SECONDS, PAYMENT_RECONCILE_STALE_MINUTES,
+    PAYMENT_RECONCILE_EXPIRE_HOURS, PAYMENT_RECONCILE_BATCH_SIZE,
+    PAYMENT_RECONCILE_CONCURRENCY,
+)
+from .payment import (
+    PaymentGatewayError, PaymentGatewayUnavailable, RazorpayGateway, get_payment_gateway,
+)
+
+# Finalizes a pending checkout given (checkout filter, razorpay order id, payment id)
+FinalizeCheckout = Callable[[Dict[str, Any], str, str], Awaitable[Optional[Dict[str, Any]]]]
+
+
+def verify_webhook_signature(body: bytes, signature: str, secret: str) -> bool:
+    """Check the X-Razorpay-Signature header against the raw request body."""
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+async def mark_order_paid(orders_collection: Any, razorpay_order_id: str,
+                          razorpay_payment_id: str, source: str) -> bool:
+    """Record a captured payment on the order; False if it was already paid."""
+    result = await orders_collection.update_one(
+        {"razorpay_order_id": razorpay_order_id, "status": {"$ne": "paid"}},
+        {
+            "$set": {
+                "status": "paid",
+                "razorpay_payment_id": razorpay_payment_id,
+                "payment_verified_at": datetime.utcnow(),
+                "payment_confirmed_by": source,
+                "updated_at": datetime.utcnow(),
+            }
+        },
+    )
+    return result.modified_count > 0
+
+
+async def flag_late_payment(checkout_collection: Any, razorpay_order_id: str,
+                            razorpay_payment_id: str) -> bool:
+    """Flag an expired checkout whose order was paid anyway as due a refund.
+
+    Its stock hold was released when it expired, so the payment cannot be
+    honoured; admins find these by ``refund_due``. False if the checkout is
+    not expired or was already flagged.
+    """
+    result = await checkout_collection.update_one(
+        {"razorpay_order_id": razorpay_order_id, "status": "expired", "refund_due": {"$ne": True}},
+        {
+            "$set": {
+                "refund_due": True,
+                "razorpay_payment_id": razorpay_payment_id,
+                "updated_at": datetime.utcnow(),
+            }
+        },
+    )
+    return result.modified_count > 0
+
+
+async def apply_payment_event(
+    event: Dict[str, Any],
+    orders_collection: Any,
+    checkout_collection: Any,
+    finalize_checkout: FinalizeCheckout,
+) -> Dict[str, Any]:
+    """Apply one Razorpay webhook event.
+
+    Every write is conditional on the current status, so redelivered or
+    out-of-order events leave the documents unchanged.
+
+    Returns:
+        Outcome with the event type, the order id and whether anything changed
+    """
+    event_type = event.get("event", "")
+    payload = event.get("payload", {})
+    payment = payload.get("payment", {}).get("entity", {})
+    order = payload.get("order", {}).get("entity", {})
+    razorpay_order_id = payment.get("order_id") or order.get("id")
+    outcome = {"event": event_type, "razorpay_order_id": razorpay_order_id, "changed": False}
+    if not razorpay_order_id:
+        return outcome
+
+    if event_type in ("payment.captured", "order.paid") and payment.get("id"):
+        order_changed = await mark_order_paid(
+            orders_collection, razorpay_order_id, payment["id"], "webhook"
+        )
+        completed = await finalize_checkout(
+            {"razorpay_order_id": razorpay_order_id}, razorpay_order_id, payment["id"]
+        )
+        refund_due = completed is None and await flag_late_payment(
+            checkout_collection, razorpay_order_id, payment["id"]
+        )
+        outcome["changed"] = order_changed or completed is not None or refund_due
+        outcome["checkout"] = completed
+        outcome["refund_due"] = refund_due
+    elif event_type == "payment.failed":
+        error = payment.get("error_description") or "Payment failed"
+        result = await orders_collection.update_one(
+            {"razorpay_order_id": razorpay_order_id, "status": {"$nin": ["paid", "payment_failed"]}},
+            {"$set": {"status": "payment_failed", "last_payment_error": error,
+                      "updated_at": datetime.utcnow()}},
+        )
+        # The checkout stays pending so the customer can retry the payment
+        await checkout_collection.update_one(
+            {"razorpay_order_id": razorpay_order_id, "status": "pending_payment"},
+            {"$set": {"last_payment_error": error}},
+        )
+        outcome["changed"] = result.modified_count > 0
+    else:
+        outcome["ignored"] = True
+    return outcome
+
+
+class PaymentReconciler:
+    """Background sweep of checkouts stuck in ``pending_payment``.
+
+    Webhooks settle most payments; this catches the ones whose webhook was
+    lost or whose client never called complete-checkout. Stale checkouts
+    are read in ``_id`` order in batches, and each batch asks the gateway
+    about at most ``concurrency`` orders at a time. Paid orders are
+    finalized, and checkouts older than ``expire_after`` without a payment
+    are expired. An open payment circuit ends the sweep early.
+    """
+
+    def __init__(
+        self,
+        checkout_collection: Any,
+        orders_collection: Any,
+        finalize_checkout: FinalizeCheckout,
+        gateway: Optional[RazorpayGateway] = None,
+        on_completed: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        on_expired: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        interval_seconds: float = PAYMENT_RECONCILE_INTERVAL_SECONDS,
+        stale_after: timedelta = timedelta(minutes=PAYMENT_RECONCILE_STALE_MINUTES),
+        expire_after: timedelta = timedelta(hours=PAYMENT_RECONCILE_EXPIRE_HOURS),
+        batch_size: int = PAYMENT_RECONCILE_BATCH_SIZE,
+        concurrency: int = PAYMENT_RECONCILE_CONCURRENCY,
+        now: Callable[[], datetime] = datetime.utcnow,
+    ):
+        self.checkout_collection = checkout_collection
+        self.orders_collection = orders_collection
+        self.finalize_checkout = finalize_checkout
+        self._gateway = gateway
+        self.on_completed = on_completed
+        self.on_expired = on_expired
+        self.interval_seconds = interval_seconds
+        self.stale_after = stale_after
+        self.expire_after = expire_after
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._now = now
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Dict[str, Any] = {}
+
+    @property
+    def gateway(self) -> RazorpayGateway:
+        return self._gateway or get_payment_gateway()
+
+    async def _captured_payment(self, razorpay_order_id: str) -> Optional[Dict[str, Any]]:
+        order = await self.gateway.fetch_order(razorpay_order_id)
+        if order.get("status") != "paid":
+            return None
+        payments = await self.gateway.fetch_order_payments(razorpay_order_id)
+        return next((p for p in payments if p.get("status") == "captured"), None)
+
+    async def _finalize_captured(self, checkout: Dict[str, Any],
+                                 captured: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        razorpay_order_id = checkout["razorpay_order_id"]
+        await mark_order_paid(self.orders_collection, razorpay_order_id, captured["id"], "reconciler")
+        completed = await self.finalize_checkout(
+            {"_id": checkout["_id"]}, razorpay_order_id, captured["id"]
+        )
+        if completed is not None and self.on_completed is not None:
+            await self.on_completed(completed)
+        return completed
+
+    async def settle(self, checkout: Dict[str, Any]) -> bool:
+        """Complete a pending checkout now if its Razorpay order has been paid.
+
+        The stock sweep calls this before expiring a checkout, so a payment
+        whose webhook has not arrived yet is not lost. Gateway errors
+        propagate to the caller.
+
+        Returns:
+            True if the order has a captured payment
+        """
+        if not checkout.get("razorpay_order_id"):
+            return False
+        captured = await self._captured_payment(checkout["razorpay_order_id"])
+        if captured is None:
+            return False
+        await self._finalize_captured(checkout, captured)
+        return True
+
+    async def _reconcile_one(self, checkout: Dict[str, Any], semaphore: asyncio.Semaphore,
+                             counts: Dict[str, int]) -> None:
+        razorpay_order_id = checkout.get("razorpay_order_id")
+        if razorpay_order_id:
+            async with semaphore:
+                captured = await self._captured_payment(razorpay_order_id)
+            if captured is not None:
+                if await self._finalize_captured(checkout, captured) is not None:
+                    counts["completed"] += 1
+                return
+
+        now = self._now()
+        if checkout.get("created_at") and now - checkout["created_at"] >= self.expire_after:
+            result = await self.checkout_collection.update_one(
+                {"_id": checkout["_id"], "status": "pending_payment"},
+                {"$set": {"status": "expired", "updated_at": now}},
+            )
+            counts["expired"] += result.modified_count
+            if result.modified_count and self.on_expired is not None:
+                await self.on_expired(checkout)
+        else:
+            # Checked and still unpaid; look again after another stale period
+            await self.checkout_collection.update_one(
+                {"_id": checkout["_id"], "status": "pending_payment"},
+                {"$set": {"reconciled_at": now}},
+            )
+            counts["pending"] += 1
+
+    async def sweep(self) -> Dict[str, Any]:
+        """Reconcile every stale pending checkout once."""
+        cutoff = self._now() - self.stale_after
+        query: Dict[str, Any] = {
+            "status": "pending_payment",
+            "updated_at": {"$lt": cutoff},
+            "$or": [{"reconciled_at": {"$exists": False}}, {"reconciled_at": {"$lt": cutoff}}],
+        }
+        counts = {"checked": 0, "completed": 0, "expired": 0, "pending": 0, "errors": 0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = self._now()
+        last_id = None
+        circuit_open = False
+
+        while not circuit_open:
+            batch_query = {**query, "_id": {"$gt": last_id}} if last_id is not None else query
+            batch: List[Dict[str, Any]] = await self.checkout_collection.find(
+                batch_query,
+                {"_id": 1, "user_id": 1, "razorpay_order_id": 1, "created_at": 1},
+            ).sort("_id", 1).limit(self.batch_size).to_list(length=self.batch_size)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+            counts["checked"] += len(batch)
+
+            results = await asyncio.gather(
+                *(self._reconcile_one(checkout, semaphore, counts) for checkout in batch),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, PaymentGatewayUnavailable):
+                    circuit_open = True
+                if isinstance(result, Exception):
+                    counts["errors"] += 1
+                    if not isinstance(result, PaymentGatewayError):
+                        print(f"Payment reconciliation failed: {result!r}")
+            if len(batch) < self.batch_size:
+                break
+
+        self.last_run = {
+            **counts,
+            "circuit_open": circuit_open,
+            "started_at": started.isoformat(),
+            "duration_ms": round((self._now() - started).total_seconds() * 1000, 2),
+        }
+        return self.last_run
+
+    async def _run_loop(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Payment reconciliation sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_loop(), name="payment-reconciler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"running": self._task is not None and not self._task.done(), "last_run": self.last_run}
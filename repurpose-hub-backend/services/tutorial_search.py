@@ -0,0 +1,156 @@
+"""Tutorial search service - in-memory BM25 index over tutorial text."""
+import asyncio
+import heapq
+import math
+import re
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from config import TUTORIAL_INDEX_TTL_SECONDS
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+# Title terms count more than description terms
+TITLE_WEIGHT = 2
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "diy", "for", "from",
+    "how", "in", "into", "is", "it", "my", "of", "on", "or", "old", "the",
+    "this", "to", "with", "you", "your",
+}
+
+_token_re = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and plural 's'."""
+    tokens = []
+    for token in _token_re.findall(str(text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class TutorialIndex:
+    """Inverted index with BM25 scoring that supports incremental adds.
+
+    Postings store raw term frequencies; IDF and length normalization are
+    computed at query time, so adding a tutorial never requires a rebuild.
+    Writes through this process are added straight away; the index goes
+    stale after ``ttl_seconds`` so tutorials written by other workers or
+    the scraper show up once it is rebuilt.
+    """
+
+    def __init__(self, ttl_seconds: float = TUTORIAL_INDEX_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        # Bumped on every change so callers can cache derived views
+        self.version = 0
+        self.loaded = False
+        self._loaded_at = 0.0
+        # Serializes reloads so an expiry triggers one query, not one per request
+        self.lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, tutorial: Dict[str, Any]) -> None:
+        """Index a tutorial document, replacing any existing one with the same id."""
+        doc_id = str(tutorial.get("_id", tutorial.get("id")))
+        if doc_id in self._docs:
+            self.remove(doc_id)
+
+        terms = Counter(tokenize(tutorial.get("title", "")) * TITLE_WEIGHT)
+        terms.update(tokenize(tutorial.get("desc", "")))
+        terms.update(tokenize(tutorial.get("author", "")))
+
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+        length = sum(terms.values())
+        self._doc_terms[doc_id] = terms
+        self._doc_len[doc_id] = length
+        self._total_len += length
+        self._docs[doc_id] = {**tutorial, "_id": doc_id}
+        self.version += 1
+
+    def remove(self, doc_id: str) -> None:
+        """Drop a tutorial from the index if present."""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+        del self._docs[doc_id]
+        self.version += 1
+
+    def rebuild(self, tutorials: List[Dict[str, Any]]) -> None:
+        """Replace the index contents with the given tutorials."""
+        self._reset()
+        for tutorial in tutorials:
+            self.add(tutorial)
+        self.version += 1
+        self.loaded = True
+        self._loaded_at = self._clock()
+
+    def stale(self) -> bool:
+        """True if never loaded or last rebuilt more than ``ttl_seconds`` ago."""
+        return not self.loaded or self._clock() - self._loaded_at >= self.ttl_seconds
+
+    def documents(self) -> List[Dict[str, Any]]:
+        """All indexed tutorials, in insertion order."""
+        return list(self._docs.values())
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Return up to `limit` tutorials ranked by BM25 score for the query."""
+        n_docs = len(self._docs)
+        if n_docs == 0:
+            return []
+
+        avg_len = self._total_len / n_docs
+        scores: Dict[str, float] = {}
+
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in postings.items():
+                norm = K1 * (1 - B + B * self._doc_len[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+        return [{**self._docs[doc_id], "score": round(score, 4)} for doc_id, score in top]
+
+
+# Shared index instance
+_tutorial_index: Optional[TutorialIndex] = None
+
+
+def get_tutorial_index() -> TutorialIndex:
+    """Get or create the shared tutorial index."""
+    global _tutorial_index
+    if _tutorial_index is None:
+        _tutorial_index = TutorialIndex()
+    return _tutorial_index
@@ -0,0 +1,87 @@
+"""User cache service - short-TTL cache of authenticated user documents."""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from bson import ObjectId
+
+from config import AUTH_USER_CACHE_TTL_SECONDS, AUTH_USER_CACHE_MAX_ITEMS
+
+
+class UserCache:
+    """Bounded LRU of user documents keyed by id, expiring after a short TTL.
+
+    Admin updates and deletes invalidate entries in this process; the TTL
+    bounds how long another worker can keep serving a stale role.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = AUTH_USER_CACHE_TTL_SECONDS,
+        max_items: int = AUTH_USER_CACHE_MAX_ITEMS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self._clock = clock
+        self._users: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return a cached user document, or None if missing or expired."""
+        entry = self._users.get(user_id)
+        if entry is None or self._clock() - entry[0] >= self.ttl_seconds:
+            if entry is not None:
+                del self._users[user_id]
+            self.misses += 1
+            return None
+        self._users.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user_id: str, user: Dict[str, Any]) -> None:
+        self._users[user_id] = (self._clock(), user)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_items:
+            self._users.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user after their document changes (update, delete, role change)."""
+        self._users.pop(str(user_id), None)
+
+    def clear(self) -> None:
+        self._users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached_users": len(self._users),
+        }
+
+
+async def load_user(user_id: str, collection: Any, cache: Optional["UserCache"] = None) -> Optional[Dict[str, Any]]:
+    """Fetch a user document by id, serving repeat lookups from the cache."""
+    cache = cache or get_user_cache()
+    user = cache.get(user_id)
+    if user is not None:
+        return user
+    if not ObjectId.is_valid(user_id):
+        return None
+    user = await collection.find_one({"_id": ObjectId(user_id)})
+    if user is not None:
+        cache.put(user_id, user)
+    return user
+
+
+# Shared cache instance
+_user_cache: Optional[UserCache] = None
+
+
+def get_user_cache() -> UserCache:
+    """Get or create the shared user cache."""
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = UserCache()
+    return _user_cache
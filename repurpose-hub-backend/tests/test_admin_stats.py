@@ -0,0 +1,139 @@
+"""Tests for admin dashboard stats."""
+import asyncio
+from datetime import datetime
+
+from services.admin_stats import (
+    DashboardStatsCache, checkout_stats_pipeline, compute_dashboard_stats, counts_pipeline,
+)
+
+TODAY = datetime(2026, 1, 10)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeCollection:
+    """Returns a canned $facet result and records what was asked."""
+
+    def __init__(self, facet=None, count=0):
+        self.facet = facet or {}
+        self.count = count
+        self.pipelines = []
+        self.calls = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        facets = pipeline[-1]["$facet"]
+        return FakeCursor([{name: self.facet.get(name, []) for name in facets}])
+
+    async def estimated_document_count(self):
+        self.calls.append("estimated")
+        return self.count
+
+    async def count_documents(self, query):
+        self.calls.append("count")
+        return self.count
+
+
+def collections():
+    users = FakeCollection({"total": [{"n": 40}], "new_today": [{"n": 3}]}, count=41)
+    products = FakeCollection(count=12)
+    checkouts = FakeCollection({
+        "total": [{"n": 9}],
+        "pending": [{"n": 2}],
+        "revenue": [{"_id": None, "orders": 6, "total_paise": 1234550, "today_paise": 50000}],
+    }, count=10)
+    donations = FakeCollection({"total": [{"n": 5}]}, count=5)
+    return users, products, checkouts, donations
+
+
+class TestPipelines:
+    def test_exact_checkout_stats_in_one_facet(self):
+        pipeline = checkout_stats_pipeline(TODAY, exact_total=True)
+        assert len(pipeline) == 1
+        assert set(pipeline[0]["$facet"]) == {"total", "pending", "revenue"}
+
+    def test_estimated_checkout_stats_match_by_status_first(self):
+        pipeline = checkout_stats_pipeline(TODAY, exact_total=False)
+        assert pipeline[0] == {"$match": {"status": {"$in": ["pending", "pending_payment", "completed"]}}}
+        assert "total" not in pipeline[1]["$facet"]
+
+    def test_counts_pipeline(self):
+        pipeline = counts_pipeline({"processing": {"status": "Processing"}}, exact_total=True)
+        assert pipeline == [{"$facet": {
+            "processing": [{"$match": {"status": "Processing"}}, {"$count": "n"}],
+            "total": [{"$count": "n"}],
+        }}]
+
+
+class TestComputeDashboardStats:
+    def test_exact_totals_from_facets(self):
+        users, products, checkouts, donations = collections()
+        stats = asyncio.run(compute_dashboard_stats(users, products, checkouts, donations, today=TODAY))
+        assert (stats["total_users"], stats["total_orders"], stats["total_donations"]) == (40, 9, 5)
+        assert stats["total_products"] == 12
+        assert stats["total_revenue"] == 12345.5
+        assert stats["revenue_today"] == 500.0
+        assert (stats["pending_orders"], stats["new_users_today"], stats["processing_donations"]) == (2, 3, 0)
+        assert stats["completed_orders"] == 6
+        assert not stats["estimated"]
+        # One aggregation per collection with a facet, no separate counts
+        assert [len(c.pipelines) for c in (users, checkouts, donations)] == [1, 1, 1]
+        assert users.calls == checkouts.calls == donations.calls == []
+
+    def test_estimated_totals_from_metadata(self):
+        users, products, checkouts, donations = collections()
+        stats = asyncio.run(compute_dashboard_stats(
+            users, products, checkouts, donations, estimated=True, today=TODAY,
+        ))
+        assert (stats["total_users"], stats["total_orders"]) == (41, 10)
+        assert stats["estimated"]
+        assert all(c.calls == ["estimated"] for c in (users, products, checkouts, donations))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDashboardStatsCache:
+    def test_concurrent_misses_compute_once(self):
+        cache = DashboardStatsCache(ttl_seconds=15, clock=FakeClock())
+        computed = []
+
+        async def compute():
+            computed.append(1)
+            await asyncio.sleep(0.01)
+            return {"total_users": len(computed)}
+
+        async def scenario():
+            return await asyncio.gather(*(cache.get("dashboard", compute) for _ in range(5)))
+
+        results = asyncio.run(scenario())
+        assert computed == [1]
+        assert all(result == {"total_users": 1} for result in results)
+        assert (cache.hits, cache.misses) == (4, 1)
+
+    def test_expires_after_ttl(self):
+        clock = FakeClock()
+        cache = DashboardStatsCache(ttl_seconds=15, clock=clock)
+        calls = []
+
+        async def compute():
+            calls.append(clock.now)
+            return {"at": clock.now}
+
+        asyncio.run(cache.get("dashboard", compute))
+        clock.now = 14.0
+        asyncio.run(cache.get("dashboard", compute))
+        clock.now = 15.0
+        assert asyncio.run(cache.get("dashboard", compute)) == {"at": 15.0}
+        assert calls == [0.0, 15.0]
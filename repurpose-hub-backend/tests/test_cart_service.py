@@ -1,6 +1,31 @@
 """Tests for cart service."""
+import asyncio
+
 import pytest
-from services.cart import parse_price, calculate_cart_total, validate_cart_amount
+from pymongo.errors import DuplicateKeyError
+from services.cart import (
+    parse_price,
+    calculate_cart_total,
+    validate_cart_amount,
+    clean_cart_item,
+    merge_cart_items,
+    build_add_items_update,
+    build_set_quantities_update,
+    build_add_unique_items_update,
+    apply_items_update,
+)
+
+
+def cart_item(item_id, quantity=1, **extra):
+    return {
+        "id": item_id,
+        "name": "Tote",
+        "price": "Rs. 100",
+        "quantity": quantity,
+        "companyname": "reCharkha",
+        "imageurl": "http://img",
+        **extra,
+    }
 
 
 class TestParsePrice:
@@ -81,4 +106,155 @@ class TestValidateCartAmount:
         calculated = calculate_cart_total(items)
         # 2% tolerance = 2.4, 5.0 is outside
         is_valid, total = validate_cart_amount(items, calculated + 5.0)
-        assert is_valid is False
\ No newline at end of file
+        assert is_valid is False
+
+
+class TestCleanCartItem:
+    def test_drops_non_cart_fields(self):
+        item = clean_cart_item(cart_item("a", stock=100))
+        assert "stock" not in item
+        assert item["quantity"] == 1
+
+    def test_coerces_types(self):
+        item = clean_cart_item(cart_item(5, quantity="3"))
+        assert item["id"] == "5"
+        assert item["quantity"] == 3
+
+    def test_stores_price_paise(self):
+        assert clean_cart_item(cart_item("a"))["price_paise"] == 10000
+
+
+class TestMergeCartItems:
+    def test_sums_repeated_ids(self):
+        merged = merge_cart_items([cart_item("a", 1), cart_item("b", 2), cart_item("a", 3)])
+        assert [(i["id"], i["quantity"]) for i in merged] == [("a", 4), ("b", 2)]
+
+    def test_empty(self):
+        assert merge_cart_items([]) == []
+
+
+def evaluate(expr, doc, variables):
+    """Evaluate the aggregation expressions the items pipelines use."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        if expr.startswith("$$"):
+            name, *path = expr[2:].split(".")
+            value = variables[name]
+        else:
+            value, path = doc, expr[1:].split(".")
+        for field in path:
+            if isinstance(value, list):
+                value = [v.get(field) for v in value]
+            else:
+                value = value.get(field) if value is not None else None
+        return value
+    if isinstance(expr, list):
+        return [evaluate(e, doc, variables) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if not (len(expr) == 1 and next(iter(expr)).startswith("$")):
+        return {k: evaluate(v, doc, variables) for k, v in expr.items()}
+    op, arg = next(iter(expr.items()))
+    if op == "$literal":
+        return arg
+    if op in ("$map", "$filter"):
+        name = arg.get("as", "this")
+        results = []
+        for element in evaluate(arg["input"], doc, variables):
+            scope = {**variables, name: element}
+            if op == "$map":
+                results.append(evaluate(arg["in"], doc, scope))
+            elif evaluate(arg["cond"], doc, scope):
+                results.append(element)
+        return results
+    if op == "$let":
+        scope = {**variables, **{k: evaluate(v, doc, variables) for k, v in arg["vars"].items()}}
+        return evaluate(arg["in"], doc, scope)
+    if op == "$cond":
+        condition, then, otherwise = arg
+        return evaluate(then if evaluate(condition, doc, variables) else otherwise, doc, variables)
+    values = evaluate(arg, doc, variables)
+    if op == "$ifNull":
+        return next((v for v in values if v is not None), None)
+    if op == "$concatArrays":
+        return [element for value in values for element in value]
+    if op == "$mergeObjects":
+        return {k: v for value in values for k, v in value.items()}
+    if op == "$arrayElemAt":
+        return values[0][values[1]]
+    operators = {
+        "$eq": lambda a, b: a == b, "$gt": lambda a, b: a > b,
+        "$add": lambda a, b: a + b, "$in": lambda a, b: a in b,
+    }
+    if op == "$size":
+        return len(values)
+    return operators[op](*values)
+
+
+class UpdateResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class PipelineCollection:
+    """Applies pipeline updates; ``racer`` is a cart another request upserts first."""
+
+    def __init__(self, docs=(), racer=None):
+        self.docs = [dict(doc) for doc in docs]
+        self.racer = racer
+        self.updates = 0
+
+    async def update_one(self, query, pipeline, upsert=False):
+        self.updates += 1
+        doc = next((d for d in self.docs if d["user_id"] == query["user_id"]), None)
+        if doc is None:
+            if not upsert:
+                return UpdateResult(0)
+            if self.racer is not None:
+                self.docs.append(self.racer)
+                self.racer = None
+                raise DuplicateKeyError("E11000 duplicate key error")
+            doc = dict(query)
+            self.docs.append(doc)
+        for stage in pipeline:
+            doc.update(evaluate(stage["$set"], doc, {}))
+        return UpdateResult(1)
+
+
+def cart_after(pipeline, docs=(), racer=None):
+    collection = PipelineCollection(docs, racer)
+    asyncio.run(apply_items_update(collection, "u1", pipeline))
+    return collection
+
+
+def lines(collection):
+    return [(item["id"], item["quantity"]) for item in collection.docs[0]["items"]]
+
+
+class TestItemsPipelines:
+    def test_add_items_creates_cart_with_merged_lines(self):
+        cart = cart_after(build_add_items_update([cart_item("a", 1), cart_item("a", 2), cart_item("b")]))
+        assert lines(cart) == [("a", 3), ("b", 1)]
+        assert cart.docs[0]["items"][0] == clean_cart_item(cart_item("a", 3))
+
+    def test_add_items_increments_existing_lines(self):
+        existing = {"user_id": "u1", "items": [clean_cart_item(cart_item("a", 2))]}
+        cart = cart_after(build_add_items_update([cart_item("a", 1), cart_item("c", 4)]), [existing])
+        assert lines(cart) == [("a", 3), ("c", 4)]
+
+    def test_set_quantities_drops_zero_lines(self):
+        existing = {"user_id": "u1", "items": [clean_cart_item(cart_item(i, 1)) for i in "abc"]}
+        cart = cart_after(build_set_quantities_update({"a": 5, "b": 0, "z": 2}), [existing])
+        # Unknown ids are ignored rather than added
+        assert lines(cart) == [("a", 5), ("c", 1)]
+
+    def test_add_unique_items_keeps_existing_quantity(self):
+        existing = {"user_id": "u1", "items": [cart_item("a", 1)]}
+        pipeline = build_add_unique_items_update([cart_item("a", 9), cart_item("b"), cart_item("b", 2)])
+        assert lines(cart_after(pipeline, [existing])) == [("a", 1), ("b", 1)]
+
+    def test_concurrent_upsert_is_retried_on_the_winning_cart(self):
+        racer = {"user_id": "u1", "items": [clean_cart_item(cart_item("a", 2))]}
+        cart = cart_after(build_add_items_update([cart_item("a", 1)]), racer=racer)
+        assert cart.updates == 2
+        assert len(cart.docs) == 1
+        assert lines(cart) == [("a", 3)]
@@ -0,0 +1,159 @@
+"""Tests for catalog service."""
+import asyncio
+
+import pytest
+from bson import ObjectId
+from services.catalog import (
+    format_product,
+    parse_fields,
+    build_projection,
+    build_product_filter,
+    fetch_products_by_ids,
+)
+from services.catalog_cache import CatalogCache
+
+
+class TestFormatProduct:
+    def test_maps_scraped_field_names(self):
+        doc = {
+            "_id": ObjectId(),
+            "name": "Tote",
+            "price": "Rs. 640",
+            "quantity": 100,
+            "companyName": "reCharkha",
+            "image_url": "http://img",
+        }
+        product = format_product(doc)
+        assert product["id"] == str(doc["_id"])
+        assert product["stock"] == 100
+        assert product["companyname"] == "reCharkha"
+        assert product["imageurl"] == "http://img"
+
+    def test_prefers_stock_over_quantity(self):
+        doc = {"_id": ObjectId(), "name": "Tote", "price": "1", "stock": 5, "quantity": 100}
+        assert format_product(doc)["stock"] == 5
+
+    def test_missing_fields_use_defaults(self):
+        product = format_product({"_id": ObjectId(), "name": "Tote", "price": "1"})
+        assert product["stock"] == 0
+        assert product["companyname"] == ""
+
+    def test_price_paise_prefers_stored_field(self):
+        doc = {"_id": ObjectId(), "price": "Rs. 640", "price_paise": 64000}
+        assert format_product(doc, ["price_paise"])["price_paise"] == 64000
+
+    def test_price_paise_parsed_for_unmigrated_documents(self):
+        doc = {"_id": ObjectId(), "price": "Rs. 1,640"}
+        assert format_product(doc, ["price_paise"])["price_paise"] == 164000
+
+    def test_limits_to_requested_fields(self):
+        doc = {"_id": ObjectId(), "name": "Tote", "price": "1", "stock": 5}
+        assert set(format_product(doc, ["name"])) == {"id", "name"}
+
+
+class TestParseFields:
+    def test_none_means_all_fields(self):
+        assert parse_fields(None) is None
+        assert parse_fields("") is None
+
+    def test_parses_comma_separated(self):
+        assert parse_fields("name, Price") == ["name", "price"]
+
+    def test_rejects_unknown_fields(self):
+        with pytest.raises(ValueError, match="Unknown fields: bogus"):
+            parse_fields("name,bogus")
+
+
+class TestBuildProjection:
+    def test_none_projects_everything(self):
+        assert build_projection(None) is None
+
+    def test_includes_all_stored_aliases(self):
+        assert build_projection(["stock"]) == {"stock": 1, "quantity": 1}
+
+
+class TestBuildProductFilter:
+    def test_empty_filter(self):
+        assert build_product_filter() == {}
+
+    def test_company_and_vendor(self):
+        query = build_product_filter(company="reCharkha", vendor="reCharkha EcoSocial")
+        assert query == {"companyName": "reCharkha", "vendor": "reCharkha EcoSocial"}
+
+    def test_cursor_becomes_id_range(self):
+        oid = ObjectId()
+        assert build_product_filter(after=str(oid)) == {"_id": {"$gt": oid}}
+
+    def test_invalid_cursor_raises(self):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            build_product_filter(after="not-an-id")
+
+    def test_price_range_filters_paise(self):
+        query = build_product_filter(min_price=100, max_price=499.5)
+        assert query == {"price_paise": {"$gte": 10000, "$lte": 49950}}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeProducts:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append((query, projection))
+        wanted = set(query["_id"]["$in"])
+        return FakeCursor([
+            {k: v for k, v in doc.items() if k == "_id" or k in projection}
+            for doc in self.docs if doc["_id"] in wanted
+        ])
+
+
+class TestFetchProductsByIds:
+    def setup_method(self):
+        self.lamp = {"_id": ObjectId(), "name": "Lamp", "price": "Rs. 500", "stock": 3,
+                     "description": "long text"}
+        self.tote = {"_id": ObjectId(), "name": "Tote", "price": "Rs. 100", "quantity": 5}
+        self.products = FakeProducts([self.lamp, self.tote])
+
+    def test_request_order_with_missing_ids_in_one_query(self):
+        lamp, tote, unknown = str(self.lamp["_id"]), str(self.tote["_id"]), str(ObjectId())
+        result = asyncio.run(fetch_products_by_ids(
+            self.products, [tote, unknown, lamp, "bad-id", tote]
+        ))
+        assert [p and p["name"] for p in result] == ["Tote", None, "Lamp", None, "Tote"]
+        assert len(self.products.queries) == 1
+        query, projection = self.products.queries[0]
+        assert len(query["_id"]["$in"]) == 3
+        assert "description" not in projection
+
+    def test_cache_hits_skip_the_query_and_misses_fill_it(self):
+        cache = CatalogCache()
+        cache.put(format_product(self.lamp))
+        ids = [str(self.lamp["_id"]), str(self.tote["_id"])]
+        asyncio.run(fetch_products_by_ids(self.products, ids, cache))
+        assert self.products.queries[0][0]["_id"]["$in"] == [self.tote["_id"]]
+
+        result = asyncio.run(fetch_products_by_ids(self.products, ids, cache))
+        assert len(self.products.queries) == 1
+        assert result[1]["stock"] == 5
+
+    def test_field_subset_is_not_cached(self):
+        cache = CatalogCache()
+        cache.put(format_product(self.lamp))
+        ids = [str(self.lamp["_id"]), str(self.tote["_id"])]
+        result = asyncio.run(fetch_products_by_ids(self.products, ids, cache, ["price"]))
+        assert result == [
+            {"id": ids[0], "price": "Rs. 500"}, {"id": ids[1], "price": "Rs. 100"},
+        ]
+        assert cache.get(ids[1]) is None
+
+    def test_rejects_too_many_ids(self):
+        with pytest.raises(ValueError, match="At most 100 ids"):
+            asyncio.run(fetch_products_by_ids(self.products, [str(ObjectId())] * 101))
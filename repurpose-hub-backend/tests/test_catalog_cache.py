@@ -0,0 +1,97 @@
+"""Tests for catalog cache service."""
+import pytest
+from services.catalog_cache import CatalogCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def product(product_id, name="Tote", price="Rs. 100"):
+    return {"id": product_id, "name": name, "price": price}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return CatalogCache(ttl_seconds=60, max_items=3, clock=clock)
+
+
+class TestSnapshot:
+    def test_empty_cache_misses(self, cache):
+        assert cache.get_snapshot() is None
+        assert cache.misses == 1
+
+    def test_returns_snapshot_within_ttl(self, cache, clock):
+        cache.set_snapshot([product("a"), product("b")])
+        clock.now = 59
+        assert [p["id"] for p in cache.get_snapshot()] == ["a", "b"]
+        assert cache.hits == 1
+
+    def test_snapshot_expires_after_ttl(self, cache, clock):
+        cache.set_snapshot([product("a")])
+        clock.now = 60
+        assert cache.get_snapshot() is None
+
+    def test_snapshot_populates_by_id(self, cache):
+        cache.set_snapshot([product("a"), product("b")])
+        assert cache.get("b")["id"] == "b"
+
+
+class TestById:
+    def test_put_and_get(self, cache):
+        cache.put(product("a"))
+        assert cache.get("a")["name"] == "Tote"
+
+    def test_entry_expires(self, cache, clock):
+        cache.put(product("a"))
+        clock.now = 61
+        assert cache.get("a") is None
+
+    def test_size_bound_evicts_least_recently_used(self, cache):
+        for pid in ["a", "b", "c"]:
+            cache.put(product(pid))
+        cache.get("a")
+        cache.put(product("d"))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["cached_products"] == 3
+
+
+class TestWriteThrough:
+    def test_put_patches_snapshot(self, cache):
+        cache.set_snapshot([product("a"), product("b")])
+        cache.put(product("b", name="Updated"))
+        assert cache.get_snapshot()[1]["name"] == "Updated"
+
+    def test_add_invalidates_snapshot(self, cache):
+        cache.set_snapshot([product("a")])
+        cache.add(product("b"))
+        assert cache.get_snapshot() is None
+        assert cache.get("b") is not None
+
+    def test_remove_drops_from_snapshot_and_map(self, cache):
+        cache.set_snapshot([product("a"), product("b")])
+        cache.remove("a")
+        assert [p["id"] for p in cache.get_snapshot()] == ["b"]
+        assert cache.get("a") is None
+
+    def test_invalidate_clears_everything(self, cache):
+        cache.set_snapshot([product("a")])
+        cache.invalidate()
+        assert cache.get_snapshot() is None
+        assert cache.get("a") is None
+
+    def test_mutations_bump_version(self, cache):
+        cache.set_snapshot([product("a")])
+        version = cache.version
+        cache.put(product("a", name="Updated"))
+        assert cache.version > version
@@ -0,0 +1,78 @@
+"""Integration tests for the transactional checkout completion.
+
+Needs MongoDB running as a replica set, e.g. a local single-node one:
+
+    mongod --dbpath /tmp/mongodb-rs --replSet rs0 --port 27018 --fork --logpath /tmp/mongodb-rs.log
+    mongosh --port 27018 --eval 'rs.initiate()'
+    MONGODB_REPLSET_URI=mongodb://localhost:27018/?replicaSet=rs0 python -m pytest tests/test_checkout_transaction.py
+"""
+import asyncio
+import os
+
+import pytest
+from bson import ObjectId
+from services.checkout import finalize_paid_checkout
+
+REPLSET_URI = os.getenv("MONGODB_REPLSET_URI")
+
+pytestmark = pytest.mark.skipif(
+    not REPLSET_URI, reason="set MONGODB_REPLSET_URI to a replica set to run transaction tests"
+)
+
+
+async def with_database(scenario):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(REPLSET_URI)
+    db = client[f"checkout_tx_{ObjectId()}"]
+    try:
+        checkout_id = (await db.checkout.insert_one({
+            "user_id": "u1", "items": [{"quantity": 2}], "status": "pending_payment",
+        })).inserted_id
+        # Collections must exist before they are written in a transaction
+        await db.create_collection("outbox")
+        return await scenario(client, db, checkout_id)
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+def finalize(db, checkout_id, session):
+    return finalize_paid_checkout(
+        {"_id": checkout_id}, "order_1", "pay_1", db.checkout, db.outbox, session=session,
+    )
+
+
+class TestCheckoutTransaction:
+    def test_commits_all_writes(self):
+        async def scenario(client, db, checkout_id):
+            async with await client.start_session() as session:
+                await session.with_transaction(lambda s: finalize(db, checkout_id, s))
+            return (
+                await db.checkout.find_one({"_id": checkout_id}),
+                await db.outbox.find({"payload.checkout_id": checkout_id}).to_list(length=None),
+            )
+
+        checkout, tasks = asyncio.run(with_database(scenario))
+        assert checkout["status"] == "completed"
+        assert sorted(task["task"] for task in tasks) == [
+            "clear_cart", "clear_stock_holds", "credit_eco_impact", "record_order_stats",
+        ]
+
+    def test_failure_midway_rolls_back(self):
+        async def scenario(client, db, checkout_id):
+            async def crash_after_writes(session):
+                await finalize(db, checkout_id, session)
+                raise RuntimeError("worker died")
+
+            async with await client.start_session() as session:
+                with pytest.raises(RuntimeError):
+                    await session.with_transaction(crash_after_writes)
+            return (
+                await db.checkout.find_one({"_id": checkout_id}),
+                await db.outbox.count_documents({}),
+            )
+
+        checkout, queued = asyncio.run(with_database(scenario))
+        assert checkout["status"] == "pending_payment"
+        assert queued == 0
@@ -0,0 +1,75 @@
+"""Tests for circuit breaker service."""
+import pytest
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(
+        "test", failure_rate_threshold=0.5, slow_call_rate_threshold=0.5,
+        slow_call_seconds=1.0, window_seconds=10, min_calls=4, open_seconds=5, clock=clock,
+    )
+
+
+def record(breaker, n, duration=0.1, failed=False):
+    for _ in range(n):
+        breaker.acquire()
+        breaker.record(duration, failed)
+
+
+class TestCircuitBreaker:
+    def test_stays_closed_below_min_calls(self, breaker):
+        record(breaker, 3, failed=True)
+        assert breaker.state == "closed"
+
+    def test_opens_on_failure_rate(self, breaker):
+        record(breaker, 2)
+        record(breaker, 2, failed=True)
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError) as exc:
+            breaker.acquire()
+        assert exc.value.retry_after == 5
+        assert breaker.stats()["rejected"] == 1
+
+    def test_opens_on_slow_calls(self, breaker):
+        record(breaker, 2)
+        record(breaker, 2, duration=1.5)
+        assert breaker.state == "open"
+
+    def test_old_calls_leave_the_window(self, breaker, clock):
+        record(breaker, 3, failed=True)
+        clock.now = 11
+        record(breaker, 3)
+        assert breaker.state == "closed"
+        assert breaker.stats()["calls_in_window"] == 3
+
+    def test_half_open_probe_success_closes(self, breaker, clock):
+        record(breaker, 4, failed=True)
+        clock.now = 5
+        assert breaker.state == "half_open"
+        breaker.acquire()
+        with pytest.raises(CircuitOpenError):
+            breaker.acquire()
+        breaker.record(0.1, failed=False)
+        assert breaker.state == "closed"
+        assert breaker.stats()["calls_in_window"] == 0
+
+    def test_half_open_probe_failure_reopens(self, breaker, clock):
+        record(breaker, 4, failed=True)
+        clock.now = 5
+        record(breaker, 1, duration=2.0)
+        assert breaker.state == "open"
+        assert breaker.stats()["times_opened"] == 2
@@ -0,0 +1,145 @@
+"""Tests for the community impact running totals."""
+import asyncio
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+from services.community_impact import CommunityImpact, community_totals_pipeline
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeEcoImpact:
+    """Sums the per-user documents the way the $group would."""
+
+    def __init__(self, users=()):
+        self.users = list(users)
+        self.aggregations = 0
+
+    def aggregate(self, pipeline):
+        self.aggregations += 1
+        if not self.users:
+            return FakeCursor([])
+        group = {"_id": None, "total_users": len(self.users)}
+        for field, total in [("co2_saved", "total_co2"), ("water_saved", "total_water"),
+                             ("waste_diverted", "total_waste"), ("trees_saved", "total_trees")]:
+            group[total] = sum(user.get(field, 0) for user in self.users)
+        return FakeCursor([group])
+
+
+class UpdateResult:
+    def __init__(self, matched_count):
+        self.matched_count = matched_count
+
+
+class FakeTotals:
+    def __init__(self):
+        self.doc = None
+        self.reads = 0
+        self.before_update = None
+
+    async def find_one(self, query):
+        self.reads += 1
+        return dict(self.doc) if self.doc else None
+
+    async def insert_one(self, doc):
+        if self.doc is not None:
+            raise DuplicateKeyError("duplicate key")
+        self.doc = dict(doc)
+
+    async def update_one(self, query, update):
+        if self.before_update:
+            self.before_update()
+        if self.doc is None or self.doc.get("version", 0) != query["version"]:
+            return UpdateResult(0)
+        self.doc.update(update["$set"])
+        return UpdateResult(1)
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        if self.doc is None:
+            self.doc = {"_id": query["_id"]}
+        for field, amount in update["$inc"].items():
+            self.doc[field] = self.doc.get(field, 0) + amount
+        self.doc.update(update["$set"])
+        return dict(self.doc)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+USERS = [
+    {"co2_saved": 1.0, "water_saved": 20.0, "waste_diverted": 0.4, "trees_saved": 0.02},
+    {"co2_saved": 0.5, "water_saved": 10.0, "waste_diverted": 0.2, "trees_saved": 0.01},
+]
+
+
+def make(users=USERS, **kwargs):
+    return CommunityImpact(FakeEcoImpact(users), FakeTotals(), clock=FakeClock(), **kwargs)
+
+
+class TestCommunityImpact:
+    def test_pipeline_groups_every_field(self):
+        group = community_totals_pipeline()[0]["$group"]
+        assert group["total_co2"] == {"$sum": "$co2_saved"}
+        assert group["total_users"] == {"$sum": 1}
+
+    def test_first_read_builds_document_then_serves_from_memory(self):
+        impact = make()
+
+        async def scenario():
+            return [await impact.get() for _ in range(3)]
+
+        first, *rest = asyncio.run(scenario())
+        assert first == pytest.approx({"total_co2": 1.5, "total_water": 30.0, "total_waste": 0.6,
+                                       "total_trees": 0.03, "total_users": 2})
+        assert rest == [first, first]
+        assert impact.eco_impact.aggregations == 1
+        assert (impact.hits, impact.misses) == (2, 1)
+
+    def test_add_updates_document_and_copy(self):
+        impact = make(users=[])
+        asyncio.run(impact.get())
+        totals = asyncio.run(impact.add({"co2_saved": 1.0, "water_saved": 20.0}, new_users=1))
+        assert totals["total_co2"] == 1.0 and totals["total_users"] == 1
+        assert impact.totals.doc["version"] == 1
+        # Served from the copy refreshed by the write
+        reads = impact.totals.reads
+        assert asyncio.run(impact.get()) == totals
+        assert impact.totals.reads == reads
+
+    def test_copy_reloaded_after_max_age(self):
+        impact = make(max_age_seconds=30)
+        asyncio.run(impact.get())
+        impact.totals.doc["total_users"] = 5  # written by another worker
+        impact._clock.now = 31.0
+        assert asyncio.run(impact.get())["total_users"] == 5
+
+    def test_repair_overwrites_drift(self):
+        impact = make()
+        asyncio.run(impact.get())
+        impact.totals.doc.update(total_co2=9.0, total_users=1)
+        result = asyncio.run(impact.repair())
+        assert result["applied"]
+        assert result["drift"] == {"total_co2": -7.5, "total_users": 1}
+        assert impact.totals.doc["total_co2"] == 1.5
+        assert asyncio.run(impact.get())["total_users"] == 2
+
+    def test_repair_skips_when_incremented_meanwhile(self):
+        impact = make()
+        asyncio.run(impact.get())
+        # A credit lands between the repair's read and its write
+        impact.totals.before_update = lambda: impact.totals.doc.update(
+            version=impact.totals.doc["version"] + 1, total_users=3,
+        )
+        assert not asyncio.run(impact.repair())["applied"]
+        assert impact.totals.doc["total_users"] == 3
@@ -0,0 +1,204 @@
+"""Tests for the daily stats rollups."""
+import asyncio
+from datetime import date, datetime
+
+import pytest
+from services.daily_stats import (
+    query_series, rebuild_daily_stats, record_completed_order, record_daily, series_range,
+)
+
+JAN_5 = datetime(2026, 1, 5, 9, 30)  # a Monday
+
+
+def matches(doc, query):
+    for key, cond in query.items():
+        present = key in doc
+        value = doc.get(key)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+        for op, arg in cond.items():
+            if op == "$exists" and present != arg:
+                return False
+            if op == "$type" and not isinstance(value, datetime):
+                return False
+            if op == "$in" and value not in arg:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte") and not present:
+                return False
+            if op == "$gt" and not value > arg:
+                return False
+            if op == "$gte" and not value >= arg:
+                return False
+            if op == "$lt" and not value < arg:
+                return False
+            if op == "$lte" and not value <= arg:
+                return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[field])
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = [dict(doc) for doc in docs]
+        self.finds = []
+
+    def find(self, query, projection=None):
+        self.finds.append(query)
+        return FakeCursor([dict(d) for d in self.docs if matches(d, query)])
+
+    async def update_one(self, query, update, upsert=False):
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        if doc is None:
+            if not upsert:
+                return
+            doc = dict(query)
+            doc.update(update.get("$setOnInsert", {}))
+            self.docs.append(doc)
+        doc.update(update.get("$set", {}))
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+
+    async def update_many(self, query, update):
+        for doc in self.docs:
+            if matches(doc, query):
+                doc.update(update["$set"])
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        if doc is None:
+            return None
+        doc.update(update["$set"])
+        return dict(doc)
+
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            await self.update_one(op._filter, op._doc, upsert=op._upsert)
+
+
+def bucket(collection, key):
+    return next(doc for doc in collection.docs if doc["_id"] == key)
+
+
+class TestLiveCounters:
+    def test_increments_share_a_day_bucket(self):
+        daily = FakeCollection()
+
+        async def scenario():
+            await record_daily(daily, JAN_5, new_users=1)
+            await record_daily(daily, JAN_5.replace(hour=22), new_users=1, donations=1)
+
+        asyncio.run(scenario())
+        assert len(daily.docs) == 1
+        day = bucket(daily, "2026-01-05")
+        assert (day["new_users"], day["donations"]) == (2, 1)
+        assert day["date"] == datetime(2026, 1, 5)
+
+    def test_completed_order_counted_once(self):
+        daily = FakeCollection()
+        checkouts = FakeCollection([
+            {"_id": "c1", "status": "completed", "created_at": JAN_5, "total_paise": 129900},
+            {"_id": "c2", "status": "pending_payment", "created_at": JAN_5, "total_paise": 5000},
+        ])
+
+        async def scenario():
+            return [await record_completed_order(daily, checkouts, cid) for cid in ("c1", "c1", "c2")]
+
+        assert asyncio.run(scenario()) == [True, False, False]
+        day = bucket(daily, "2026-01-05")
+        assert (day["orders"], day["revenue_paise"]) == (1, 129900)
+
+
+class TestQuerySeries:
+    def test_weeks_sum_days_and_fill_gaps(self):
+        daily = FakeCollection([
+            {"_id": "2026-01-05", "orders": 2, "revenue_paise": 10050, "new_users": 1},
+            {"_id": "2026-01-11", "orders": 1, "revenue_paise": 50, "donations": 3},
+            {"_id": "2026-01-20", "orders": 4, "revenue_paise": 400},
+            {"_id": "2026-02-01", "orders": 9},
+        ])
+        series = asyncio.run(query_series(daily, date(2026, 1, 5), date(2026, 1, 25), "week"))
+        assert series["labels"] == ["2026-01-05", "2026-01-12", "2026-01-19"]
+        assert series["series"] == {
+            "revenue": [101.0, 0.0, 4.0],
+            "orders": [3, 0, 4],
+            "new_users": [1, 0, 0],
+            "donations": [3, 0, 0],
+        }
+        # Only the requested days are read
+        assert daily.finds == [{"_id": {"$gte": "2026-01-05", "$lte": "2026-01-25"}}]
+
+    def test_months_label_partial_first_month(self):
+        daily = FakeCollection([{"_id": "2026-01-31", "orders": 1}, {"_id": "2026-02-01", "orders": 2}])
+        series = asyncio.run(query_series(daily, date(2026, 1, 20), date(2026, 2, 10), "month"))
+        assert series["labels"] == ["2026-01-01", "2026-02-01"]
+        assert series["series"]["orders"] == [1, 2]
+
+    def test_rejects_bad_requests(self):
+        daily = FakeCollection()
+        with pytest.raises(ValueError):
+            asyncio.run(query_series(daily, date(2026, 1, 1), date(2026, 1, 2), "hour"))
+        with pytest.raises(ValueError):
+            asyncio.run(query_series(daily, date(2026, 1, 2), date(2026, 1, 1)))
+        with pytest.raises(ValueError):
+            asyncio.run(query_series(daily, date(2000, 1, 1), date(2026, 1, 1)))
+
+    def test_default_ranges_end_today(self):
+        end = date(2026, 3, 18)
+        assert series_range(None, end, "day") == (date(2026, 2, 17), end)
+        assert series_range(None, end, "week") == (date(2025, 12, 29), end)
+        assert series_range(None, end, "month") == (date(2025, 4, 1), end)
+
+    def test_default_end_is_the_utc_date(self):
+        # Buckets are keyed by UTC day, so "today" must be too
+        before = datetime.utcnow().date()
+        _, end = series_range(None, None, "day")
+        assert before <= end <= datetime.utcnow().date()
+
+
+class TestRebuild:
+    def test_rebuilds_from_history_in_batches(self):
+        daily = FakeCollection([
+            {"_id": "2026-01-05", "orders": 7, "revenue_paise": 1},  # drifted
+            {"_id": "2026-01-06", "orders": 2},  # nothing happened that day
+        ])
+        users = FakeCollection([{"_id": i, "created_at": JAN_5} for i in range(3)])
+        checkouts = FakeCollection([
+            {"_id": 1, "status": "completed", "created_at": JAN_5, "total_paise": 1000},
+            {"_id": 2, "status": "completed", "created_at": JAN_5, "total_price": 12.5},
+            {"_id": 3, "status": "expired", "created_at": JAN_5, "total_paise": 999},
+            {"_id": 4, "status": "completed", "created_at": datetime(2026, 1, 7), "total_paise": 1},
+        ])
+        donations = FakeCollection([{"_id": 1, "created_at": datetime(2026, 1, 7)}, {"_id": 2}])
+        progress = []
+
+        result = asyncio.run(rebuild_daily_stats(
+            daily, users, checkouts, donations, batch_size=2, progress=progress.append,
+        ))
+        assert result == {"scanned": 7, "buckets": 3}
+        day = bucket(daily, "2026-01-05")
+        assert (day["orders"], day["revenue_paise"], day["new_users"]) == (2, 2250, 3)
+        assert bucket(daily, "2026-01-06")["orders"] == 0
+        assert (bucket(daily, "2026-01-07")["orders"], bucket(daily, "2026-01-07")["donations"]) == (1, 1)
+        # Counted checkouts are marked so the queued live update skips them
+        assert [("rolled_up_at" in doc) for doc in checkouts.docs] == [True, True, False, True]
+        assert asyncio.run(record_completed_order(daily, checkouts, 1)) is False
+        # Streamed in _id batches rather than one unbounded read
+        assert users.finds[1]["_id"] == {"$gt": 1}
+        assert len(progress) > 3
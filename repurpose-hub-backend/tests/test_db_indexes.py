@@ -0,0 +1,35 @@
+"""Tests for MongoDB index declarations."""
+import pytest
+from db_indexes import INDEXES
+
+
+def index_docs(collection_name):
+    return {model.document["name"]: model.document for model in INDEXES[collection_name]}
+
+
+class TestIndexDeclarations:
+    @pytest.mark.parametrize(
+        "collection_name", ["cart", "wishlist", "eco_impact", "style_preferences"]
+    )
+    def test_per_user_collections_unique_on_user_id(self, collection_name):
+        doc = index_docs(collection_name)["user_id_unique"]
+        assert dict(doc["key"]) == {"user_id": 1}
+        assert doc["unique"] is True
+
+    def test_login_email_is_unique(self):
+        assert index_docs("users")["email_unique"]["unique"] is True
+
+    def test_idempotency_keys_expire_server_side(self):
+        docs = index_docs("idempotency")
+        assert docs["key_unique"]["unique"] is True
+        assert docs["expires_at_ttl"]["expireAfterSeconds"] == 0
+
+    def test_razorpay_order_lookup_is_indexed(self):
+        assert dict(index_docs("orders")["razorpay_order_id_unique"]["key"]) == {
+            "razorpay_order_id": 1
+        }
+
+    def test_index_names_unique_per_collection(self):
+        for collection_name, models in INDEXES.items():
+            names = [model.document["name"] for model in models]
+            assert len(names) == len(set(names)), collection_name
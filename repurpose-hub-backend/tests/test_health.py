@@ -0,0 +1,99 @@
+"""Tests for health monitor service."""
+import asyncio
+
+import pytest
+from services.health import DependencyCheck, HealthMonitor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def ok():
+    return {"ok": 1}
+
+
+async def failing():
+    raise ConnectionError("connection refused")
+
+
+async def hanging():
+    await asyncio.sleep(10)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def monitor(clock):
+    return HealthMonitor(stale_after_intervals=3, clock=clock)
+
+
+class TestHealthMonitor:
+    def test_not_ready_before_first_probe(self, monitor):
+        monitor.add_check(DependencyCheck("database", ok, 5))
+        assert monitor.snapshot()["database"]["status"] == "unknown"
+        assert not monitor.is_ready()
+
+    def test_records_status_and_latency(self, monitor):
+        check = DependencyCheck("database", ok, 5)
+        monitor.add_check(check)
+        asyncio.run(monitor.run_check(check))
+        result = monitor.snapshot()["database"]
+        assert result["status"] == "up"
+        assert result["latency_ms"] is not None
+        assert result["checked_at"] is not None
+        assert monitor.is_ready()
+
+    def test_failure_and_timeout_mark_down(self, monitor):
+        broken = DependencyCheck("database", failing, 5)
+        slow = DependencyCheck("search", hanging, 5, timeout_seconds=0.01)
+        for check in (broken, slow):
+            monitor.add_check(check)
+            asyncio.run(monitor.run_check(check))
+            asyncio.run(monitor.run_check(check))
+        snapshot = monitor.snapshot()
+        assert snapshot["database"]["error"] == "connection refused"
+        assert snapshot["database"]["consecutive_failures"] == 2
+        assert snapshot["search"]["status"] == "down"
+        assert "Timed out" in snapshot["search"]["error"]
+
+    def test_non_critical_down_keeps_ready(self, monitor):
+        database = DependencyCheck("database", ok, 5)
+        payments = DependencyCheck("razorpay", failing, 30, critical=False)
+        for check in (database, payments):
+            monitor.add_check(check)
+            asyncio.run(monitor.run_check(check))
+        assert monitor.is_ready()
+
+    def test_stale_result_is_not_ready(self, monitor, clock):
+        check = DependencyCheck("database", ok, 5)
+        monitor.add_check(check)
+        asyncio.run(monitor.run_check(check))
+        clock.now = 16
+        assert monitor.snapshot()["database"]["status"] == "stale"
+        assert not monitor.is_ready()
+
+    def test_background_loop_probes_each_interval(self):
+        calls = []
+
+        async def counting():
+            calls.append(1)
+
+        async def scenario():
+            monitor = HealthMonitor()
+            monitor.add_check(DependencyCheck("database", counting, 0.01))
+            monitor.start()
+            await asyncio.sleep(0.05)
+            assert monitor.running
+            await monitor.stop()
+            return monitor.running
+
+        assert asyncio.run(scenario()) is False
+        assert len(calls) >= 2
@@ -0,0 +1,76 @@
+"""Tests for HTTP snapshot caching helpers."""
+import gzip
+import json
+import pytest
+from http_cache import (
+    EncodedSnapshot,
+    SnapshotStore,
+    etag_matches,
+    parse_accept_encoding,
+)
+
+
+class TestParseAcceptEncoding:
+    def test_empty_header(self):
+        assert parse_accept_encoding(None) == {}
+
+    def test_parses_codings_and_q_values(self):
+        assert parse_accept_encoding("gzip, br;q=0.5, identity;q=0") == {
+            "gzip": 1.0,
+            "br": 0.5,
+            "identity": 0.0,
+        }
+
+
+class TestEtagMatches:
+    def test_no_header(self):
+        assert etag_matches('"abc"', None) is False
+
+    def test_exact_and_list_match(self):
+        assert etag_matches('"abc"', '"abc"') is True
+        assert etag_matches('"abc"', '"xyz", "abc"') is True
+
+    def test_weak_and_wildcard_match(self):
+        assert etag_matches('"abc"', 'W/"abc"') is True
+        assert etag_matches('"abc"', "*") is True
+
+    def test_mismatch(self):
+        assert etag_matches('"abc"', '"xyz"') is False
+
+
+class TestEncodedSnapshot:
+    def test_body_is_compact_json(self):
+        snapshot = EncodedSnapshot([{"id": "1"}])
+        assert json.loads(snapshot.body) == [{"id": "1"}]
+
+    def test_etag_depends_on_content(self):
+        assert EncodedSnapshot([1]).etag == EncodedSnapshot([1]).etag
+        assert EncodedSnapshot([1]).etag != EncodedSnapshot([2]).etag
+
+    def test_gzip_variant(self):
+        snapshot = EncodedSnapshot([{"id": "1"}])
+        body, encoding = snapshot.encode_for("gzip, deflate")
+        assert encoding == "gzip"
+        assert gzip.decompress(body) == snapshot.body
+
+    def test_identity_when_gzip_not_accepted(self):
+        snapshot = EncodedSnapshot([{"id": "1"}])
+        assert snapshot.encode_for("gzip;q=0") == (snapshot.body, None)
+        assert snapshot.encode_for(None) == (snapshot.body, None)
+
+
+class TestSnapshotStore:
+    def test_reuses_snapshot_for_same_version(self):
+        store = SnapshotStore()
+        calls = []
+        build = lambda: calls.append(1) or [1]
+        first = store.get("products", 1, build)
+        assert store.get("products", 1, build) is first
+        assert len(calls) == 1
+
+    def test_rebuilds_on_version_change(self):
+        store = SnapshotStore()
+        first = store.get("products", 1, lambda: [1])
+        second = store.get("products", 2, lambda: [2])
+        assert first is not second
+        assert json.loads(second.body) == [2]
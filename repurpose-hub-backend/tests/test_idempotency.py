@@ -0,0 +1,145 @@
+"""Tests for idempotency service."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+from services.idempotency import IdempotencyStore
+
+
+class FakeIdempotencyCollection:
+    """Minimal stand-in for a collection with a unique index on `key`."""
+
+    def __init__(self):
+        self.docs = {}
+        self.calls = 0
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        self.calls += 1
+        key = query["key"]
+        doc = self.docs.get(key)
+        if doc is not None and doc["expires_at"] <= query["expires_at"]["$lte"]:
+            before = dict(doc)
+            doc.update(update["$set"])
+            return before
+        if doc is not None:
+            raise DuplicateKeyError("duplicate key")
+        self.docs[key] = dict(update["$set"])
+        return None
+
+    async def find_one(self, query):
+        self.calls += 1
+        return self.docs.get(query["key"])
+
+    async def update_one(self, query, update, upsert=False):
+        self.calls += 1
+        doc = self.docs.get(query["key"])
+        if doc is not None and doc.get("token") != query["token"]:
+            # The upsert collides with the other owner's record
+            raise DuplicateKeyError("duplicate key")
+        if doc is None:
+            doc = self.docs[query["key"]] = {**query, **update["$setOnInsert"]}
+        doc.update(update["$set"])
+
+    async def delete_one(self, query):
+        self.calls += 1
+        doc = self.docs.get(query["key"])
+        if doc is not None and all(doc.get(field) == value for field, value in query.items()):
+            del self.docs[query["key"]]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def collection():
+    return FakeIdempotencyCollection()
+
+
+@pytest.fixture
+def store(collection):
+    return IdempotencyStore(collection, ttl_minutes=30, max_local_keys=2)
+
+
+def lapse(collection, key):
+    collection.docs[key]["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+
+
+class TestClaim:
+    def test_first_claim_wins(self, store):
+        token, result = run(store.claim("k1"))
+        assert token and result is None
+
+    def test_second_claim_while_in_progress_is_rejected(self, store):
+        run(store.claim("k1"))
+        assert run(store.claim("k1")) == (None, None)
+
+    def test_completed_result_is_returned(self, store):
+        token, _ = run(store.claim("k1"))
+        assert run(store.complete("k1", token, {"checkout_id": "abc"}))
+        assert run(store.claim("k1")) == (None, {"checkout_id": "abc"})
+
+    def test_expired_record_can_be_reclaimed(self, store, collection):
+        first, _ = run(store.claim("k1"))
+        lapse(collection, "k1")
+        second, _ = run(store.claim("k1"))
+        assert second and second != first
+
+    def test_released_claim_can_be_retried(self, store):
+        token, _ = run(store.claim("k1"))
+        run(store.release("k1", token))
+        assert run(store.claim("k1"))[0]
+
+
+class TestOwnership:
+    def test_lapsed_owner_cannot_release_new_claim(self, store, collection):
+        slow, _ = run(store.claim("k1"))
+        lapse(collection, "k1")
+        retry, _ = run(store.claim("k1"))
+        # The slow request fails late and releases what it thinks is its claim
+        run(store.release("k1", slow))
+        assert collection.docs["k1"]["token"] == retry
+        # So a third request is still turned away
+        assert run(store.claim("k1")) == (None, None)
+
+    def test_lapsed_owner_cannot_complete_new_claim(self, store, collection):
+        slow, _ = run(store.claim("k1"))
+        lapse(collection, "k1")
+        retry, _ = run(store.claim("k1"))
+        assert not run(store.complete("k1", slow, {"checkout_id": "slow"}))
+        assert collection.docs["k1"]["status"] == "in_progress"
+        assert run(store.complete("k1", retry, {"checkout_id": "retry"}))
+        assert run(store.claim("k1")) == (None, {"checkout_id": "retry"})
+
+    def test_result_stored_after_claim_was_reaped(self, store, collection):
+        token, _ = run(store.claim("k1"))
+        del collection.docs["k1"]  # removed by the TTL monitor
+        assert run(store.complete("k1", token, {"ok": True}))
+        assert collection.docs["k1"]["result"] == {"ok": True}
+
+
+class TestLocalTier:
+    def test_completed_retry_skips_database(self, store, collection):
+        token, _ = run(store.claim("k1"))
+        run(store.complete("k1", token, {"ok": True}))
+        calls = collection.calls
+        assert run(store.claim("k1")) == (None, {"ok": True})
+        assert collection.calls == calls
+
+    def test_result_from_other_worker_is_cached_locally(self, collection):
+        other_worker = IdempotencyStore(collection)
+        token, _ = run(other_worker.claim("k1"))
+        run(other_worker.complete("k1", token, {"ok": True}))
+
+        store = IdempotencyStore(collection)
+        assert run(store.claim("k1")) == (None, {"ok": True})
+        calls = collection.calls
+        run(store.claim("k1"))
+        assert collection.calls == calls
+
+    def test_local_tier_is_bounded(self, store):
+        for key in ["a", "b", "c"]:
+            token, _ = run(store.claim(key))
+            run(store.complete(key, token, {"key": key}))
+        assert list(store._local) == ["b", "c"]
@@ -0,0 +1,307 @@
+"""Tests for stock reservations and the availability view."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from services.inventory import (
+    InsufficientStock, StockReservations, StockView, on_hand_stock_expression, stock_on_hand,
+)
+from services.payment import PaymentGatewayUnavailable
+
+NOW = datetime(2026, 1, 10, 12, 0)
+LAMP, TOTE = ObjectId(), ObjectId()
+
+
+def get_path(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return None, False
+        doc = doc[part]
+    return doc, True
+
+
+def matches(doc, query):
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value, present = get_path(doc, key)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+        for op, arg in cond.items():
+            if op == "$exists" and present != arg:
+                return False
+            if op == "$gte" and not (present and value >= arg):
+                return False
+            if op == "$lt" and not (present and value < arg):
+                return False
+            if op == "$in" and value not in arg:
+                return False
+    return True
+
+
+def apply_update(doc, update):
+    for path, value in update.get("$set", {}).items():
+        *parents, leaf = path.split(".")
+        target = doc
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value
+    for field, amount in update.get("$inc", {}).items():
+        doc[field] = doc.get(field, 0) + amount
+    for path in update.get("$unset", {}):
+        *parents, leaf = path.split(".")
+        target = doc
+        for part in parents:
+            target = target.get(part, {})
+        target.pop(leaf, None)
+
+
+class Result:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = [dict(doc) for doc in docs]
+        self.finds = 0
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        return FakeCursor([dict(d) for d in self.docs if matches(d, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if matches(d, query)), None)
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    async def update_one(self, query, update, session=None):
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        if doc is None:
+            return Result(0)
+        apply_update(doc, update)
+        return Result(1)
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        if doc is not None:
+            apply_update(doc, update)
+            return dict(doc)
+        return None
+
+    async def bulk_write(self, operations, ordered=True):
+        modified = 0
+        for op in operations:
+            modified += (await self.update_one(op._filter, op._doc)).modified_count
+        return Result(modified)
+
+
+def stock_of(products):
+    return {doc["_id"]: doc["stock"] for doc in products.docs}
+
+
+def make_reservations(lamp=3, tote=5, checkouts=(), **kwargs):
+    products = FakeCollection([{"_id": LAMP, "stock": lamp}, {"_id": TOTE, "stock": tote}])
+    return StockReservations(
+        products, FakeCollection(), FakeCollection(checkouts),
+        view=StockView(), now=lambda: NOW, **kwargs,
+    )
+
+
+def cart(lamp=0, tote=0):
+    items = [{"id": str(LAMP), "quantity": lamp}, {"id": str(TOTE), "quantity": tote}]
+    return [item for item in items if item["quantity"]]
+
+
+class TestReserve:
+    def test_holds_every_line(self):
+        stock = make_reservations()
+        # The same product on two cart lines is reserved as one line
+        items = cart(lamp=1, tote=2) + [{"id": str(LAMP), "quantity": 1}]
+        reservation = asyncio.run(stock.reserve("c1", "u1", items))
+        assert reservation["items"] == [
+            {"product_id": str(LAMP), "quantity": 2}, {"product_id": str(TOTE), "quantity": 2},
+        ]
+        assert stock_of(stock.products) == {LAMP: 1, TOTE: 3}
+        assert stock.products.docs[0]["holds"] == {"c1": 2}
+        assert stock.reservations.docs[0]["status"] == "held"
+        assert stock.reservations.docs[0]["expires_at"] == NOW + timedelta(minutes=30)
+
+    def test_partial_reservation_rolls_back(self):
+        stock = make_reservations(lamp=1)
+        with pytest.raises(InsufficientStock) as raised:
+            asyncio.run(stock.reserve("c1", "u1", cart(lamp=2, tote=2)))
+        assert raised.value.shortages == [{"product_id": str(LAMP), "requested": 2, "available": 1}]
+        # The tote decrement that did apply was returned
+        assert stock_of(stock.products) == {LAMP: 1, TOTE: 5}
+        assert stock.products.docs[1]["holds"] == {}
+        assert stock.reservations.docs[0]["status"] == "released"
+        assert stock.rejected == 1
+
+    def test_unknown_product_id_rejected(self):
+        stock = make_reservations()
+        with pytest.raises(InsufficientStock):
+            asyncio.run(stock.reserve("c1", "u1", [{"id": "not-an-id", "quantity": 1}]))
+        assert stock.reservations.docs == []
+
+    def test_release_returns_stock_once(self):
+        stock = make_reservations()
+
+        async def scenario():
+            await stock.reserve("c1", "u1", cart(lamp=2))
+            return await stock.release("c1"), await stock.release("c1")
+
+        assert asyncio.run(scenario()) == (True, False)
+        assert stock_of(stock.products) == {LAMP: 3, TOTE: 5}
+
+
+class TestSweep:
+    def test_lapsed_holds_follow_checkout_status(self):
+        expired = []
+
+        async def on_expired(checkout):
+            expired.append(checkout["_id"])
+
+        stock = make_reservations(
+            checkouts=[{"_id": "paid", "status": "completed"},
+                       {"_id": "abandoned", "status": "pending_payment"},
+                       {"_id": "fresh", "status": "pending_payment"}],
+            on_expired=on_expired,
+        )
+
+        async def scenario():
+            await stock.reserve("paid", "u1", cart(lamp=1))
+            await stock.reserve("abandoned", "u2", cart(lamp=1))
+            await stock.reserve("fresh", "u3", cart(tote=1))
+            for reservation in stock.reservations.docs[:2]:
+                reservation["expires_at"] = NOW - timedelta(minutes=1)
+            return await stock.sweep()
+
+        result = asyncio.run(scenario())
+        assert (result["committed"], result["released"], result["checked"]) == (1, 1, 2)
+        assert expired == ["abandoned"]
+        statuses = {doc["_id"]: doc["status"] for doc in stock.checkouts.docs}
+        assert statuses == {"paid": "completed", "abandoned": "expired", "fresh": "pending_payment"}
+        # Paid stock stays taken, abandoned stock comes back
+        assert stock_of(stock.products) == {LAMP: 2, TOTE: 4}
+        assert stock.products.docs[0]["holds"] == {}
+
+    def lapse_with_order(self, settle_paid):
+        """Sweep a lapsed hold whose checkout has a Razorpay order."""
+        stock = make_reservations(
+            checkouts=[{"_id": "c1", "status": "pending_payment", "razorpay_order_id": "order_1"}],
+            settle_paid=lambda checkout: settle_paid(stock, checkout),
+        )
+
+        async def scenario():
+            await stock.reserve("c1", "u1", cart(lamp=1))
+            stock.reservations.docs[0]["expires_at"] = NOW - timedelta(minutes=1)
+            return await stock.sweep()
+
+        return stock, asyncio.run(scenario())
+
+    def test_paid_order_completes_instead_of_expiring(self):
+        async def settle_paid(stock, checkout):
+            # The gateway reports a capture whose webhook has not arrived
+            await stock.checkouts.update_one(
+                {"_id": checkout["_id"]}, {"$set": {"status": "completed"}}
+            )
+            return True
+
+        stock, result = self.lapse_with_order(settle_paid)
+        assert (result["committed"], result["released"]) == (1, 0)
+        assert stock.checkouts.docs[0]["status"] == "completed"
+        assert stock_of(stock.products) == {LAMP: 2, TOTE: 5}
+
+    def test_hold_kept_while_gateway_cannot_answer(self):
+        async def settle_paid(stock, checkout):
+            raise PaymentGatewayUnavailable("Circuit open", retry_after=5)
+
+        stock, result = self.lapse_with_order(settle_paid)
+        assert (result["deferred"], result["released"]) == (1, 0)
+        assert stock.checkouts.docs[0]["status"] == "pending_payment"
+        assert stock.reservations.docs[0]["status"] == "held"
+        assert stock_of(stock.products) == {LAMP: 2, TOTE: 5}
+
+    def test_finishes_interrupted_release(self):
+        stock = make_reservations()
+
+        async def scenario():
+            await stock.reserve("c1", "u1", cart(tote=3))
+            # The process died after claiming the release, before returning stock
+            stock.reservations.docs[0].update(status="releasing", updated_at=NOW - timedelta(minutes=5))
+            return await stock.sweep()
+
+        assert asyncio.run(scenario())["recovered"] == 1
+        assert stock_of(stock.products) == {LAMP: 3, TOTE: 5}
+        assert stock.reservations.docs[0]["status"] == "released"
+
+
+class TestOnHand:
+    def test_counts_held_units(self):
+        stock = make_reservations(lamp=3)
+        asyncio.run(stock.reserve("c1", "u1", cart(lamp=2)))
+        lamp = stock.products.docs[0]
+        assert (lamp["stock"], stock_on_hand(lamp)) == (1, 3)
+        assert stock_on_hand({"quantity": 4}) == 4
+
+    def test_expression_subtracts_holds_on_the_server(self):
+        expression = on_hand_stock_expression(10)
+        assert expression["$subtract"][0] == 10
+        held = expression["$subtract"][1]["$sum"]["$map"]
+        assert held["input"] == {"$objectToArray": {"$ifNull": ["$holds", {}]}}
+        assert held["in"] == "$$hold.v"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStockView:
+    def test_misses_fetched_together_and_cached(self):
+        products = FakeCollection([{"_id": LAMP, "stock": 3}, {"_id": TOTE, "quantity": 5}])
+        clock = FakeClock()
+        view = StockView(ttl_seconds=2, clock=clock)
+
+        async def scenario():
+            first = await view.get_many(products, [str(LAMP), str(TOTE), "bad-id"])
+            second = await view.get_many(products, [str(LAMP), str(TOTE)])
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        assert first == second == {str(LAMP): 3, str(TOTE): 5}
+        assert products.finds == 1
+
+        clock.now = 2.5
+        asyncio.run(view.get(products, str(LAMP)))
+        assert products.finds == 2
+
+    def test_invalidate_forces_reload(self):
+        products = FakeCollection([{"_id": LAMP, "stock": 3}])
+        view = StockView(clock=FakeClock())
+        assert asyncio.run(view.get(products, str(LAMP))) == 3
+        products.docs[0]["stock"] = 1
+        view.invalidate([str(LAMP)])
+        assert asyncio.run(view.get(products, str(LAMP))) == 1
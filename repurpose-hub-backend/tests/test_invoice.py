@@ -0,0 +1,205 @@
+"""Tests for invoice service."""
+import asyncio
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from services.invoice import (
+    InvoiceCache,
+    InvoiceRenderer,
+    export_invoices_zip,
+    invoice_cache_key,
+    render_invoice,
+)
+
+
+ORDER_ID = ObjectId()
+
+
+def make_order(updated_at=datetime(2024, 5, 1, 10, 30, 0, 123456)):
+    return {
+        "_id": ORDER_ID,
+        "user_id": str(ObjectId()),
+        "items": [{"name": "Denim tote", "price": "Rs. 1,100", "quantity": 2}],
+        "status": "completed",
+        "created_at": datetime(2024, 5, 1, 10, 0),
+        "updated_at": updated_at,
+    }
+
+
+class FakeCollection:
+    def __init__(self, doc=None):
+        self.doc = doc
+        self.calls = 0
+
+    async def find_one(self, query):
+        self.calls += 1
+        return self.doc
+
+
+class TestRenderInvoice:
+    def test_returns_pdf_bytes(self):
+        pdf = render_invoice(make_order(), {"full_name": "Asha"}, {"co2_saved": 1.0})
+        assert pdf.startswith(b"%PDF")
+
+
+class TestInvoiceCacheKey:
+    def test_uses_millisecond_updated_at(self):
+        key = invoice_cache_key(make_order())
+        assert key == f"{ORDER_ID}_20240501103000123_0"
+
+    def test_truncated_mongo_timestamp_gives_same_key(self):
+        stored = make_order(datetime(2024, 5, 1, 10, 30, 0, 123000))
+        assert invoice_cache_key(stored) == invoice_cache_key(make_order())
+
+    def test_falls_back_to_created_at(self):
+        order = make_order(updated_at=None)
+        assert invoice_cache_key(order).endswith("_20240501100000000_0")
+
+    def test_changes_with_eco_impact(self):
+        # The PDF prints the user's lifetime totals
+        before = invoice_cache_key(make_order(), {"last_updated": datetime(2024, 5, 1, 10, 31)})
+        after = invoice_cache_key(make_order(), {"last_updated": datetime(2024, 5, 2, 9, 0)})
+        assert before != after
+        assert after.endswith("_20240502090000000")
+
+
+class TestInvoiceCache:
+    def test_miss_then_hit(self, tmp_path):
+        cache = InvoiceCache(str(tmp_path), max_bytes=1000)
+        assert cache.get("a_1") is None
+        path = cache.put("a_1", b"pdf")
+        assert cache.get("a_1") == path
+
+    def test_new_version_replaces_old_render(self, tmp_path):
+        cache = InvoiceCache(str(tmp_path), max_bytes=1000)
+        cache.put("a_1", b"old")
+        cache.put("a_2", b"new")
+        assert cache.get("a_1") is None
+        assert cache.get("a_2") is not None
+
+    def test_evicts_least_recently_used_over_budget(self, tmp_path):
+        cache = InvoiceCache(str(tmp_path), max_bytes=10)
+        cache.put("a_1", b"x" * 4)
+        os.utime(cache.path_for("a_1"), (1, 1))
+        cache.put("b_1", b"x" * 4)
+        os.utime(cache.path_for("b_1"), (2, 2))
+        cache.put("c_1", b"x" * 4)
+        assert cache.get("a_1") is None
+        assert cache.get("b_1") is not None
+        assert cache.get("c_1") is not None
+
+
+class TestInvoiceRenderer:
+    def test_second_request_is_served_from_cache(self, tmp_path):
+        renderer = InvoiceRenderer(InvoiceCache(str(tmp_path)), max_workers=1)
+        users, impacts = FakeCollection({"full_name": "Asha"}), FakeCollection()
+        order = make_order()
+
+        first = asyncio.run(renderer.get_invoice_path(order, users, impacts))
+        second = asyncio.run(renderer.get_invoice_path(order, users, impacts))
+        assert first == second
+        assert renderer.stats()["renders"] == 1
+        assert renderer.stats()["hits"] == 1
+        assert users.calls == 1
+
+    def test_concurrent_requests_share_one_render(self, tmp_path):
+        renderer = InvoiceRenderer(InvoiceCache(str(tmp_path)), max_workers=2)
+        users, impacts = FakeCollection(), FakeCollection()
+
+        async def download_twice():
+            return await asyncio.gather(
+                renderer.get_invoice_path(make_order(), users, impacts),
+                renderer.get_invoice_path(make_order(), users, impacts),
+            )
+
+        first, second = asyncio.run(download_twice())
+        assert first == second
+        assert renderer.stats()["renders"] == 1
+
+    def test_new_impact_credit_rerenders(self, tmp_path):
+        renderer = InvoiceRenderer(InvoiceCache(str(tmp_path)), max_workers=1)
+        users = FakeCollection()
+        impacts = FakeCollection({"co2_saved": 1.0, "last_updated": datetime(2024, 5, 1, 10, 31)})
+        first = asyncio.run(renderer.get_invoice_path(make_order(), users, impacts))
+        impacts.doc = {"co2_saved": 1.5, "last_updated": datetime(2024, 5, 2, 9, 0)}
+        second = asyncio.run(renderer.get_invoice_path(make_order(), users, impacts))
+        assert first != second
+        assert not os.path.exists(first)
+        assert renderer.stats()["renders"] == 2
+        assert renderer.stats()["avg_render_ms"] > 0
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeLookupCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = 0
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        return FakeCursor(self.docs)
+
+
+def export(orders, cache, batch_size=2):
+    users, impacts = FakeLookupCollection([]), FakeLookupCollection([])
+
+    async def collect():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            return [
+                chunk
+                async for chunk in export_invoices_zip(
+                    FakeCursor(orders), users, impacts, cache, executor, batch_size
+                )
+            ]
+
+    chunks = asyncio.run(collect())
+    return chunks, zipfile.ZipFile(io.BytesIO(b"".join(chunks))), users
+
+
+def export_order():
+    order = make_order()
+    order["_id"] = ObjectId()
+    return order
+
+
+class TestExportInvoicesZip:
+    def test_streams_one_chunk_per_batch(self, tmp_path):
+        orders = [export_order() for _ in range(5)]
+        chunks, archive, users = export(orders, InvoiceCache(str(tmp_path)))
+        assert len(chunks) == 4  # three batches plus the central directory
+        assert archive.namelist() == [f"Invoice_{o['_id']}.pdf" for o in orders]
+        assert archive.read(archive.namelist()[0]).startswith(b"%PDF")
+        assert users.queries == 3
+
+    def test_reuses_cached_pdf(self, tmp_path):
+        cache = InvoiceCache(str(tmp_path))
+        order = export_order()
+        cache.put(invoice_cache_key(order), b"cached pdf")
+        _, archive, _ = export([order], cache)
+        assert archive.read(f"Invoice_{order['_id']}.pdf") == b"cached pdf"
+
+    def test_failed_render_is_reported(self, tmp_path):
+        broken = export_order()
+        del broken["created_at"]
+        _, archive, _ = export([export_order(), broken], InvoiceCache(str(tmp_path)))
+        assert len(archive.namelist()) == 2
+        assert str(broken["_id"]) in archive.read("errors.txt").decode()
@@ -0,0 +1,40 @@
+"""Tests for latency service."""
+import pytest
+from services.latency import PipelineTimer, StepLatencies
+
+
+class TestStepLatencies:
+    def test_percentiles_per_step(self):
+        latencies = StepLatencies()
+        for ms in range(1, 101):
+            latencies.record("checkout", "read_cart", ms / 1000)
+        stats = latencies.stats()["checkout.read_cart"]
+        assert stats["count"] == 100
+        assert stats["p50_ms"] == 51.0
+        assert stats["p99_ms"] == 100.0
+        assert stats["max_ms"] == 100.0
+
+    def test_keeps_only_recent_samples(self):
+        latencies = StepLatencies(max_samples=2)
+        for seconds in (5.0, 0.001, 0.002):
+            latencies.record("checkout", "commit", seconds)
+        stats = latencies.stats()["checkout.commit"]
+        assert stats["count"] == 3
+        assert stats["max_ms"] == 2.0
+
+
+class TestPipelineTimer:
+    def test_steps_recorded_even_on_error(self):
+        latencies = StepLatencies()
+        timer = PipelineTimer("complete_checkout", latencies)
+        with timer.step("read"):
+            pass
+        with pytest.raises(RuntimeError):
+            with timer.step("commit"):
+                raise RuntimeError("write conflict")
+        timer.finish()
+        assert [name for name, _ in timer.steps] == ["read", "commit"]
+        assert timer.server_timing().startswith("read;dur=")
+        assert set(latencies.stats()) == {
+            "complete_checkout.read", "complete_checkout.commit", "complete_checkout.total",
+        }
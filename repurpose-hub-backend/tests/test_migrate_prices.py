@@ -0,0 +1,146 @@
+"""Tests for the price_paise backfill job."""
+import asyncio
+
+import pytest
+from migrate_prices import (
+    MIGRATIONS,
+    migrate_collection,
+    product_update,
+    cart_update,
+    checkout_update,
+)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[field])
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class BulkResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for the migration loop."""
+
+    def __init__(self, name, docs):
+        self.name = name
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.writes = 0
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    def find(self, query):
+        after = query.get("_id", {}).get("$gt", -1)
+        return FakeCursor([dict(d) for d in self.docs.values() if d["_id"] > after])
+
+    async def bulk_write(self, ops, ordered=True):
+        self.writes += 1
+        modified = 0
+        for op in ops:
+            query, update = op._filter, op._doc
+            doc = self.docs.get(query["_id"])
+            if doc is not None and all(doc.get(k) == v for k, v in query.items()):
+                doc.update(update["$set"])
+                modified += 1
+        return BulkResult(modified)
+
+
+class FakeCheckpoints:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["_id"], {}).update(update["$set"])
+
+
+def migrate(collection, checkpoints, batch_size=2, progress=lambda msg: None):
+    source_field, transform = MIGRATIONS[collection.name]
+    return asyncio.run(
+        migrate_collection(collection, checkpoints, source_field, transform, batch_size, progress)
+    )
+
+
+@pytest.fixture
+def products():
+    return FakeCollection(
+        "products",
+        [{"_id": i, "price": f"Rs. {i},000"} for i in range(1, 6)],
+    )
+
+
+class TestTransforms:
+    def test_product_update(self):
+        assert product_update({"price": "Rs. 640"}) == {"price_paise": 64000}
+        assert product_update({"price": "Rs. 640", "price_paise": 64000}) is None
+
+    def test_cart_update(self):
+        update = cart_update({"items": [{"price": "Rs. 5", "quantity": 1}]})
+        assert update["items"][0]["price_paise"] == 500
+        assert cart_update({"items": [{"price": "Rs. 5", "price_paise": 500}]}) is None
+
+    def test_checkout_keeps_charged_total(self):
+        update = checkout_update({"items": [{"price": "Rs. 100", "quantity": 2}], "total_price": 240.0})
+        assert update["subtotal_paise"] == 20000
+        assert update["total_paise"] == 24000
+
+
+class TestMigrateCollection:
+    def test_backfills_in_batches(self, products):
+        checkpoints = FakeCheckpoints()
+        state = migrate(products, checkpoints)
+        assert state["scanned"] == 5
+        assert state["updated"] == 5
+        assert products.docs[3]["price_paise"] == 300000
+        assert products.writes == 3
+
+    def test_resumes_after_interruption(self, products):
+        checkpoints = FakeCheckpoints()
+
+        def crash(msg):
+            raise RuntimeError("interrupted")
+
+        with pytest.raises(RuntimeError):
+            migrate(products, checkpoints, progress=crash)
+        assert checkpoints.docs["price_paise:products"]["last_id"] == 2
+
+        state = migrate(products, checkpoints)
+        assert state["scanned"] == 5
+        assert products.writes == 3
+        assert all("price_paise" in doc for doc in products.docs.values())
+
+    def test_completed_migration_is_noop(self, products):
+        checkpoints = FakeCheckpoints()
+        migrate(products, checkpoints)
+        writes = products.writes
+        migrate(products, checkpoints)
+        assert products.writes == writes
+
+    def test_skips_documents_changed_concurrently(self):
+        carts = FakeCollection("cart", [{"_id": 1, "items": [{"price": "Rs. 5"}]}])
+        source_field, transform = MIGRATIONS["cart"]
+
+        def racing_transform(doc):
+            carts.docs[1]["items"] = [{"price": "Rs. 7", "price_paise": 700}]
+            return transform(doc)
+
+        asyncio.run(
+            migrate_collection(carts, FakeCheckpoints(), source_field, racing_transform, 10, lambda m: None)
+        )
+        assert carts.docs[1]["items"] == [{"price": "Rs. 7", "price_paise": 700}]
@@ -0,0 +1,114 @@
+"""Tests for order events service."""
+import asyncio
+import json
+
+from services.order_events import (
+    OrderEventBus, event_stream, order_event, order_topic, user_topic,
+)
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def data_lines(chunks):
+    return [json.loads(c.split("data: ", 1)[1]) for c in chunks if "data: " in c]
+
+
+class TestOrderEventBus:
+    def test_routes_by_order_and_user(self):
+        async def scenario():
+            bus = OrderEventBus()
+            with bus.subscribe(order_topic("order_1")) as by_order, \
+                    bus.subscribe(user_topic("u1")) as by_user:
+                delivered = bus.publish(order_event("paid", "order_1", "u1"))
+                bus.publish(order_event("paid", "order_2", "u2"))
+                return delivered, await by_order.get(0.1), await by_user.get(0.1), await by_user.get(0.01)
+
+        delivered, order_evt, user_evt, nothing = asyncio.run(scenario())
+        assert delivered == 2
+        assert order_evt["status"] == user_evt["status"] == "paid"
+        assert nothing is None
+
+    def test_repeated_status_is_dropped(self):
+        async def scenario():
+            bus = OrderEventBus()
+            with bus.subscribe(order_topic("order_1")):
+                counts = [
+                    bus.publish(order_event("paid", "order_1")),
+                    bus.publish(order_event("paid", "order_1")),
+                    bus.publish(order_event("completed", "order_1")),
+                ]
+            return counts, bus.stats()
+
+        counts, stats = asyncio.run(scenario())
+        assert counts == [1, 0, 1]
+        assert stats["published"] == 2
+        assert stats["subscribers"] == 0
+
+    def test_late_echo_of_earlier_status_is_dropped(self):
+        async def scenario():
+            bus = OrderEventBus()
+            with bus.subscribe(user_topic("u1")) as subscription:
+                for status in ["created", "paid", "completed", "paid", "completed"]:
+                    bus.publish(order_event(status, "order_1", "u1"))
+                return [(await subscription.get(0.01) or {}).get("status") for _ in range(4)]
+
+        assert asyncio.run(scenario()) == ["created", "paid", "completed", None]
+
+    def test_failed_payment_can_be_retried(self):
+        bus = OrderEventBus()
+        for status in ["created", "payment_failed", "paid", "payment_failed"]:
+            bus.publish(order_event(status, "order_1"))
+        # A failure reported after the payment went through is stale
+        assert bus.stats()["published"] == 3
+
+    def test_full_queue_drops_oldest(self):
+        async def scenario():
+            bus = OrderEventBus(queue_size=2)
+            with bus.subscribe(user_topic("u1")) as subscription:
+                for i in range(3):
+                    bus.publish(order_event("created", f"order_{i}", "u1"))
+                first = await subscription.get(0.1)
+            return first, bus.stats()["dropped"]
+
+        first, dropped = asyncio.run(scenario())
+        assert first["razorpay_order_id"] == "order_1"
+        assert dropped == 1
+
+
+class TestEventStream:
+    def test_ends_after_terminal_status(self):
+        async def scenario():
+            bus = OrderEventBus()
+            subscription = bus.subscribe(order_topic("order_1"))
+            stream = event_stream(
+                subscription, initial=[order_event("created", "order_1")],
+                heartbeat_seconds=0.01, max_seconds=5,
+            )
+            task = asyncio.create_task(collect(stream))
+            await asyncio.sleep(0.05)
+            bus.publish(order_event("paid", "order_1"))
+            bus.publish(order_event("completed", "order_1"))
+            return await asyncio.wait_for(task, 1), bus.stats()["subscribers"]
+
+        chunks, subscribers = asyncio.run(scenario())
+        assert [e["status"] for e in data_lines(chunks)] == ["created", "paid", "completed"]
+        assert ": keepalive\n\n" in chunks
+        assert subscribers == 0
+
+    def test_terminal_initial_status_ends_immediately(self):
+        bus = OrderEventBus()
+        chunks = asyncio.run(collect(event_stream(
+            bus.subscribe(order_topic("order_1")), initial=[order_event("expired", "order_1")],
+        )))
+        assert [e["status"] for e in data_lines(chunks)] == ["expired"]
+
+    def test_stream_closes_after_max_duration(self):
+        bus = OrderEventBus()
+        chunks = asyncio.run(collect(event_stream(
+            bus.subscribe(user_topic("u1")), stop_on_terminal=False,
+            heartbeat_seconds=0.01, max_seconds=0.05,
+        )))
+        assert chunks[0].startswith("retry:")
+        assert data_lines(chunks) == []
@@ -0,0 +1,198 @@
+"""Tests for the outbox worker and the idempotent post-checkout side effects."""
+import asyncio
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+from services.checkout import credit_checkout_impact
+from services.outbox import OutboxWorker, outbox_task
+
+NOW = datetime(2026, 1, 10, 12, 0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = NOW
+
+    def __call__(self):
+        return self.now
+
+
+class FakeOutbox:
+    """Just enough of a collection for claim() and process()."""
+
+    def __init__(self, tasks=()):
+        self.docs = [dict(task, _id=i) for i, task in enumerate(tasks, start=1)]
+
+    def claimable(self, doc, query):
+        if doc["task"] not in query["task"]["$in"]:
+            return False
+        for branch in query["$or"]:
+            if doc["status"] != branch["status"]:
+                continue
+            if "available_at" in branch and doc["available_at"] <= branch["available_at"]["$lte"]:
+                return True
+            if "locked_until" in branch and doc["locked_until"] < branch["locked_until"]["$lt"]:
+                return True
+        return False
+
+    async def find_one_and_update(self, query, update, sort=None, return_document=None):
+        candidates = sorted(
+            (doc for doc in self.docs if self.claimable(doc, query)),
+            key=lambda doc: doc["available_at"],
+        )
+        if not candidates:
+            return None
+        doc = candidates[0]
+        doc.update(update["$set"])
+        doc["attempts"] += update["$inc"]["attempts"]
+        return dict(doc)
+
+    async def update_one(self, query, update):
+        doc = next(d for d in self.docs if d["_id"] == query["_id"] and d["status"] == query["status"])
+        doc.update(update["$set"])
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+
+
+class UpdateResult:
+    def __init__(self, modified_count, upserted_id=None):
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class FakeEcoImpact:
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.get(query["user_id"])
+        if doc is not None and query["applied_events"]["$ne"] in doc["applied_events"]:
+            if upsert:
+                # MongoDB tries to insert and hits the unique user_id index
+                raise DuplicateKeyError("duplicate key")
+            return UpdateResult(0)
+        upserted_id = None
+        if doc is None:
+            doc = self.docs[query["user_id"]] = {"user_id": query["user_id"], "applied_events": [], "badges": []}
+            upserted_id = query["user_id"]
+        for field, amount in update["$inc"].items():
+            doc[field] = doc.get(field, 0) + amount
+        doc["applied_events"] = (doc["applied_events"] + update["$push"]["applied_events"]["$each"])[-100:]
+        return UpdateResult(0 if upserted_id else 1, upserted_id)
+
+
+def worker_for(outbox, handlers, clock, **kwargs):
+    return OutboxWorker(outbox, handlers, concurrency=0, lease_seconds=60, now=clock, **kwargs)
+
+
+class TestOutboxWorker:
+    def test_runs_due_tasks_in_order(self):
+        clock = FakeClock()
+        outbox = FakeOutbox([
+            outbox_task("clear_cart", {"user_id": "u2"}, NOW - timedelta(seconds=5)),
+            outbox_task("clear_cart", {"user_id": "u1"}, NOW - timedelta(seconds=10)),
+            outbox_task("clear_cart", {"user_id": "u3"}, NOW + timedelta(minutes=1)),
+        ])
+        seen = []
+
+        async def clear_cart(payload, task_id):
+            seen.append(payload["user_id"])
+
+        worker = worker_for(outbox, {"clear_cart": clear_cart}, clock)
+        assert asyncio.run(worker.run_once()) == 2
+        assert seen == ["u1", "u2"]
+        assert [doc["status"] for doc in outbox.docs] == ["done", "done", "pending"]
+        assert "locked_until" not in outbox.docs[0]
+
+    def test_failure_is_retried_with_backoff(self):
+        clock = FakeClock()
+        outbox = FakeOutbox([outbox_task("credit_eco_impact", {"user_id": "u1"}, NOW)])
+        calls = []
+
+        async def flaky(payload, task_id):
+            calls.append(clock.now)
+            if len(calls) == 1:
+                raise ConnectionError("primary stepped down")
+
+        worker = worker_for(outbox, {"credit_eco_impact": flaky}, clock)
+        assert asyncio.run(worker.run_once()) == 1
+        task = outbox.docs[0]
+        assert task["status"] == "pending"
+        assert task["available_at"] == NOW + timedelta(seconds=2)
+        assert "primary stepped down" in task["last_error"]
+
+        # Not due yet, then due after the backoff
+        assert asyncio.run(worker.run_once()) == 0
+        clock.now += timedelta(seconds=2)
+        assert asyncio.run(worker.run_once()) == 1
+        assert task["status"] == "done"
+        assert (worker.retried, worker.completed) == (1, 1)
+
+    def test_gives_up_after_max_attempts(self):
+        clock = FakeClock()
+        outbox = FakeOutbox([outbox_task("prerender_invoice", {"checkout_id": 1}, NOW)])
+
+        async def broken(payload, task_id):
+            raise ValueError("bad template")
+
+        worker = worker_for(outbox, {"prerender_invoice": broken}, clock, max_attempts=3)
+        for _ in range(3):
+            asyncio.run(worker.run_once())
+            clock.now += timedelta(minutes=10)
+        task = outbox.docs[0]
+        assert task["status"] == "failed"
+        assert task["attempts"] == 3
+        assert asyncio.run(worker.run_once()) == 0
+
+    def test_expired_lease_is_reclaimed(self):
+        clock = FakeClock()
+        outbox = FakeOutbox([outbox_task("clear_cart", {"user_id": "u1"}, NOW)])
+        worker = worker_for(outbox, {"clear_cart": lambda payload, task_id: asyncio.sleep(0)}, clock)
+
+        # A worker claims the task and dies before finishing it
+        claimed = asyncio.run(worker.claim())
+        assert claimed["status"] == "processing"
+        assert asyncio.run(worker.claim()) is None
+
+        clock.now += timedelta(seconds=61)
+        assert asyncio.run(worker.run_once()) == 1
+        assert outbox.docs[0]["status"] == "done"
+        assert outbox.docs[0]["attempts"] == 2
+
+    def test_unregistered_tasks_are_left_alone(self):
+        outbox = FakeOutbox([outbox_task("send_email", {}, NOW)])
+        worker = worker_for(outbox, {}, FakeClock())
+        assert asyncio.run(worker.run_once()) == 0
+        assert outbox.docs[0]["status"] == "pending"
+
+
+class TestCreditCheckoutImpact:
+    def test_redelivered_task_credits_once(self):
+        eco = FakeEcoImpact()
+
+        async def deliver():
+            return [
+                await credit_checkout_impact(eco, "u1", 2, "task_1"),
+                await credit_checkout_impact(eco, "u1", 2, "task_1"),
+                await credit_checkout_impact(eco, "u1", 1, "task_2"),
+            ]
+
+        assert asyncio.run(deliver()) == [True, False, True]
+        assert eco.docs["u1"]["co2_saved"] == 1.5
+        assert eco.docs["u1"]["applied_events"] == ["task_1", "task_2"]
+
+    def test_credit_adds_to_community_totals(self):
+        eco = FakeEcoImpact()
+        added = []
+
+        class Community:
+            async def add(self, impact, new_users=0):
+                added.append((impact["co2_saved"], new_users))
+
+        async def deliver():
+            for task_id in ("task_1", "task_1", "task_2"):
+                await credit_checkout_impact(eco, "u1", 2, task_id, community=Community())
+
+        asyncio.run(deliver())
+        # The first credit also counts the new user; the redelivery adds nothing
+        assert added == [(1.0, 1), (1.0, 0)]
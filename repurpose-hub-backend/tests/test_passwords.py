@@ -0,0 +1,79 @@
+"""Tests for password hashing service."""
+import asyncio
+import threading
+import time
+
+import pytest
+from services.passwords import PasswordHasher, PasswordHasherBusy, build_crypt_context
+
+
+def cheap_context(rounds=1):
+    return build_crypt_context(rounds=rounds, memory_cost=8192, parallelism=1)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def hasher():
+    return PasswordHasher(cheap_context(), max_workers=2, max_queue=8)
+
+
+class TestHashing:
+    def test_hash_and_verify(self, hasher):
+        hashed = run(hasher.hash("secret"))
+        assert run(hasher.verify("secret", hashed)) is True
+        assert run(hasher.verify("wrong", hashed)) is False
+
+    def test_current_parameters_need_no_rehash(self, hasher):
+        hashed = run(hasher.hash("secret"))
+        assert run(hasher.verify_and_update("secret", hashed)) == (True, None)
+
+    def test_changed_parameters_trigger_rehash(self):
+        old_hash = cheap_context(rounds=1).hash("secret")
+        hasher = PasswordHasher(cheap_context(rounds=2))
+        valid, new_hash = run(hasher.verify_and_update("secret", old_hash))
+        assert valid is True
+        assert "t=2" in new_hash
+        assert hasher.stats()["rehashed"] == 1
+
+    def test_wrong_password_is_not_rehashed(self):
+        old_hash = cheap_context(rounds=1).hash("secret")
+        hasher = PasswordHasher(cheap_context(rounds=2))
+        assert run(hasher.verify_and_update("wrong", old_hash)) == (False, None)
+
+
+class TestConcurrency:
+    def test_running_calls_capped_at_workers(self, hasher):
+        lock = threading.Lock()
+        active, peak = [0], [0]
+
+        def slow():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+        async def burst():
+            await asyncio.gather(*(hasher._run(slow) for _ in range(6)))
+
+        run(burst())
+        assert peak[0] == 2
+        stats = hasher.stats()
+        assert stats["completed"] == 6
+        assert stats["max_waiting"] == 4
+
+    def test_rejects_when_queue_is_full(self):
+        hasher = PasswordHasher(cheap_context(), max_workers=1, max_queue=1)
+
+        async def burst():
+            return await asyncio.gather(
+                *(hasher._run(time.sleep, 0.02) for _ in range(3)), return_exceptions=True
+            )
+
+        results = run(burst())
+        assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 1
+        assert hasher.stats()["rejected"] == 1
@@ -0,0 +1,136 @@
+"""Tests for the Razorpay gateway, run against the local fake server."""
+import asyncio
+
+import httpx
+import pytest
+import fake_razorpay
+from services.circuit_breaker import CircuitBreaker
+from services.payment import (
+    PaymentGatewayError, PaymentGatewayUnavailable, RazorpayGateway, verify_payment_signature,
+)
+
+
+def gateway(**kwargs):
+    return RazorpayGateway(
+        base_url="http://razorpay.test",
+        transport=httpx.ASGITransport(app=fake_razorpay.app),
+        **kwargs,
+    )
+
+
+def run(coro):
+    async def with_gateway():
+        gw = gateway()
+        try:
+            return await coro(gw)
+        finally:
+            await gw.aclose()
+
+    return asyncio.run(with_gateway())
+
+
+async def pay(order_id):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_razorpay.app), base_url="http://razorpay.test"
+    ) as client:
+        return (await client.post(f"/_fake/orders/{order_id}/pay")).json()
+
+
+class TestRazorpayGateway:
+    def test_create_and_fetch_order(self):
+        async def scenario(gw):
+            order = await gw.create_order(64000, receipt="r1", notes={"user_id": "u1"})
+            return order, await gw.fetch_order(order["id"])
+
+        order, fetched = run(scenario)
+        assert order["status"] == "created"
+        assert fetched["amount"] == 64000
+        assert fetched["notes"] == {"user_id": "u1"}
+
+    def test_paid_order_has_verifiable_signature(self):
+        async def scenario(gw):
+            order = await gw.create_order(10000)
+            paid = await pay(order["id"])
+            payment = await gw.fetch_payment(paid["razorpay_payment_id"])
+            return paid, payment
+
+        paid, payment = run(scenario)
+        assert payment["status"] == "captured"
+        assert verify_payment_signature(
+            paid["razorpay_order_id"], paid["razorpay_payment_id"], paid["razorpay_signature"]
+        )
+
+    def test_api_error_raises_with_description(self):
+        with pytest.raises(PaymentGatewayError, match="does not exist") as exc:
+            run(lambda gw: gw.fetch_payment("pay_missing"))
+        assert exc.value.status_code == 400
+
+    def test_bad_credentials_rejected(self):
+        async def scenario():
+            gw = gateway(key_secret="wrong")
+            try:
+                await gw.ping()
+            finally:
+                await gw.aclose()
+
+        with pytest.raises(PaymentGatewayError) as exc:
+            asyncio.run(scenario())
+        assert exc.value.status_code == 401
+
+    def test_network_failure_is_gateway_error(self):
+        def refuse(request):
+            raise httpx.ConnectError("connection refused", request=request)
+
+        async def scenario():
+            gw = RazorpayGateway(transport=httpx.MockTransport(refuse))
+            try:
+                await gw.ping()
+            finally:
+                await gw.aclose()
+
+        with pytest.raises(PaymentGatewayError) as exc:
+            asyncio.run(scenario())
+        assert exc.value.status_code is None
+
+    def test_open_circuit_fails_fast(self):
+        calls = []
+
+        def refuse(request):
+            calls.append(request)
+            raise httpx.ConnectError("connection refused", request=request)
+
+        async def scenario():
+            gw = RazorpayGateway(
+                transport=httpx.MockTransport(refuse),
+                breaker=CircuitBreaker("razorpay", min_calls=2, open_seconds=30),
+            )
+            try:
+                for _ in range(2):
+                    with pytest.raises(PaymentGatewayError):
+                        await gw.ping()
+                await gw.ping()
+            finally:
+                await gw.aclose()
+
+        with pytest.raises(PaymentGatewayUnavailable) as exc:
+            asyncio.run(scenario())
+        assert len(calls) == 2
+        assert exc.value.status_code == 503
+
+    def test_client_errors_do_not_trip_circuit(self):
+        async def scenario():
+            gw = gateway(breaker=CircuitBreaker("razorpay", min_calls=2))
+            try:
+                for _ in range(3):
+                    with pytest.raises(PaymentGatewayError):
+                        await gw.fetch_payment("pay_missing")
+                return gw.breaker.state
+            finally:
+                await gw.aclose()
+
+        assert asyncio.run(scenario()) == "closed"
+
+
+class TestVerifyPaymentSignature:
+    def test_rejects_tampered_signature(self):
+        assert verify_payment_signature("order_1", "pay_1", "0" * 64) is False
@@ -0,0 +1,57 @@
+"""Tests for pricing service."""
+import pytest
+from services.pricing import (
+    to_paise,
+    item_price_paise,
+    with_price_paise,
+    subtotal_paise,
+    cart_total_paise,
+    order_total_paise,
+)
+
+
+class TestToPaise:
+    @pytest.mark.parametrize(
+        "price, expected",
+        [
+            ("Rs. 640", 64000),
+            ("Rs. 1,640", 164000),
+            ("1,200.50", 120050),
+            ("₹ 500", 50000),
+            ("Rs. 0.11", 11),
+            (19.99, 1999),
+            (250, 25000),
+        ],
+    )
+    def test_parses_prices(self, price, expected):
+        assert to_paise(price) == expected
+
+    @pytest.mark.parametrize("price", ["", "abc", "Price: 100", None])
+    def test_unparseable_is_zero(self, price):
+        assert to_paise(price) == 0
+
+
+class TestLineItems:
+    def test_prefers_stored_paise(self):
+        assert item_price_paise({"price": "Rs. 1", "price_paise": 64000}) == 64000
+
+    def test_falls_back_to_display_price(self):
+        assert item_price_paise({"price": "Rs. 640"}) == 64000
+
+    def test_with_price_paise_does_not_mutate(self):
+        items = [{"price": "Rs. 5", "quantity": 2}]
+        assert with_price_paise(items)[0]["price_paise"] == 500
+        assert "price_paise" not in items[0]
+
+    def test_totals(self):
+        items = [{"price": "Rs. 0.10", "quantity": 3}, {"price_paise": 1000, "quantity": 1}]
+        assert subtotal_paise(items) == 1030
+        assert cart_total_paise(items) == 1236
+
+
+class TestOrderTotal:
+    def test_prefers_total_paise(self):
+        assert order_total_paise({"total_paise": 12000, "total_price": 1.0}) == 12000
+
+    def test_legacy_float_total(self):
+        assert order_total_paise({"total_price": 120.3}) == 12030
@@ -0,0 +1,375 @@
+"""Tests for payment webhook handling and the reconciliation sweep."""
+import asyncio
+import hashlib
+import hmac
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+import fake_razorpay
+from services.checkout import (
+    CheckoutNotPayable, create_checkout_payment_order, finalize_paid_checkout,
+)
+from services.payment import RazorpayGateway
+from services.reconciliation import (
+    PaymentReconciler, apply_payment_event, verify_webhook_signature,
+)
+
+NOW = datetime(2026, 1, 10, 12, 0)
+
+
+def matches(doc, query):
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+        for op, arg in cond.items():
+            if op == "$exists" and (key in doc) != arg:
+                return False
+            if op == "$ne" and value == arg:
+                return False
+            if op == "$nin" and value in arg:
+                return False
+            if op == "$lt" and not (key in doc and value < arg):
+                return False
+            if op == "$gt" and not (key in doc and value > arg):
+                return False
+    return True
+
+
+class UpdateResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[field])
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = [dict(doc) for doc in docs]
+        self.finds = 0
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        return FakeCursor([dict(d) for d in self.docs if matches(d, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((d for d in self.docs if matches(d, query)), None)
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+
+    async def find_one_and_update(self, query, update, return_document=None, session=None):
+        doc = await self.find_one(query)
+        if doc is not None:
+            doc.update(update["$set"])
+        return doc
+
+    async def update_one(self, query, update, upsert=False, session=None):
+        doc = await self.find_one(query)
+        if doc is None:
+            if not upsert:
+                return UpdateResult(0)
+            doc = {k: v for k, v in query.items() if not isinstance(v, dict)}
+            self.docs.append(doc)
+        doc.update(update.get("$set", {}))
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        return UpdateResult(1)
+
+    async def insert_many(self, docs, session=None):
+        self.docs.extend(dict(doc) for doc in docs)
+
+
+class Store:
+    def __init__(self, checkouts=(), orders=()):
+        self.checkouts = FakeCollection(checkouts)
+        self.orders = FakeCollection(orders)
+        self.outbox = FakeCollection()
+
+    async def finalize(self, checkout_filter, razorpay_order_id, razorpay_payment_id):
+        return await finalize_paid_checkout(
+            checkout_filter, razorpay_order_id, razorpay_payment_id,
+            self.checkouts, self.outbox,
+        )
+
+
+def checkout(_id, razorpay_order_id=None, age=timedelta(hours=1)):
+    return {
+        "_id": _id, "user_id": "u1", "items": [{"quantity": 2}], "status": "pending_payment",
+        "razorpay_order_id": razorpay_order_id, "created_at": NOW - age, "updated_at": NOW - age,
+    }
+
+
+def captured_event(order_id="order_1", payment_id="pay_1", event="payment.captured"):
+    return {
+        "event": event,
+        "payload": {"payment": {"entity": {"id": payment_id, "order_id": order_id,
+                                           "status": "captured"}}},
+    }
+
+
+def fake_gateway():
+    return RazorpayGateway(
+        base_url="http://razorpay.test",
+        transport=httpx.ASGITransport(app=fake_razorpay.app),
+    )
+
+
+async def pay(razorpay_order_id):
+    """Capture a payment through the fake gateway, as the checkout widget would."""
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_razorpay.app),
+        base_url="http://razorpay.test",
+    ) as client:
+        response = await client.post(f"/_fake/orders/{razorpay_order_id}/pay")
+    return response.json()["razorpay_payment_id"]
+
+
+class TestWebhookSignature:
+    def test_valid_and_tampered(self):
+        body = b'{"event":"payment.captured"}'
+        signature = hmac.new(b"whsec", body, hashlib.sha256).hexdigest()
+        assert verify_webhook_signature(body, signature, "whsec")
+        assert not verify_webhook_signature(body + b" ", signature, "whsec")
+        assert not verify_webhook_signature(body, signature, "")
+
+
+class TestApplyPaymentEvent:
+    def test_captured_completes_checkout_once(self):
+        store = Store([checkout(1, "order_1")], [{"razorpay_order_id": "order_1", "status": "created"}])
+
+        async def deliver_twice():
+            event = captured_event()
+            first = await apply_payment_event(event, store.orders, store.checkouts, store.finalize)
+            second = await apply_payment_event(event, store.orders, store.checkouts, store.finalize)
+            return first, second
+
+        first, second = asyncio.run(deliver_twice())
+        assert first["changed"] and first["checkout"]["status"] == "completed"
+        assert not second["changed"] and second["checkout"] is None
+        assert store.orders.docs[0]["status"] == "paid"
+        assert store.orders.docs[0]["payment_confirmed_by"] == "webhook"
+        # Follow-up work is queued once, for the delivery that completed it
+        assert sorted(task["task"] for task in store.outbox.docs) == [
+            "clear_cart", "clear_stock_holds", "credit_eco_impact", "record_order_stats",
+        ]
+        assert store.outbox.docs[0]["payload"] == {"checkout_id": 1, "user_id": "u1", "num_items": 2}
+
+    def test_capture_after_expiry_flags_refund(self):
+        store = Store([{**checkout(1, "order_1"), "status": "expired"}],
+                      [{"razorpay_order_id": "order_1", "status": "created"}])
+
+        async def deliver_twice():
+            event = captured_event()
+            first = await apply_payment_event(event, store.orders, store.checkouts, store.finalize)
+            second = await apply_payment_event(event, store.orders, store.checkouts, store.finalize)
+            return first, second
+
+        first, second = asyncio.run(deliver_twice())
+        assert first["changed"] and first["refund_due"]
+        assert not second["changed"] and not second["refund_due"]
+        expired = store.checkouts.docs[0]
+        assert expired["status"] == "expired" and expired["refund_due"]
+        assert expired["razorpay_payment_id"] == "pay_1"
+        assert store.outbox.docs == []
+
+    def test_failed_after_paid_is_ignored(self):
+        store = Store([checkout(1, "order_1")], [{"razorpay_order_id": "order_1", "status": "paid"}])
+        event = {"event": "payment.failed", "payload": {"payment": {"entity": {
+            "id": "pay_2", "order_id": "order_1", "error_description": "Card declined"}}}}
+        outcome = asyncio.run(apply_payment_event(event, store.orders, store.checkouts, store.finalize))
+        assert not outcome["changed"]
+        assert store.orders.docs[0]["status"] == "paid"
+        assert store.checkouts.docs[0]["last_payment_error"] == "Card declined"
+
+    def test_unknown_event_ignored(self):
+        store = Store()
+        event = {"event": "refund.created", "payload": {"order": {"entity": {"id": "order_1"}}}}
+        outcome = asyncio.run(apply_payment_event(event, store.orders, store.checkouts, store.finalize))
+        assert outcome["ignored"]
+
+
+class TestCheckoutPaymentOrder:
+    def run(self, scenario):
+        async def with_gateway():
+            gateway = fake_gateway()
+            try:
+                return await scenario(gateway)
+            finally:
+                await gateway.aclose()
+
+        return asyncio.run(with_gateway())
+
+    def order_for(self, store, gateway, checkout_id=1, user_id="u1"):
+        return create_checkout_payment_order(
+            checkout_id, user_id, store.checkouts, store.orders, gateway.create_order
+        )
+
+    def test_created_order_is_completed_by_webhook(self):
+        store = Store([{**checkout(1), "total_paise": 24000}])
+
+        async def scenario(gateway):
+            order = await self.order_for(store, gateway)
+            payment_id = await pay(order["razorpay_order_id"])
+            outcome = await apply_payment_event(
+                captured_event(order["razorpay_order_id"], payment_id),
+                store.orders, store.checkouts, store.finalize,
+            )
+            return order, payment_id, outcome
+
+        order, payment_id, outcome = self.run(scenario)
+        # The checkout's total is charged, and the checkout links to the order
+        assert order["amount_in_paise"] == 24000
+        assert order["checkout_id"] == "1"
+        assert outcome["changed"]
+        completed = store.checkouts.docs[0]
+        assert completed["status"] == "completed"
+        assert completed["razorpay_order_id"] == order["razorpay_order_id"]
+        assert completed["razorpay_payment_id"] == payment_id
+        assert store.orders.docs[0]["status"] == "paid"
+        assert len(store.outbox.docs) == 4
+
+    def test_second_request_reuses_linked_order(self):
+        store = Store([{**checkout(1), "total_paise": 24000}])
+
+        async def scenario(gateway):
+            first = await self.order_for(store, gateway)
+            second = await self.order_for(store, gateway)
+            return first, second
+
+        first, second = self.run(scenario)
+        assert second["razorpay_order_id"] == first["razorpay_order_id"]
+        assert len(store.orders.docs) == 1
+
+    def test_losing_order_of_a_link_race_is_superseded(self):
+        store = Store([{**checkout(1), "total_paise": 24000}])
+
+        async def scenario(gateway):
+            async def create_then_lose(amount, **kwargs):
+                # The other tab links its order while this one is being created
+                await self.order_for(store, gateway)
+                return await gateway.create_order(amount, **kwargs)
+
+            return await create_checkout_payment_order(
+                1, "u1", store.checkouts, store.orders, create_then_lose
+            )
+
+        returned = self.run(scenario)
+        winner, orphan = store.orders.docs
+        assert returned["razorpay_order_id"] == winner["razorpay_order_id"]
+        assert store.checkouts.docs[0]["razorpay_order_id"] == winner["razorpay_order_id"]
+        assert winner["status"] == "created"
+        assert orphan["status"] == "superseded"
+
+    def test_unknown_or_settled_checkout_is_refused(self):
+        store = Store([{**checkout(1), "status": "expired", "total_paise": 24000}])
+
+        async def scenario(gateway):
+            with pytest.raises(LookupError):
+                await self.order_for(store, gateway, user_id="u2")
+            with pytest.raises(CheckoutNotPayable):
+                await self.order_for(store, gateway)
+
+        self.run(scenario)
+        assert store.orders.docs == []
+
+
+class TestPaymentReconciler:
+    def run_sweep(self, store, **kwargs):
+        async def scenario():
+            gateway = RazorpayGateway(
+                base_url="http://razorpay.test",
+                transport=httpx.ASGITransport(app=fake_razorpay.app),
+            )
+            try:
+                paid = await gateway.create_order(10000)
+                unpaid = await gateway.create_order(10000)
+                async with httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=fake_razorpay.app),
+                    base_url="http://razorpay.test",
+                ) as client:
+                    await client.post(f"/_fake/orders/{paid['id']}/pay")
+                for doc in store.checkouts.docs:
+                    if doc["razorpay_order_id"] == "paid":
+                        doc["razorpay_order_id"] = paid["id"]
+                    elif doc["razorpay_order_id"] == "unpaid":
+                        doc["razorpay_order_id"] = unpaid["id"]
+                completed = []
+
+                async def on_completed(doc):
+                    completed.append(doc["_id"])
+
+                reconciler = PaymentReconciler(
+                    store.checkouts, store.orders, store.finalize, gateway=gateway,
+                    on_completed=on_completed, now=lambda: NOW, **kwargs,
+                )
+                return await reconciler.sweep(), completed
+            finally:
+                await gateway.aclose()
+
+        return asyncio.run(scenario())
+
+    def test_settles_paid_and_expires_abandoned(self):
+        store = Store([
+            checkout(1, "paid"),
+            checkout(2, "unpaid"),
+            checkout(3, None, age=timedelta(days=2)),
+            checkout(4, None, age=timedelta(minutes=1)),
+        ])
+        result, completed = self.run_sweep(store, batch_size=2)
+        statuses = {doc["_id"]: doc["status"] for doc in store.checkouts.docs}
+        assert statuses == {1: "completed", 2: "pending_payment", 3: "expired", 4: "pending_payment"}
+        assert completed == [1]
+        assert result["checked"] == 3
+        assert (result["completed"], result["expired"], result["pending"]) == (1, 1, 1)
+        # A full batch of two, then a short batch that ends the sweep
+        assert store.checkouts.finds == 2
+
+    def test_settle_completes_only_paid_orders(self):
+        store = Store([checkout(1), checkout(2)])
+
+        async def scenario():
+            gateway = fake_gateway()
+            try:
+                paid = await gateway.create_order(10000)
+                unpaid = await gateway.create_order(10000)
+                await pay(paid["id"])
+                store.checkouts.docs[0]["razorpay_order_id"] = paid["id"]
+                store.checkouts.docs[1]["razorpay_order_id"] = unpaid["id"]
+                reconciler = PaymentReconciler(
+                    store.checkouts, store.orders, store.finalize, gateway=gateway,
+                )
+                return [await reconciler.settle(doc) for doc in list(store.checkouts.docs)]
+            finally:
+                await gateway.aclose()
+
+        assert asyncio.run(scenario()) == [True, False]
+        assert [doc["status"] for doc in store.checkouts.docs] == ["completed", "pending_payment"]
+
+    def test_recently_checked_checkout_is_skipped(self):
+        store = Store([checkout(1, "unpaid")])
+        self.run_sweep(store)
+        assert store.checkouts.docs[0]["reconciled_at"] == NOW
+        result, _ = self.run_sweep(store)
+        assert result["checked"] == 0
@@ -0,0 +1,107 @@
+"""Tests for tutorial search service."""
+import pytest
+from services.tutorial_search import TutorialIndex, tokenize
+
+
+TUTORIALS = [
+    {"_id": "1", "title": "Old T-shirt into tote bag", "desc": "No sew shirt upcycling", "author": "Emily"},
+    {"_id": "2", "title": "Plastic bottle vertical garden", "desc": "Grow herbs in bottles", "author": "Sam"},
+    {"_id": "3", "title": "Denim jeans tote", "desc": "Turn old jeans into a bag", "author": "Ria"},
+]
+
+
+@pytest.fixture
+def index():
+    idx = TutorialIndex()
+    idx.rebuild(TUTORIALS)
+    return idx
+
+
+class TestTokenize:
+    def test_lowercases_and_splits(self):
+        assert tokenize("Glass-Jar Storage") == ["glass", "jar", "storage"]
+
+    def test_drops_stopwords(self):
+        assert tokenize("how to make a bag") == ["make", "bag"]
+
+    def test_strips_plural(self):
+        assert tokenize("bottles jeans glass") == ["bottle", "jean", "glass"]
+
+    def test_handles_none(self):
+        assert tokenize(None) == []
+
+
+class TestTutorialIndex:
+    def test_label_query_ranks_matching_tutorial_first(self, index):
+        results = index.search("water bottle")
+        assert results[0]["_id"] == "2"
+
+    def test_free_text_query(self, index):
+        results = index.search("tote bag from a shirt")
+        assert results[0]["_id"] == "1"
+
+    def test_no_match_returns_empty(self, index):
+        assert index.search("suitcase") == []
+
+    def test_limit(self, index):
+        assert len(index.search("tote bag", limit=1)) == 1
+
+    def test_empty_index(self):
+        assert TutorialIndex().search("bottle") == []
+
+    def test_incremental_add(self, index):
+        index.add({"_id": "4", "title": "Suitcase pet bed", "desc": "", "author": ""})
+        assert len(index) == 4
+        assert index.search("suitcase")[0]["_id"] == "4"
+
+    def test_add_replaces_existing_id(self, index):
+        index.add({"_id": "2", "title": "Tin can vase", "desc": "", "author": ""})
+        assert len(index) == 3
+        assert index.search("bottle") == []
+        assert index.search("tin can")[0]["_id"] == "2"
+
+    def test_remove(self, index):
+        index.remove("3")
+        assert len(index) == 2
+        assert all(r["_id"] != "3" for r in index.search("jeans"))
+
+    def test_documents_and_version(self, index):
+        version = index.version
+        assert index.loaded is True
+        assert [d["_id"] for d in index.documents()] == ["1", "2", "3"]
+        index.add({"_id": "4", "title": "Tin can vase"})
+        assert index.version > version
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReload:
+    def test_stale_until_loaded_then_after_ttl(self):
+        clock = FakeClock()
+        idx = TutorialIndex(ttl_seconds=300, clock=clock)
+        assert idx.stale()
+        idx.rebuild(TUTORIALS)
+        clock.now = 299.0
+        assert not idx.stale()
+        # Incremental adds from this process do not reset the TTL
+        idx.add({"_id": "4", "title": "Tin can vase"})
+        clock.now = 300.0
+        assert idx.stale()
+
+    def test_rebuild_picks_up_external_writes(self):
+        clock = FakeClock()
+        idx = TutorialIndex(ttl_seconds=300, clock=clock)
+        idx.rebuild(TUTORIALS)
+        version = idx.version
+        clock.now = 301.0
+        # Written by the scraper straight into MongoDB
+        idx.rebuild(TUTORIALS + [{"_id": "5", "title": "Pallet coffee table"}])
+        assert not idx.stale()
+        assert idx.version > version
+        assert idx.search("pallet")[0]["_id"] == "5"
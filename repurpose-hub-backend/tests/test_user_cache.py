@@ -0,0 +1,82 @@
+"""Tests for user cache service."""
+import asyncio
+
+import pytest
+from bson import ObjectId
+from services.user_cache import UserCache, load_user
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeUsers:
+    def __init__(self, docs):
+        self.docs = {str(doc["_id"]): doc for doc in docs}
+        self.calls = 0
+
+    async def find_one(self, query):
+        self.calls += 1
+        return self.docs.get(str(query["_id"]))
+
+
+USER = {"_id": ObjectId(), "email": "a@example.com", "role": "admin"}
+USER_ID = str(USER["_id"])
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return UserCache(ttl_seconds=30, max_items=2, clock=clock)
+
+
+class TestUserCache:
+    def test_hit_and_miss_counters(self, cache):
+        assert cache.get(USER_ID) is None
+        cache.put(USER_ID, USER)
+        assert cache.get(USER_ID) is USER
+        assert cache.stats() == {"hits": 1, "misses": 1, "cached_users": 1}
+
+    def test_entries_expire(self, cache, clock):
+        cache.put(USER_ID, USER)
+        clock.now = 30
+        assert cache.get(USER_ID) is None
+        assert cache.stats()["cached_users"] == 0
+
+    def test_lru_size_bound(self, cache):
+        for user_id in ["a", "b", "c"]:
+            cache.put(user_id, {"_id": user_id})
+        assert cache.get("a") is None
+        assert cache.get("c") is not None
+
+    def test_invalidate(self, cache):
+        cache.put(USER_ID, USER)
+        cache.invalidate(USER["_id"])
+        assert cache.get(USER_ID) is None
+
+
+class TestLoadUser:
+    def test_repeat_lookup_skips_database(self, cache):
+        users = FakeUsers([USER])
+        assert asyncio.run(load_user(USER_ID, users, cache)) == USER
+        assert asyncio.run(load_user(USER_ID, users, cache)) == USER
+        assert users.calls == 1
+
+    def test_unknown_user_is_not_cached(self, cache):
+        users = FakeUsers([])
+        assert asyncio.run(load_user(USER_ID, users, cache)) is None
+        assert asyncio.run(load_user(USER_ID, users, cache)) is None
+        assert users.calls == 2
+
+    def test_invalid_id_returns_none(self, cache):
+        users = FakeUsers([])
+        assert asyncio.run(load_user("not-an-id", users, cache)) is None
+        assert users.calls == 0
@@ -1,46 +1,30 @@
-import re
-from fpdf import FPDF
+from datetime import datetime
 
-# Mocking the PDF logic from app.py
-class InvoicePDF(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 24)
-        self.cell(0, 20, 'REPURPOSE HUB', 0, 1, 'C')
+from bson import ObjectId
+
+from services.invoice import render_invoice
+from services.pricing import to_paise
 
 def test_price_parsing():
     prices = ["Rs. 1,100", "1,200.50", "₹ 500", "Price: 100", "Rs. 0.11", ""]
-    # For now, my logic specifically targets "Rs." and falls back for others if they don't start with digit
-    # Let's make the test reflect the specific "Rs." fix
+    # Same parser the app uses when it writes price_paise
     for p_str in prices:
-        clean_price = re.sub(r'^Rs\.\s*', '', p_str).replace(',', '')
-        # If it still has non-digits at start (like ₹), it might fail float() or we should handle it
-        # The app.py version uses p_clean[0].isdigit() check
-        price_val = 0.0
-        if clean_price and (clean_price[0].isdigit() or clean_price[0] == '.'):
-            try:
-                price_val = float(clean_price)
-            except:
-                pass
-        print(f"Input: '{p_str}' -> Parsed: {price_val}")
+        print(f"Input: '{p_str}' -> Parsed: {to_paise(p_str)} paise")
 
 def test_pdf_output():
-    pdf = InvoicePDF()
-    pdf.add_page()
-    pdf.set_font('Arial', '', 12)
-    pdf.cell(0, 10, "Test Invoice Content")
-    
-    # Simulate the output logic
-    pdf_output = pdf.output(dest='S')
-    print(f"PDF Output type: {type(pdf_output)}")
-    
-    if isinstance(pdf_output, str):
-        print("Detected legacy fpdf (string output)")
-        pdf_output = pdf_output.encode('latin1', errors='replace')
-    else:
-        print(f"Detected fpdf2 or modern fpdf ({type(pdf_output)})")
-    
+    order = {
+        "_id": ObjectId(),
+        "user_id": "u1",
+        "items": [{"name": "Denim tote", "price": "Rs. 1,100", "quantity": 2}],
+        "status": "completed",
+        "created_at": datetime.now(),
+    }
+    pdf_output = render_invoice(order, {"full_name": "Test User"}, {"co2_saved": 1.5})
+    print(f"PDF Output type: {type(pdf_output)}, {len(pdf_output)} bytes")
+
     # Check if we have bytes at the end
-    assert isinstance(pdf_output, (bytes, bytearray))
+    assert isinstance(pdf_output, bytes)
+    assert pdf_output.startswith(b"%PDF")
     print("Success: Output is bytes-compatible")
 
 if __name__ == "__main__":
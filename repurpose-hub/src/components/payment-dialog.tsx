@@ -163,6 +163,7 @@ export function PaymentDialog({ isOpen, onClose, total }: PaymentDialogProps) {
         method: "POST",
         endpoint: "payment/create-order",
         data: {
+          checkout_id: pending.checkoutId,
           amount: pending.total,
           currency: "INR",
           user_id: user?.id,
@@ -337,6 +338,7 @@ export function PaymentDialog({ isOpen, onClose, total }: PaymentDialogProps) {
         method: "POST",
         endpoint: "payment/create-order",
         data: {
+          checkout_id: newCheckoutId,
           amount: total,
           currency: "INR",
           user_id: user.id,
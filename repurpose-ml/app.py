@@ -12,6 +12,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from gtts import gTTS
 import uuid
 
+from product_index import ProductIndex, INDEX_DIR, classify_with_embedding
+
 app = FastAPI()
 
 # Mount static directory
@@ -42,6 +44,14 @@ if not os.path.exists(labels_path):
 with open(labels_path, "r") as f:
     labels = json.load(f)
 
+# Load the offline-built product embedding index (see build_product_index.py)
+SIMILAR_PRODUCTS_K = 5
+try:
+    product_index = ProductIndex.load(INDEX_DIR)
+except FileNotFoundError:
+    print(f"Product index not found at '{INDEX_DIR}', similar products disabled.")
+    product_index = None
+
 # Upcycling ideas
 upcycling_ideas = {
     "suitcase": ("Turn into a stylish pet bed!", "suitcase_pet_bed.jpg"),
@@ -270,8 +280,7 @@ async def upcycle(file: UploadFile = File(...), language: str = Form("en")):
     # Model prediction
     inputs = image_processor(images=image, return_tensors="pt")
     with torch.no_grad():
-        outputs = model(**inputs)
-    logits = outputs.logits
+        logits, embedding = classify_with_embedding(model, inputs)
     top_k_indices = torch.topk(logits, k=5, dim=-1).indices.squeeze().tolist()
 
     detected_objects = [
@@ -289,6 +298,13 @@ async def upcycle(file: UploadFile = File(...), language: str = Form("en")):
             img_path = os.path.join("static/upcycling_images", img_name)
             image_paths.append(img_name if os.path.exists(img_path) else None)
 
+    # Visually similar marketplace products, reusing the same forward pass
+    similar_products = (
+        product_index.search(embedding[0].numpy(), k=SIMILAR_PRODUCTS_K)
+        if product_index is not None
+        else []
+    )
+
     # Recyclability with steps
     if language.lower() == "hi":
         info_dict = recyclability_info_hi
@@ -366,6 +382,7 @@ async def upcycle(file: UploadFile = File(...), language: str = Form("en")):
             "recycling_steps": recycling_steps,
             "detected_object": detected_obj if detected_obj else "Unknown",
             "tts_url": f"/static/{tts_filename}" if tts_filename else None,
+            "similar_products": similar_products,
         }
     )
 
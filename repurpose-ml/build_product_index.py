@@ -0,0 +1,101 @@
+"""Offline job: embed marketplace product images and write the product index.
+
+Usage:
+    python build_product_index.py [--products ../data/repurposeHub.products.json]
+                                  [--out product_index] [--float16]
+"""
+import argparse
+import io
+import json
+
+import numpy as np
+import requests
+import torch
+from PIL import Image
+from transformers import ViTImageProcessor, ViTForImageClassification
+
+from product_index import INDEX_DIR, classify_with_embedding, save_index
+
+model_name = "google/vit-base-patch16-224"
+BATCH_SIZE = 16
+
+
+def load_products(path: str) -> list:
+    with open(path, "r") as f:
+        products = json.load(f)
+
+    return [
+        {
+            "id": p["_id"]["$oid"] if isinstance(p.get("_id"), dict) else str(p.get("_id")),
+            "name": p.get("name", ""),
+            "price": p.get("price", ""),
+            "companyname": p.get("companyName", p.get("companyname", "")),
+            "imageurl": p.get("image_url", p.get("imageurl", "")),
+            "product_url": p.get("product_url", ""),
+        }
+        for p in products
+    ]
+
+
+def fetch_image(url: str):
+    try:
+        response = requests.get(url, timeout=15)
+        response.raise_for_status()
+        return Image.open(io.BytesIO(response.content)).convert("RGB")
+    except Exception as e:
+        print(f"Skipping {url}: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", default="../data/repurposeHub.products.json")
+    parser.add_argument("--out", default=INDEX_DIR)
+    parser.add_argument(
+        "--float16", action="store_true", help="Store embeddings as float16 to halve memory"
+    )
+    args = parser.parse_args()
+
+    image_processor = ViTImageProcessor.from_pretrained(model_name)
+    model = ViTForImageClassification.from_pretrained(model_name)
+    model.eval()
+
+    indexed_products = []
+    embeddings = []
+    batch_products, batch_images = [], []
+
+    def flush():
+        if not batch_images:
+            return
+        inputs = image_processor(images=batch_images, return_tensors="pt")
+        with torch.no_grad():
+            _, pooled = classify_with_embedding(model, inputs)
+        embeddings.append(pooled.numpy())
+        indexed_products.extend(batch_products)
+        batch_products.clear()
+        batch_images.clear()
+
+    for product in load_products(args.products):
+        image = fetch_image(product["imageurl"]) if product["imageurl"] else None
+        if image is None:
+            continue
+        batch_products.append(product)
+        batch_images.append(image)
+        if len(batch_images) >= BATCH_SIZE:
+            flush()
+    flush()
+
+    if not embeddings:
+        raise SystemExit("No product images could be embedded")
+
+    save_index(
+        np.concatenate(embeddings),
+        indexed_products,
+        args.out,
+        dtype=np.float16 if args.float16 else np.float32,
+    )
+    print(f"Indexed {len(indexed_products)} products into {args.out}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Nearest-neighbour index over marketplace product image embeddings.
+
+The index is built offline by ``build_product_index.py`` and stored as a
+row-normalized ``.npy`` matrix plus a JSON file of product metadata. At
+serve time the matrix is memory-mapped, so loading is instant and a query
+is a single matrix-vector product.
+"""
+import json
+import os
+
+import numpy as np
+
+INDEX_DIR = os.getenv("PRODUCT_INDEX_DIR", "product_index")
+EMBEDDINGS_FILE = "embeddings.npy"
+PRODUCTS_FILE = "products.json"
+
+
+def classify_with_embedding(model, inputs):
+    """Run one ViT forward pass and return (logits, pooled CLS embedding).
+
+    Mirrors ViTForImageClassification.forward, but keeps the CLS token that
+    feeds the classifier head so it can be reused for similarity search.
+    """
+    sequence_output = model.vit(**inputs)[0]
+    pooled = sequence_output[:, 0, :]
+    logits = model.classifier(pooled)
+    return logits, pooled
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so a dot product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def save_index(embeddings: np.ndarray, products: list, index_dir: str = INDEX_DIR, dtype=np.float32):
+    """Persist normalized embeddings and their product metadata."""
+    if len(embeddings) != len(products):
+        raise ValueError("Embeddings and products must have the same length")
+
+    os.makedirs(index_dir, exist_ok=True)
+    np.save(os.path.join(index_dir, EMBEDDINGS_FILE), normalize(embeddings).astype(dtype))
+    with open(os.path.join(index_dir, PRODUCTS_FILE), "w") as f:
+        json.dump(products, f)
+
+
+class ProductIndex:
+    """Brute-force cosine index over a (possibly memory-mapped) matrix."""
+
+    def __init__(self, embeddings: np.ndarray, products: list):
+        if len(embeddings) != len(products):
+            raise ValueError("Embeddings and products must have the same length")
+        self.embeddings = embeddings
+        self.products = products
+
+    @classmethod
+    def load(cls, index_dir: str = INDEX_DIR) -> "ProductIndex":
+        embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        with open(os.path.join(index_dir, PRODUCTS_FILE), "r") as f:
+            products = json.load(f)
+        return cls(embeddings, products)
+
+    def __len__(self):
+        return len(self.products)
+
+    def search(self, query, k: int = 5) -> list:
+        """Return the k most similar products to a single query embedding."""
+        if len(self) == 0:
+            return []
+
+        query = normalize(np.asarray(query).reshape(-1)).astype(self.embeddings.dtype)
+        scores = self.embeddings @ query
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            {**self.products[i], "score": round(float(scores[i]), 4)} for i in top
+        ]
@@ -0,0 +1,6 @@
+"""Pytest configuration and fixtures."""
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""Tests for the product embedding index."""
+import numpy as np
+import pytest
+from product_index import ProductIndex, normalize, save_index
+
+EMBEDDINGS = np.array([
+    [1.0, 0.0, 0.0],
+    [0.0, 1.0, 0.0],
+    [0.7, 0.7, 0.0],
+    [0.0, 0.0, 2.0],
+])
+PRODUCTS = [{"id": "a"}, {"id": "b"}, {"id": "ab"}, {"id": "c"}]
+
+
+def make_index():
+    return ProductIndex(normalize(EMBEDDINGS), PRODUCTS)
+
+
+class TestSearch:
+    def test_top_k_in_score_order(self):
+        results = make_index().search([1.0, 0.2, 0.0], k=3)
+        assert [r["id"] for r in results] == ["a", "ab", "b"]
+        scores = [r["score"] for r in results]
+        assert scores == sorted(scores, reverse=True)
+        assert results[0]["score"] == pytest.approx(0.9806, abs=1e-4)
+
+    def test_k_larger_than_index(self):
+        results = make_index().search([0.0, 0.0, 5.0], k=10)
+        assert len(results) == 4
+        assert results[0]["id"] == "c"
+
+    def test_empty_index(self):
+        assert ProductIndex(np.zeros((0, 3), dtype=np.float32), []).search([1.0, 0.0, 0.0]) == []
+
+    def test_mismatched_lengths_rejected(self):
+        with pytest.raises(ValueError):
+            ProductIndex(normalize(EMBEDDINGS), PRODUCTS[:2])
+
+
+class TestSaveLoad:
+    def test_round_trip_is_memory_mapped(self, tmp_path):
+        save_index(EMBEDDINGS, PRODUCTS, index_dir=str(tmp_path))
+        index = ProductIndex.load(str(tmp_path))
+        assert isinstance(index.embeddings, np.memmap)
+        assert index.embeddings.dtype == np.float32
+        assert np.allclose(np.linalg.norm(index.embeddings, axis=1), 1.0)
+        assert index.products == PRODUCTS
+        assert [r["id"] for r in index.search([0.0, 1.0, 0.1], k=2)] == ["b", "ab"]
+
+    def test_float16_storage(self, tmp_path):
+        save_index(EMBEDDINGS, PRODUCTS, index_dir=str(tmp_path), dtype=np.float16)
+        index = ProductIndex.load(str(tmp_path))
+        assert index.embeddings.dtype == np.float16
+        assert index.search([1.0, 0.0, 0.0], k=1)[0]["id"] == "a"
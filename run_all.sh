@@ -22,8 +22,10 @@ fi
 if ! pgrep -x "mongod" > /dev/null; then
     echo "Starting MongoDB..."
     mkdir -p /tmp/mongodb
-    mongod --dbpath /tmp/mongodb --fork --logpath /tmp/mongodb.log
+    # Single-node replica set so checkout writes can use transactions
+    mongod --dbpath /tmp/mongodb --replSet rs0 --bind_ip localhost --fork --logpath /tmp/mongodb.log
     sleep 2
+    mongosh --quiet --eval 'try { rs.status() } catch (e) { rs.initiate() }' >/dev/null
 else
     echo "MongoDB already running"
 fi
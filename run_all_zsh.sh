@@ -20,8 +20,10 @@ if ! pgrep -x "mongod" > /dev/null; then
     echo "Starting MongoDB..."
     # Using local path for mongodb data if /tmp/mongodb is not accessible or preferred
     mkdir -p "$SCRIPT_DIR/data/db"
-    mongod --dbpath "$SCRIPT_DIR/data/db" --fork --logpath "$SCRIPT_DIR/data/mongodb.log"
+    # Single-node replica set so checkout writes can use transactions
+    mongod --dbpath "$SCRIPT_DIR/data/db" --replSet rs0 --bind_ip localhost --fork --logpath "$SCRIPT_DIR/data/mongodb.log"
     sleep 2
+    mongosh --quiet --eval 'try { rs.status() } catch (e) { rs.initiate() }' >/dev/null
 else
     echo "MongoDB already running"
 fi